@@ -0,0 +1,93 @@
+"""Benchmark: memory retained per message in a long multi-project run
+
+Compares the compact ``framework.schema.Message`` with the previous
+dataclass representation (no slots, a datetime per instance, metadata
+strings not interned). Messages are retained the way a run retains them:
+in the environment history, the memory and working memory of the roles
+they reach, and a message queue history. Contents are allocated up front
+and shared by both representations, so the figures are the per-message
+overhead on top of the text.
+
+Usage: python benchmark_messages.py [n_projects] [messages_per_project]
+"""
+import sys
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+from framework.schema import Message
+
+
+@dataclass
+class LegacyMessage:
+    """The message dataclass used before the compact representation"""
+    content: str
+    role: str
+    cause_by: Optional[str] = None
+    send_to: Optional[str] = None
+    timestamp: datetime = field(default_factory=datetime.now)
+
+
+ROLES = ["ProductManager", "Architect", "Engineer", "QAEngineer", "TechnicalWriter"]
+TOPICS = ["UserRequirement", "WritePRD", "WriteDesign", "WriteCode", "WriteTest"]
+
+
+def _dynamic(text: str) -> str:
+    # Names read from storage or built at runtime are new string objects
+    return "".join(list(text))
+
+
+def run(message_class, n_projects: int, per_project: int, contents):
+    """Create and retain the messages of every project; returns (bytes, count, seconds)"""
+    tracemalloc.start()
+    start_bytes = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    
+    projects = []
+    for project in range(n_projects):
+        history = []
+        queue_history = []
+        memories = {role: deque(maxlen=100) for role in ROLES}
+        working = {role: [] for role in ROLES}
+        for index in range(per_project):
+            sender = ROLES[index % len(ROLES)]
+            receiver = ROLES[(index + 1) % len(ROLES)]
+            message = message_class(
+                content=contents[(project * per_project + index) % len(contents)],
+                role=_dynamic(sender),
+                cause_by=_dynamic(TOPICS[index % len(TOPICS)]),
+                send_to=_dynamic(receiver),
+            )
+            history.append(message)
+            queue_history.append(message)
+            memories[receiver].append(message)
+            working[receiver].append(message)
+            if len(working[receiver]) > 4:
+                working[receiver].clear()
+        projects.append((history, queue_history, memories, working))
+    
+    elapsed = time.perf_counter() - start
+    used = tracemalloc.get_traced_memory()[0] - start_bytes
+    tracemalloc.stop()
+    del projects
+    return used, n_projects * per_project, elapsed
+
+
+def main():
+    n_projects = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    per_project = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    contents = [f"Document {i}: " + "lorem ipsum " * 200 for i in range(1000)]
+    
+    print(f"{n_projects} projects x {per_project} messages (content excluded)")
+    results = {}
+    for name, message_class in (("dataclass", LegacyMessage), ("compact", Message)):
+        used, count, elapsed = run(message_class, n_projects, per_project, contents)
+        results[name] = used / count
+        print(f"  {name:<10} {used / 2**20:8.1f} MiB  {used / count:6.0f} B/message  {elapsed:6.2f} s")
+    print(f"  reduction  {1 - results['compact'] / results['dataclass']:.0%} per message")
+
+
+if __name__ == "__main__":
+    main()
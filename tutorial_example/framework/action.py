@@ -1,12 +1,18 @@
 """Base Action class"""
 from abc import ABC, abstractmethod
 from typing import List, Optional
+from framework.llm import GenerationProfile, LLMUsage, UsageMeter, track_usage
+from framework.provider.base import current_caller, llm_action
 from framework.schema import Message, ActionOutput
+from framework.utils.context_builder import ContextBuilder, generation_budget
 
 
 class Action(ABC):
     """Base class for all actions"""
     
+    # Default generation settings, overridable per action name in Config.generation_profiles
+    generation_profile: Optional[GenerationProfile] = None
+    
     def __init__(self, name: str = None, llm=None):
         self.name = name or self.__class__.__name__
         self.llm = llm
@@ -34,13 +40,83 @@ class Action(ABC):
         """
         pass
     
-    async def _ask_llm(self, prompt: str, system_prompt: str = None) -> str:
+    def resolve_profile(self, profile: Optional[GenerationProfile] = None) -> GenerationProfile:
+        """
+        Get the generation settings for a call of this action
+        
+        The class default is overridden by the configured profile of this
+        action's name, which is overridden by ``profile``.
+        
+        Args:
+            profile: Optional per-call profile
+        
+        Returns:
+            Resolved generation profile
+        """
+        resolved = self.generation_profile or GenerationProfile()
+        if isinstance(self.context, dict):
+            config = self.context.get("config")
+        else:
+            config = getattr(self.context, "config", None)
+        if config is not None and hasattr(config, "get_generation_profile"):
+            resolved = resolved.merged(config.get_generation_profile(self.name))
+        return resolved.merged(profile)
+    
+    def _call_profile(self, profile: Optional[GenerationProfile] = None) -> GenerationProfile:
+        """
+        Resolve the profile of an LLM call, keeping its output within the context window
+        
+        Prompts are sized by ``context_builder`` for at most half the window
+        of generation, so a larger max_tokens is lowered to match.
+        """
+        profile = self.resolve_profile(profile)
+        capped = generation_budget(self.llm, profile.max_tokens)
+        if capped is not None:
+            profile = profile.merged(GenerationProfile(max_tokens=capped))
+        return profile
+    
+    def context_builder(self, *fixed: str, profile: Optional[GenerationProfile] = None) -> ContextBuilder:
+        """
+        Create a ContextBuilder sized for this action's LLM and generation budget
+        
+        Args:
+            *fixed: Fixed prompt text to reserve room for (e.g. the system prompt)
+            profile: Optional per-call profile (its max_tokens is kept free)
+        
+        Returns:
+            ContextBuilder to add the prompt's sections to
+        """
+        profile = self.resolve_profile(profile)
+        return ContextBuilder.for_llm(self.llm, max_tokens=profile.max_tokens).reserve(*fixed)
+    
+    async def _fit_context(self, text: str, *fixed: str, keep: str = "head") -> str:
+        """
+        Shorten a single upstream document to the prompt budget
+        
+        Args:
+            text: Document pasted into the prompt
+            *fixed: Fixed prompt text to reserve room for
+            keep: Part kept when truncating ("head", "tail" or "both")
+        
+        Returns:
+            The document, truncated if it does not fit
+        """
+        builder = self.context_builder(*fixed).add("text", text, keep=keep)
+        return (await builder.build())["text"]
+    
+    async def _ask_llm(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
         """
         Helper method to call LLM with cost tracking
         
         Args:
             prompt: User prompt
             system_prompt: Optional system prompt
+            profile: Optional generation settings overriding the action's profile
             
         Returns:
             LLM response
@@ -48,34 +124,76 @@ class Action(ABC):
         if not self.llm:
             raise ValueError("LLM not set for action")
         
-        # Track cost if context has cost_manager
-        cost_manager = None
-        role_name = ""
-        if isinstance(self.context, dict):
-            # Try to get cost_manager from context
-            # Context might be a dict or have a reference to Context object
-            pass
+        # Call LLM, collecting the usage reported by the backend calls it makes
+        profile = self._call_profile(profile)
+        system_msgs = [system_prompt] if system_prompt else None
+        with track_usage() as usages, llm_action(self.name):
+            response = await self.llm.aask(prompt, system_msgs=system_msgs, profile=profile)
+        
+        # Cache hits and responses shared with an identical call made no backend call
+        if getattr(response, "cached", False):
+            self._record_cost([], prompt, system_msgs, response, served_by="Cached")
+        elif getattr(response, "coalesced", False):
+            self._record_cost([], prompt, system_msgs, response, served_by="Coalesced")
         else:
-            # Context might be a Context object
-            if hasattr(self.context, 'cost_manager'):
-                cost_manager = self.context.cost_manager
-                role_name = getattr(self, '_role_name', '')
-        
-        # Call LLM
-        if system_prompt:
-            response = await self.llm.aask(prompt, system_msgs=[system_prompt])
+            self._record_cost(usages, prompt, system_msgs, response)
+        return response
+    
+    async def _sample_llm(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        n: int = 2,
+        profile: Optional[GenerationProfile] = None
+    ) -> List[str]:
+        """
+        Helper method to sample several LLM responses with cost tracking
+        
+        Args:
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            n: Number of responses
+            profile: Optional generation settings overriding the action's profile
+        
+        Returns:
+            List of responses
+        """
+        if not self.llm:
+            raise ValueError("LLM not set for action")
+        
+        profile = self._call_profile(profile)
+        system_msgs = [system_prompt] if system_prompt else None
+        with track_usage() as usages, llm_action(self.name):
+            samples = await self.llm.asample(prompt, system_msgs=system_msgs, n=n, profile=profile)
+        
+        self._record_cost(usages, prompt, system_msgs, "".join(samples))
+        return samples
+    
+    def _record_cost(
+        self,
+        usages: List[LLMUsage],
+        prompt: str,
+        system_msgs: Optional[List[str]],
+        response: str,
+        served_by: Optional[str] = None
+    ):
+        """Record the usage of an LLM call if the context has a cost manager"""
+        if isinstance(self.context, dict):
+            cost_manager = self.context.get("cost_manager")
         else:
-            response = await self.llm.aask(prompt)
-        
-        # Track cost (estimate: ~0.001 per request for mock, adjust for real APIs)
-        if cost_manager:
-            estimated_cost = 0.001  # Placeholder - in real implementation, get from LLM response
-            cost_manager.add_cost(
-                estimated_cost,
-                role=role_name,
-                action=self.name,
-                description=f"LLM call for {self.name}"
-            )
+            cost_manager = getattr(self.context, "cost_manager", None)
+        if not cost_manager:
+            return
         
-        return response
+        role_name = getattr(self, '_role_name', '') or current_caller()
+        if served_by:
+            cost_manager.add_cost(0.0, role=role_name, action=self.name, description=f"{served_by} LLM response for {self.name}")
+            return
+        if not usages:
+            # Backend does not report usage: estimate it from the text lengths
+            meter = UsageMeter(getattr(self.llm, "model", None), prompt, system_msgs)
+            meter.chunk(response)
+            usages = [meter.finish()]
+        for usage in usages:
+            cost_manager.add_usage(usage, role=role_name, action=self.name, description=f"LLM call for {self.name}")
 
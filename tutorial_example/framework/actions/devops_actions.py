@@ -1,12 +1,15 @@
 """Actions for DevOps tasks"""
 from typing import List
 from framework.action import Action
+from framework.llm import GenerationProfile
 from framework.schema import Message, ActionOutput
 
 
 class CreateDockerfile(Action):
     """Action to create Dockerfile"""
     
+    generation_profile = GenerationProfile(max_tokens=512)
+    
     def __init__(self, llm=None):
         super().__init__(name="CreateDockerfile", llm=llm)
     
@@ -18,6 +21,8 @@ class CreateDockerfile(Action):
         
         system_prompt = """You are a DevOps Engineer. Create optimized Dockerfiles following best practices."""
         
+        project_info = await self._fit_context(project_info, system_prompt)
+        
         prompt = f"""Create a Dockerfile for a Python project based on:
 
 {project_info}
@@ -43,6 +48,8 @@ Requirements:
 class SetupCI(Action):
     """Action to setup CI/CD configuration"""
     
+    generation_profile = GenerationProfile(max_tokens=1024)
+    
     def __init__(self, llm=None):
         super().__init__(name="SetupCI", llm=llm)
     
@@ -56,6 +63,8 @@ class SetupCI(Action):
         
         system_prompt = f"""You are a DevOps Engineer. Create {ci_type} CI/CD configuration."""
         
+        project_info = await self._fit_context(project_info, system_prompt)
+        
         if ci_type == "github_actions":
             prompt = f"""Create GitHub Actions workflow for:
 
@@ -86,6 +95,8 @@ Include:
 class CreateDeployScript(Action):
     """Action to create deployment scripts"""
     
+    generation_profile = GenerationProfile(max_tokens=1024)
+    
     def __init__(self, llm=None):
         super().__init__(name="CreateDeployScript", llm=llm)
     
@@ -100,6 +111,8 @@ class CreateDeployScript(Action):
         system_prompt = """You are a DevOps Engineer. Create deployment scripts that are 
         safe, idempotent, and include error handling."""
         
+        project_info = await self._fit_context(project_info, system_prompt)
+        
         prompt = f"""Create a {deploy_type} deployment script for:
 
 {project_info}
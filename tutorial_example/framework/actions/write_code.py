@@ -1,14 +1,31 @@
 """Write Code action"""
 from framework.action import Action
+from framework.llm import GenerationProfile
 from framework.schema import Message, ActionOutput
-from typing import List
+from framework.utils.code_extractor import detect_code_language, extract_code_blocks
+from typing import List, Tuple
 
 
 class WriteCode(Action):
     """Action to write code based on design"""
     
-    def __init__(self, llm=None):
+    # The code comes in one fenced block: stop at its closing fence instead of
+    # generating the explanation that usually follows
+    generation_profile = GenerationProfile(max_tokens=4096, stop=["\n```\n"])
+    
+    def __init__(self, llm=None, samples: int = 1, sample_temperature: float = 0.8):
+        """
+        Initialize WriteCode
+        
+        Args:
+            llm: LLM instance
+            samples: Candidates generated per call (> 1 keeps the best reviewed one)
+            sample_temperature: Temperature used when sampling several candidates,
+                unless the action's profile sets one
+        """
         super().__init__(name="WriteCode", llm=llm)
+        self.samples = samples
+        self.sample_temperature = sample_temperature
     
     async def run(self, messages: List[Message] = None, **kwargs) -> ActionOutput:
         # Extract design/requirements from messages
@@ -19,6 +36,8 @@ class WriteCode(Action):
         system_prompt = """You are a Senior Software Engineer. Write clean, 
         well-documented code based on the design specification."""
         
+        design = await self._fit_context(design, system_prompt)
+        
         prompt = f"""Based on the following design, write the implementation code:
 
 Design: {design}
@@ -28,12 +47,50 @@ Requirements:
 2. Include proper error handling
 3. Add comments and docstrings
 4. Follow best practices
+5. Return all the code in a single fenced code block
 """
         
-        code = await self._ask_llm(prompt, system_prompt)
+        if self.samples <= 1:
+            code = await self._ask_llm(prompt, system_prompt)
+            return ActionOutput(
+                content=code,
+                instruct_content={"type": "code", "content": code}
+            )
+        
+        # Best-of-N: one batched sampling request, candidates ranked by cheap checks
+        profile = self.resolve_profile()
+        if profile.temperature is None:
+            profile = profile.merged(GenerationProfile(temperature=self.sample_temperature))
+        candidates = await self._sample_llm(prompt, system_prompt, n=self.samples, profile=profile)
+        scores = [await self._score_candidate(candidate) for candidate in candidates]
+        best = max(range(len(candidates)), key=lambda index: scores[index])
+        code = candidates[best]
         
         return ActionOutput(
             content=code,
-            instruct_content={"type": "code", "content": code}
+            instruct_content={"type": "code", "content": code, "candidates": len(candidates), "scores": scores}
         )
+    
+    async def _score_candidate(self, response: str) -> Tuple[int, int]:
+        """
+        Score a generated candidate without running it
+        
+        Args:
+            response: LLM response containing the code
+        
+        Returns:
+            (validity, review score): empty code ranks lowest, then Python
+            that does not parse, then candidates by CodeReviewer score
+        """
+        # Lazy import: framework.quality also loads the tool modules
+        from framework.quality.code_reviewer import CodeReviewer
+        code = extract_code_blocks(response)
+        if not code.strip():
+            return (0, 0)
+        reviewer = CodeReviewer()
+        language = detect_code_language(code) or "python"
+        if language == "python" and reviewer.check_syntax(code) is not None:
+            return (1, 0)
+        review = await reviewer.review_code(code, language=language)
+        return (2, review["score"])
 
@@ -1,5 +1,6 @@
 """Write Design action"""
 from framework.action import Action
+from framework.llm import GenerationProfile
 from framework.schema import Message, ActionOutput
 from typing import List
 
@@ -7,6 +8,8 @@ from typing import List
 class WriteDesign(Action):
     """Action to write system design based on PRD"""
     
+    generation_profile = GenerationProfile(max_tokens=2048)
+    
     def __init__(self, llm=None):
         super().__init__(name="WriteDesign", llm=llm)
     
@@ -19,6 +22,8 @@ class WriteDesign(Action):
         system_prompt = """You are a System Architect. Create a detailed system design 
         based on the PRD."""
         
+        prd = await self._fit_context(prd, system_prompt)
+        
         prompt = f"""Based on the following PRD, create a system design:
 
 PRD: {prd}
@@ -1,12 +1,15 @@
 """Actions for writing documentation"""
 from typing import List
 from framework.action import Action
+from framework.llm import GenerationProfile
 from framework.schema import Message, ActionOutput
 
 
 class WriteDoc(Action):
     """Action to write general documentation"""
     
+    generation_profile = GenerationProfile(max_tokens=2048)
+    
     def __init__(self, llm=None):
         super().__init__(name="WriteDoc", llm=llm)
     
@@ -21,6 +24,8 @@ class WriteDoc(Action):
         system_prompt = f"""You are a Technical Writer. Write comprehensive {doc_type} documentation 
         that is clear, well-structured, and easy to understand."""
         
+        content = await self._fit_context(content, system_prompt)
+        
         prompt = f"""Write {doc_type} documentation for:
 
 {content}
@@ -39,6 +44,8 @@ Make it clear, well-structured, and comprehensive.
 class WriteAPI(Action):
     """Action to write API documentation"""
     
+    generation_profile = GenerationProfile(max_tokens=2048)
+    
     def __init__(self, llm=None):
         super().__init__(name="WriteAPI", llm=llm)
     
@@ -51,6 +58,8 @@ class WriteAPI(Action):
         system_prompt = """You are a Technical Writer specializing in API documentation. 
         Write clear API documentation with endpoints, parameters, responses, and examples."""
         
+        code = await self._fit_context(code, system_prompt)
+        
         prompt = f"""Write API documentation for the following code:
 
 ```python
@@ -77,6 +86,8 @@ Include:
 class WriteTutorial(Action):
     """Action to write tutorials"""
     
+    generation_profile = GenerationProfile(max_tokens=2048)
+    
     def __init__(self, llm=None):
         super().__init__(name="WriteTutorial", llm=llm)
     
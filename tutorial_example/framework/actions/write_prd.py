@@ -1,5 +1,6 @@
 """Write PRD action"""
 from framework.action import Action
+from framework.llm import GenerationProfile
 from framework.schema import Message, ActionOutput
 from typing import List
 
@@ -7,6 +8,8 @@ from typing import List
 class WritePRD(Action):
     """Action to write a Product Requirement Document"""
     
+    generation_profile = GenerationProfile(max_tokens=1536)
+    
     def __init__(self, llm=None):
         super().__init__(name="WritePRD", llm=llm)
     
@@ -19,6 +22,8 @@ class WritePRD(Action):
         system_prompt = """You are a Product Manager. Write a comprehensive PRD 
         (Product Requirement Document) based on the user requirement."""
         
+        requirement = await self._fit_context(requirement, system_prompt)
+        
         prompt = f"""Based on the following requirement, write a detailed PRD:
 
 Requirement: {requirement}
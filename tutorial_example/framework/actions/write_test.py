@@ -1,12 +1,16 @@
 """Action for writing tests"""
 from typing import List
 from framework.action import Action
+from framework.llm import GenerationProfile
 from framework.schema import Message, ActionOutput
 
 
 class WriteTest(Action):
     """Action to write test cases for code"""
     
+    # Tests come in one fenced block: stop at its closing fence (see WriteCode)
+    generation_profile = GenerationProfile(max_tokens=3072, stop=["\n```\n"])
+    
     def __init__(self, llm=None):
         super().__init__(name="WriteTest", llm=llm)
     
@@ -19,6 +23,8 @@ class WriteTest(Action):
         system_prompt = """You are a QA Engineer. Write comprehensive test cases using unittest framework 
         for the given code. Include edge cases and error conditions."""
         
+        code = await self._fit_context(code, system_prompt)
+        
         prompt = f"""Write comprehensive unit tests for the following code:
 
 ```python
@@ -31,6 +37,7 @@ Requirements:
 3. Include edge cases
 4. Test error conditions
 5. Add proper docstrings
+6. Return all the tests in a single fenced code block
 """
         
         test_code = await self._ask_llm(prompt, system_prompt)
@@ -75,6 +82,8 @@ class RunTest(Action):
 class ReportBugs(Action):
     """Action to report bugs found during testing"""
     
+    generation_profile = GenerationProfile(max_tokens=1024)
+    
     def __init__(self, llm=None):
         super().__init__(name="ReportBugs", llm=llm)
     
@@ -87,6 +96,8 @@ class ReportBugs(Action):
         system_prompt = """You are a QA Engineer. Analyze test results and create a bug report 
         with severity, steps to reproduce, and expected vs actual behavior."""
         
+        test_results = await self._fit_context(test_results, system_prompt, keep="tail")
+        
         prompt = f"""Based on the following test results, create a bug report:
 
 {test_results}
@@ -1,7 +1,8 @@
 """Configuration management"""
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from pathlib import Path
 import yaml
+from framework.llm import GenerationProfile
 
 
 class LLMConfig:
@@ -13,13 +14,23 @@ class LLMConfig:
         base_url: str = "http://localhost:8000/v1",
         api_key: str = "",
         model: str = "codellama/CodeLlama-7b-Instruct-hf",
-        local_model_path: str = "EMPTY"
+        local_model_path: str = "EMPTY",
+        base_urls: Optional[List[str]] = None,
+        weights: Optional[List[float]] = None,
+        context_window: Optional[int] = None
     ):
         self.api_type = api_type
         self.base_url = base_url
         self.api_key = api_key
         self.model = model
         self.local_model_path = local_model_path
+        self.base_urls = base_urls or []  # Several endpoints = load-balanced RoutedLLM
+        self.weights = weights
+        self.context_window = context_window  # Tokens of the model's window (None = unknown, no truncation)
+    
+    def get_base_urls(self) -> List[str]:
+        """Get all configured endpoint URLs"""
+        return list(self.base_urls) if self.base_urls else [self.base_url]
 
 
 class Config:
@@ -30,6 +41,16 @@ class Config:
         self.project_path = ""
         self.workspace = "workspace"
         self.repair_llm_output = True
+        # Per-action overrides of generation settings, keyed by action name
+        self.generation_profiles: Dict[str, GenerationProfile] = {}
+        # Per-model prices ({model: {prompt, completion, per_second}}) used by the CostManager
+        self.pricing: Dict[str, Dict[str, float]] = {}
+        # Roles reacting at once in an environment round (None = no limit)
+        self.max_concurrent_roles: Optional[int] = None
+    
+    def get_generation_profile(self, action_name: str) -> Optional[GenerationProfile]:
+        """Get the configured generation profile of an action, if any"""
+        return self.generation_profiles.get(action_name)
     
     @classmethod
     def default(cls):
@@ -54,12 +75,27 @@ class Config:
                 base_url=llm_data.get("base_url", "http://localhost:8000/v1"),
                 api_key=llm_data.get("api_key", ""),
                 model=llm_data.get("model", "codellama/CodeLlama-7b-Instruct-hf"),
-                local_model_path=llm_data.get("local_model_path", "EMPTY")
+                local_model_path=llm_data.get("local_model_path", "EMPTY"),
+                base_urls=llm_data.get("base_urls"),
+                weights=llm_data.get("weights"),
+                context_window=llm_data.get("context_window")
             )
         
         if "workspace" in data:
             config.workspace = data["workspace"]
         
+        if "generation_profiles" in data:
+            config.generation_profiles = {
+                name: GenerationProfile.from_dict(profile or {})
+                for name, profile in (data["generation_profiles"] or {}).items()
+            }
+        
+        if "pricing" in data:
+            config.pricing = data["pricing"] or {}
+        
+        if "max_concurrent_roles" in data:
+            config.max_concurrent_roles = data["max_concurrent_roles"]
+        
         return config
     
     def to_dict(self) -> Dict[str, Any]:
@@ -71,8 +107,16 @@ class Config:
                 "api_key": self.llm.api_key,
                 "model": self.llm.model,
                 "local_model_path": self.llm.local_model_path,
+                "base_urls": self.llm.base_urls,
+                "weights": self.llm.weights,
+                "context_window": self.llm.context_window,
             },
             "workspace": self.workspace,
-            "repair_llm_output": self.repair_llm_output
+            "repair_llm_output": self.repair_llm_output,
+            "generation_profiles": {
+                name: profile.to_dict() for name, profile in self.generation_profiles.items()
+            },
+            "pricing": self.pricing,
+            "max_concurrent_roles": self.max_concurrent_roles,
         }
 
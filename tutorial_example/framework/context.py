@@ -56,7 +56,7 @@ class Context:
         """
         self.kwargs = AttrDict()  # Stores project_path, etc.
         self.config = config  # Configuration object
-        self.cost_manager = CostManager()
+        self.cost_manager = CostManager(pricing=getattr(config, "pricing", None))
     
     def set_project_path(self, path: str):
         """Set and create project path"""
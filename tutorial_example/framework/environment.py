@@ -1,6 +1,8 @@
 """Environment for managing roles and message routing"""
-from typing import List, Dict, Optional
+from collections import deque
+from typing import Callable, Deque, List, Dict, Optional, Set
 from pathlib import Path
+import asyncio
 from framework.role import Role
 from framework.schema import Message, MessageQueue
 from framework.context import Context
@@ -9,28 +11,51 @@ from framework.context import Context
 class Environment:
     """Environment for managing roles and message routing"""
     
-    def __init__(self, context: Optional[Context] = None):
+    def __init__(self, context: Optional[Context] = None, max_concurrent_roles: Optional[int] = None):
         """
         Initialize Environment
         
         Args:
             context: Optional context object
+            max_concurrent_roles: Maximum roles reacting at once in a round
+                (default: the context's config, None = no limit)
         """
         self.roles: Dict[str, Role] = {}
+        # cause_by topic -> names of the roles watching it (see Role.watch)
+        self._subscribers: Dict[str, List[str]] = {}
         self.message_history: List[Message] = []
         self.context = context or Context()
         self.msg_buffer = MessageQueue()  # Message buffer
         self._is_running = False
+        if max_concurrent_roles is None:
+            max_concurrent_roles = getattr(getattr(self.context, "config", None), "max_concurrent_roles", None)
+        self.max_concurrent_roles = max_concurrent_roles
+        # Messages published while roles are reacting, delivered when they are done
+        self._deferred: Optional[List[Message]] = None
+        # Event-driven mode (run_events): roles with new work, and the final output signal
+        self._ready: Optional[Deque[str]] = None
+        self._queued: Set[str] = set()
+        self.completed: Optional[asyncio.Event] = None
     
     def add_role(self, role: Role):
         """Add a role to the environment"""
+        if role.name in self.roles:
+            self._unsubscribe(role.name)
         self.roles[role.name] = role
+        for topic in role.watch:
+            self._subscribers.setdefault(topic, []).append(role.name)
         # Set context if it's a dict (backward compatibility) or Context object
         if isinstance(self.context, dict):
             role.set_context(self.context)
         else:
             # For Context object, set the context's kwargs as dict
-            role.set_context(self.context.kwargs.to_dict() if hasattr(self.context.kwargs, 'to_dict') else {})
+            role_context = self.context.kwargs.to_dict() if hasattr(self.context.kwargs, 'to_dict') else {}
+            if getattr(self.context, "config", None) is not None:
+                # Actions read per-action settings (e.g. generation profiles) from it
+                role_context["config"] = self.context.config
+            # Actions record the token usage of their LLM calls in it
+            role_context["cost_manager"] = self.context.cost_manager
+            role.set_context(role_context)
         # Set environment reference (for TeamLeader)
         if hasattr(role, 'set_environment'):
             role.set_environment(self)
@@ -40,25 +65,61 @@ class Environment:
         for role in roles:
             self.add_role(role)
     
+    def _unsubscribe(self, name: str):
+        """Remove a role from the subscription index"""
+        for topic in self.roles[name].watch:
+            subscribers = self._subscribers.get(topic, [])
+            if name in subscribers:
+                subscribers.remove(name)
+            if not subscribers:
+                self._subscribers.pop(topic, None)
+    
+    def subscribers(self, topic: str) -> List[Role]:
+        """Get the roles watching a ``cause_by`` topic"""
+        return [self.roles[name] for name in self._subscribers.get(topic, ())]
+    
     def publish_message(self, message: Message, send_to: Optional[str] = None):
         """
         Publish a message to the environment
         
         Args:
             message: Message to publish
-            send_to: Specific role to send to (None = broadcast)
+            send_to: Specific role to send to (None = broadcast: every role records
+                it, the roles watching its cause_by react to it)
         """
-        message.send_to = send_to
+        if message.send_to != send_to:
+            # Messages are shared and immutable: route an addressed copy
+            message = message.replace(send_to=send_to)
         self.message_history.append(message)
         
+        if self._deferred is not None:
+            # A reacting role clears its working memory when done and would drop it
+            self._deferred.append(message)
+            return
+        self._deliver(message)
+    
+    def _deliver(self, message: Message):
+        """Hand a published message to its recipients"""
+        send_to = message.send_to
         if send_to:
             # Send to specific role
             if send_to in self.roles:
-                self.roles[send_to].observe(message)
-        else:
-            # Broadcast to all roles
-            for role in self.roles.values():
+                role = self.roles[send_to]
                 role.observe(message)
+                self._schedule(role)
+            return
+        
+        # Broadcast: every role records it, only the subscribers of its topic react
+        for role in self.roles.values():
+            role.observe(message)
+        for role in self.subscribers(message.cause_by):
+            self._schedule(role)
+    
+    def _schedule(self, role: Role):
+        """Queue a role with pending work for the event-driven scheduler"""
+        if self._ready is not None and role.working_memory and role.name not in self._queued:
+            self._queued.add(role.name)
+            self._ready.append(role.name)
     
     def get_role(self, name: str) -> Optional[Role]:
         """Get a role by name"""
@@ -77,59 +138,181 @@ class Environment:
         """
         Run one round of the environment.
         Processes all roles that have messages to handle.
+        
+        Roles with pending messages react concurrently, at most
+        ``max_concurrent_roles`` at a time, so the round waits for the
+        slowest role rather than for all of them in turn. Their output is
+        routed once every one of them has finished, in role order, whatever
+        order their LLM calls complete in. Roles that get work from this
+        routing and have not reacted yet in the round then react in a
+        further wave. A role that raises is reported and skipped without
+        affecting the others.
         """
         if self.is_idle:
             return
         
-        # Process all roles
-        for role in self.roles.values():
-            if role.working_memory:
-                message = await role.react()
+        reacted = set()
+        while True:
+            ready = [
+                role for name, role in self.roles.items()
+                if name not in reacted and role.working_memory
+            ]
+            if not ready:
+                break
+            reacted.update(role.name for role in ready)
+            
+            for message in await self._react_all(ready):
                 if message:
                     # Route message automatically
                     self._auto_route_message(message)
     
+    async def _react_all(self, roles: List[Role]) -> List[Optional[Message]]:
+        """
+        Let roles react concurrently
+        
+        Args:
+            roles: Roles to run
+        
+        Returns:
+            Message of each role, in the order of ``roles`` (None for roles
+            without output or that failed)
+        """
+        limit = asyncio.Semaphore(self.max_concurrent_roles) if self.max_concurrent_roles else None
+        
+        async def react(role: Role) -> Optional[Message]:
+            if limit is None:
+                return await role.react()
+            async with limit:
+                return await role.react()
+        
+        self._deferred = []
+        try:
+            results = await asyncio.gather(*[react(role) for role in roles], return_exceptions=True)
+        finally:
+            deferred, self._deferred = self._deferred, None
+            for message in deferred:
+                self._deliver(message)
+        
+        messages = []
+        for role, result in zip(roles, results):
+            if isinstance(result, BaseException):
+                print(f"Warning: {role.name} failed: {type(result).__name__}: {result}")
+                result = None
+            messages.append(result)
+        return messages
+    
+    async def run_events(
+        self,
+        max_steps: Optional[int] = None,
+        before_step: Optional[Callable[[], None]] = None
+    ) -> int:
+        """
+        Run roles as soon as messages reach them, until there is no work left.
+        
+        Event-driven alternative to calling ``run`` in rounds: delivering a
+        message queues its recipient, which reacts as soon as a slot is
+        free (``max_concurrent_roles``), and a role's output is routed the
+        moment it finishes. A pipeline therefore advances at the speed of
+        its LLM calls, without waiting for the rest of a round. Once the
+        final code is produced (``completed`` is set) no further reaction
+        starts, and the run ends when the ones in progress finish.
+        
+        Args:
+            max_steps: Maximum number of role reactions (None = no limit)
+            before_step: Called before each reaction; may raise to stop the run
+        
+        Returns:
+            Number of reactions run
+        """
+        limit = self.max_concurrent_roles or max(1, len(self.roles))
+        order = {name: index for index, name in enumerate(self.roles)}
+        running: Dict[asyncio.Task, Role] = {}
+        steps = 0
+        self._ready, self._queued = deque(), set()
+        self.completed = asyncio.Event()
+        for role in self.roles.values():
+            self._schedule(role)
+        
+        try:
+            while True:
+                busy = {role.name for role in running.values()}
+                deferred = []
+                while (
+                    self._ready and len(running) < limit and not self.completed.is_set()
+                    and (max_steps is None or steps < max_steps)
+                ):
+                    name = self._ready.popleft()
+                    role = self.roles.get(name)
+                    if name in busy:
+                        # Reacts again once its current reaction is over
+                        deferred.append(name)
+                        continue
+                    self._queued.discard(name)
+                    if role is None or not role.working_memory:
+                        continue
+                    if before_step is not None:
+                        before_step()
+                    running[asyncio.ensure_future(role.react())] = role
+                    busy.add(name)
+                    steps += 1
+                self._ready.extendleft(reversed(deferred))
+                if not running:
+                    break
+                
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                # Route in role order when several finish together
+                for task in sorted(done, key=lambda task: order.get(running[task].name, len(order))):
+                    role = running.pop(task)
+                    try:
+                        message = task.result()
+                    except Exception as e:
+                        print(f"Warning: {role.name} failed: {type(e).__name__}: {e}")
+                        message = None
+                    if message:
+                        self._auto_route_message(message)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            self._ready, self._queued = None, set()
+        return steps
+    
     @property
     def is_idle(self) -> bool:
         """Check if all roles are idle (no messages to process)"""
         return all(not role.working_memory for role in self.roles.values())
     
     def _auto_route_message(self, message: Message):
-        """Automatically route message to appropriate role"""
-        # Routing logic based on cause_by
-        routing_map = {
-            "WritePRD": "Architect",
-            "WriteDesign": "Engineer",
-            "WriteCode": None,  # Final output
-        }
+        """Route a role's output to the roles watching its cause_by"""
+        if message.cause_by == "WriteCode":
+            # Final output: stored in the context, not routed to other roles
+            try:
+                from framework.utils.code_extractor import extract_code_blocks
+                clean_code = extract_code_blocks(message.content)
+                # Use extracted code if available, otherwise use original
+                code_content = clean_code if clean_code and len(clean_code) > 50 else message.content
+            except ImportError:
+                # Fallback if code extractor not available
+                code_content = message.content
+            
+            if isinstance(self.context, dict):
+                self.context["code"] = code_content
+                self.context["code_raw"] = message.content  # Keep raw for reference
+                self.context["design"] = self._find_latest_message("WriteDesign")
+                self.context["prd"] = self._find_latest_message("WritePRD")
+            else:
+                # Context object
+                self.context.kwargs.set("code", code_content)
+                self.context.kwargs.set("code_raw", message.content)  # Keep raw for reference
+                self.context.kwargs.set("design", self._find_latest_message("WriteDesign"))
+                self.context.kwargs.set("prd", self._find_latest_message("WritePRD"))
+            
+            if self.completed is not None:
+                self.completed.set()
+            return
         
-        target_role = routing_map.get(message.cause_by)
-        if target_role:
-            self.publish_message(message, send_to=target_role)
-        else:
-            # Store final outputs in context
-            if message.cause_by == "WriteCode":
-                # Try to extract clean code from message content
-                try:
-                    from framework.utils.code_extractor import extract_code_blocks
-                    clean_code = extract_code_blocks(message.content)
-                    # Use extracted code if available, otherwise use original
-                    code_content = clean_code if clean_code and len(clean_code) > 50 else message.content
-                except ImportError:
-                    # Fallback if code extractor not available
-                    code_content = message.content
-                
-                if isinstance(self.context, dict):
-                    self.context["code"] = code_content
-                    self.context["code_raw"] = message.content  # Keep raw for reference
-                    self.context["design"] = self._find_latest_message("WriteDesign")
-                    self.context["prd"] = self._find_latest_message("WritePRD")
-                else:
-                    # Context object
-                    self.context.kwargs.set("code", code_content)
-                    self.context.kwargs.set("code_raw", message.content)  # Keep raw for reference
-                    self.context.kwargs.set("design", self._find_latest_message("WriteDesign"))
-                    self.context.kwargs.set("prd", self._find_latest_message("WritePRD"))
+        self.publish_message(message)
     
     def _find_latest_message(self, cause_by: str) -> str:
         """Find latest message with given cause_by"""
@@ -1,26 +1,404 @@
 """LLM interface and implementations"""
-from abc import ABC, abstractmethod
-from typing import List, Optional
+from abc import ABC
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
 import asyncio
+import functools
+import inspect
+import json
+import os
+import threading
+import time
 import aiohttp
+from framework.utils.exceptions import LLMConnectionError, LLMQueueFullException, LLMServerError
+
+
+class LLMResponse(str):
+    """
+    LLM response text carrying call metadata.
+    
+    Behaves exactly like ``str``, so callers that only need the text are
+    unaffected; metadata is lost on any string operation. ``cached`` marks
+    responses served from a cache, ``coalesced`` responses shared with an
+    identical concurrent call; neither made a backend call of its own.
+    """
+    
+    def __new__(cls, text: str, cached: bool = False, coalesced: bool = False):
+        obj = super().__new__(cls, text)
+        obj.cached = cached
+        obj.coalesced = coalesced
+        return obj
+
+
+@dataclass
+class LLMUsage:
+    """
+    Token counts and timings of one backend call.
+    
+    ``latency`` and ``first_token_latency`` are measured by the client and
+    include queueing; ``server_time`` is the processing time reported by
+    the server, when it reports one. ``estimated`` is set when the token
+    counts were derived from text lengths instead of the backend.
+    """
+    model: str = ""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+    first_token_latency: Optional[float] = None
+    server_time: Optional[float] = None
+    estimated: bool = False
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+    
+    @property
+    def tokens_per_second(self) -> float:
+        """Completion tokens per second of the whole call"""
+        return self.completion_tokens / self.latency if self.latency > 0 else 0.0
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LLMUsage":
+        """Create usage from a mapping written by ``to_dict``"""
+        return cls(**{key: value for key, value in data.items() if key in cls.__dataclass_fields__})
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "latency": round(self.latency, 4),
+            "first_token_latency": round(self.first_token_latency, 4) if self.first_token_latency is not None else None,
+            "server_time": round(self.server_time, 4) if self.server_time is not None else None,
+            "estimated": self.estimated,
+        }
+
+
+# Usage lists collecting the calls made in the current context (innermost last)
+_usage_sinks: ContextVar[Tuple[List[LLMUsage], ...]] = ContextVar("llm_usage_sinks", default=())
+
+
+@contextmanager
+def track_usage() -> Iterator[List[LLMUsage]]:
+    """
+    Collect the usage of every backend call made inside the block
+    
+    Backends report usage through ``report_usage`` when a call finishes, so
+    wrappers (caches, routers, retries) need no changes: a cache hit reports
+    nothing, a retried or hedged call reports every attempt that produced
+    output. Blocks can be nested; outer blocks see inner calls too.
+    
+    Yields:
+        List filled with one LLMUsage per backend call
+    """
+    sink: List[LLMUsage] = []
+    token = _usage_sinks.set(_usage_sinks.get() + (sink,))
+    try:
+        yield sink
+    finally:
+        _usage_sinks.reset(token)
+
+
+def report_usage(usage: LLMUsage):
+    """Record the usage of a finished backend call in the enclosing ``track_usage`` blocks"""
+    for sink in _usage_sinks.get():
+        sink.append(usage)
+
+
+class UsageMeter:
+    """
+    Times one streamed call and reports its usage when it ends.
+    
+    Backends set ``prompt_tokens``, ``completion_tokens`` and ``server_time``
+    when the server provides them; missing counts are estimated from the
+    text lengths. Calls that end before producing output report nothing.
+    """
+    
+    # Rough characters per token used for estimates
+    CHARS_PER_TOKEN = 4
+    
+    def __init__(self, model: Optional[str], prompt: str, system_msgs: Optional[List[str]] = None):
+        self.model = model or ""
+        self.prompt_chars = len(prompt) + sum(len(msg) for msg in system_msgs or [])
+        self.started = time.monotonic()
+        self.first_token: Optional[float] = None
+        self.completion_chars = 0
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.server_time: Optional[float] = None
+        self.usage: Optional[LLMUsage] = None
+    
+    def chunk(self, text: str):
+        """Account for a streamed chunk"""
+        if self.first_token is None:
+            self.first_token = time.monotonic() - self.started
+        self.completion_chars += len(text)
+    
+    def finish(self) -> Optional[LLMUsage]:
+        """Build and report the usage of the call (only once)"""
+        if self.usage is not None:
+            return self.usage
+        if self.first_token is None and not self.completion_tokens:
+            return None
+        estimated = self.prompt_tokens is None or self.completion_tokens is None
+        self.usage = LLMUsage(
+            model=self.model,
+            prompt_tokens=self.prompt_tokens if self.prompt_tokens is not None else self.prompt_chars // self.CHARS_PER_TOKEN + 1,
+            completion_tokens=self.completion_tokens if self.completion_tokens is not None else self.completion_chars // self.CHARS_PER_TOKEN + 1,
+            latency=time.monotonic() - self.started,
+            first_token_latency=self.first_token,
+            server_time=self.server_time,
+            estimated=estimated,
+        )
+        report_usage(self.usage)
+        return self.usage
+
+
+@dataclass
+class GenerationProfile:
+    """
+    Generation settings for one kind of call.
+    
+    Fields left as None fall back to the backend's own defaults, so a
+    profile only needs to set what it changes. ``json_schema`` constrains
+    the output to JSON matching the schema on backends that support it
+    (vLLM guided decoding, llama.cpp grammars, OpenAI JSON mode); others
+    ignore it, so callers still validate what they parse.
+    """
+    max_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    stop: List[str] = field(default_factory=list)
+    json_schema: Optional[Dict[str, Any]] = None
+    
+    def merged(self, override: Optional["GenerationProfile"]) -> "GenerationProfile":
+        """Combine with another profile whose set fields take precedence"""
+        if override is None:
+            return self
+        return GenerationProfile(
+            max_tokens=override.max_tokens if override.max_tokens is not None else self.max_tokens,
+            temperature=override.temperature if override.temperature is not None else self.temperature,
+            stop=list(override.stop) if override.stop else list(self.stop),
+            json_schema=override.json_schema if override.json_schema is not None else self.json_schema,
+        )
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GenerationProfile":
+        """Create a profile from a config mapping"""
+        stop = data.get("stop") or []
+        return cls(
+            max_tokens=data.get("max_tokens"),
+            temperature=data.get("temperature"),
+            stop=[stop] if isinstance(stop, str) else list(stop),
+            json_schema=data.get("json_schema"),
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a config mapping (unset fields omitted)"""
+        data = {}
+        if self.max_tokens is not None:
+            data["max_tokens"] = self.max_tokens
+        if self.temperature is not None:
+            data["temperature"] = self.temperature
+        if self.stop:
+            data["stop"] = list(self.stop)
+        if self.json_schema is not None:
+            data["json_schema"] = self.json_schema
+        return data
+
+
+# Settings of the generation a backend runs to warm up
+WARMUP_PROFILE = GenerationProfile(max_tokens=1)
+
+
+def _accepts_profile(method: Callable) -> bool:
+    """Check whether a backend method takes the ``profile`` argument"""
+    try:
+        parameters = inspect.signature(method).parameters.values()
+    except (TypeError, ValueError):
+        return True
+    return any(p.name == "profile" or p.kind == p.VAR_KEYWORD for p in parameters)
+
+
+def _drop_profile(method: Callable) -> Callable:
+    """Adapt a backend method that predates generation profiles"""
+    if inspect.isasyncgenfunction(method):
+        @functools.wraps(method)
+        async def stream(self, *args, profile: Optional[GenerationProfile] = None, **kwargs):
+            async for chunk in method(self, *args, **kwargs):
+                yield chunk
+        return stream
+    
+    @functools.wraps(method)
+    def call(self, *args, profile: Optional[GenerationProfile] = None, **kwargs):
+        return method(self, *args, **kwargs)
+    return call
 
 
 class BaseLLM(ABC):
-    """Base LLM interface"""
+    """
+    Base LLM interface.
+    
+    Backends implement ``astream`` and get ``aask`` for free; a backend that
+    only implements ``aask`` still supports ``astream`` as a single chunk.
+    
+    Both accept an optional ``GenerationProfile`` overriding the backend's
+    max_tokens, temperature and stop sequences for that call, and
+    optionally constraining its output to a JSON schema. Backends written
+    against the older ``aask(prompt, system_msgs=None)`` signature keep
+    working: the profile is dropped before it reaches them.
+    """
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in ("aask", "astream", "asample"):
+            method = cls.__dict__.get(name)
+            if method is not None and not _accepts_profile(method):
+                setattr(cls, name, _drop_profile(method))
     
-    @abstractmethod
-    async def aask(self, prompt: str, system_msgs: Optional[List[str]] = None) -> str:
+    async def aask(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
         """Async ask LLM"""
+        chunks = []
+        async for chunk in self.astream(prompt, system_msgs, profile=profile):
+            chunks.append(chunk)
+        return "".join(chunks)
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        """
+        Async stream the LLM response as text chunks
+        
+        Args:
+            prompt: The input text prompt
+            system_msgs: Optional list of system messages
+            profile: Optional generation settings for this call
+            
+        Yields:
+            Text chunks in generation order
+        """
+        if type(self).aask is BaseLLM.aask:
+            raise NotImplementedError(f"{type(self).__name__} must implement aask() or astream()")
+        yield await self.aask(prompt, system_msgs, profile=profile)
+    
+    async def asample(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        n: int = 2,
+        profile: Optional[GenerationProfile] = None
+    ) -> List[str]:
+        """
+        Generate several independent responses to one prompt
+        
+        The default runs ``n`` concurrent calls; backends that can sample
+        several completions in one request (sharing the prompt prefill)
+        override it.
+        
+        Args:
+            prompt: The input text prompt
+            system_msgs: Optional list of system messages
+            n: Number of responses
+            profile: Optional generation settings for this call
+        
+        Returns:
+            List of ``n`` responses
+        """
+        return list(await asyncio.gather(*(self.aask(prompt, system_msgs, profile=profile) for _ in range(n))))
+    
+    def generation_params(self, profile: Optional[GenerationProfile] = None) -> Dict[str, Any]:
+        """
+        Resolve the max_tokens, temperature, stop sequences and JSON schema of a call
+        
+        Args:
+            profile: Optional per-call profile
+        
+        Returns:
+            Dict with the profile's values, falling back to the backend's defaults
+        """
+        profile = profile or GenerationProfile()
+        return {
+            "max_tokens": profile.max_tokens if profile.max_tokens is not None else getattr(self, "max_tokens", None),
+            "temperature": profile.temperature if profile.temperature is not None else getattr(self, "temperature", None),
+            "stop": list(profile.stop),
+            "json_schema": profile.json_schema,
+        }
+    
+    async def warmup(self, timeout: Optional[float] = 60.0) -> bool:
+        """
+        Prepare the backend for traffic and check that it answers
+        
+        Runs a one-token generation, so loading weights, opening connections
+        and filling caches happen here rather than in the first real call.
+        
+        Args:
+            timeout: Seconds to wait for the generation (None waits indefinitely)
+        
+        Returns:
+            True if the backend answered in time
+        """
+        try:
+            await asyncio.wait_for(self.aask("Hi", profile=WARMUP_PROFILE), timeout)
+        except Exception:
+            return False
+        return True
+    
+    async def aclose(self):
+        """Release resources held by the backend (connections, workers)"""
         pass
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
 
 
 class MockLLM(BaseLLM):
     """Mock LLM for testing without API keys"""
     
-    async def aask(self, prompt: str, system_msgs: Optional[List[str]] = None) -> str:
+    def __init__(self, chunk_size: int = 64):
+        """
+        Initialize the mock LLM.
+        
+        Args:
+            chunk_size: Number of characters per streamed chunk
+        """
+        self.chunk_size = chunk_size
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        meter = UsageMeter("mock", prompt, system_msgs)
         # Simulate async delay
         await asyncio.sleep(0.1)
         
+        # Replay the canned response in chunks
+        response = self._mock_response(prompt, system_msgs)
+        try:
+            for start in range(0, len(response), self.chunk_size):
+                chunk = response[start:start + self.chunk_size]
+                meter.chunk(chunk)
+                yield chunk
+                await asyncio.sleep(0)
+        finally:
+            meter.finish()
+    
+    def _mock_response(self, prompt: str, system_msgs: Optional[List[str]] = None) -> str:
         # Return mock response based on prompt content
         prompt_lower = prompt.lower()
         
@@ -163,15 +541,30 @@ if __name__ == "__main__":
 class OpenAILLM(BaseLLM):
     """OpenAI LLM implementation"""
     
-    def __init__(self, model: str = "gpt-3.5-turbo", api_key: str = None):
+    def __init__(self, model: str = "gpt-3.5-turbo", api_key: str = None, context_window: Optional[int] = None):
+        """
+        Initialize the OpenAI client
+        
+        Args:
+            model: Model name
+            api_key: Optional API key (default: OPENAI_API_KEY)
+            context_window: Context window of the model in tokens (None:
+                unknown, prompts are not truncated)
+        """
         self.model = model
+        self.context_window = context_window
         try:
             import openai
             self.client = openai.AsyncOpenAI(api_key=api_key)
         except ImportError:
             raise ImportError("openai package is required. Install with: pip install openai")
     
-    async def aask(self, prompt: str, system_msgs: Optional[List[str]] = None) -> str:
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
         messages = []
         
         if system_msgs:
@@ -180,12 +573,64 @@ class OpenAILLM(BaseLLM):
         
         messages.append({"role": "user", "content": prompt})
         
-        response = await self.client.chat.completions.create(
+        options = self._options(profile)
+        
+        meter = UsageMeter(self.model, prompt, system_msgs)
+        stream = await self.client.chat.completions.create(
             model=self.model,
-            messages=messages
+            messages=messages,
+            stream=True,
+            # The last event then carries the token counts of the call
+            stream_options={"include_usage": True},
+            **options
         )
         
-        return response.choices[0].message.content
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    meter.prompt_tokens = chunk.usage.prompt_tokens
+                    meter.completion_tokens = chunk.usage.completion_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    meter.chunk(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        finally:
+            meter.finish()
+    
+    @staticmethod
+    def _options(profile: Optional[GenerationProfile]) -> Dict[str, Any]:
+        """Request options for the settings the profile overrides"""
+        options = profile.to_dict() if profile is not None else {}
+        if options.pop("json_schema", None) is not None:
+            # JSON mode guarantees valid JSON; the prompt describes the expected shape
+            options["response_format"] = {"type": "json_object"}
+        return options
+    
+    async def asample(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        n: int = 2,
+        profile: Optional[GenerationProfile] = None
+    ) -> List[str]:
+        """Sample ``n`` completions in one request (the prompt is billed once)"""
+        messages = [{"role": "system", "content": sys_msg} for sys_msg in system_msgs or []]
+        messages.append({"role": "user", "content": prompt})
+        options = self._options(profile)
+        
+        meter = UsageMeter(self.model, prompt, system_msgs)
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            n=n,
+            **options
+        )
+        texts = [choice.message.content or "" for choice in response.choices]
+        if response.usage:
+            meter.prompt_tokens = response.usage.prompt_tokens
+            meter.completion_tokens = response.usage.completion_tokens
+        meter.chunk("".join(texts))
+        meter.finish()
+        return texts
 
 
 class VLLM(BaseLLM):
@@ -197,23 +642,49 @@ class VLLM(BaseLLM):
         model: str = None,
         temperature: float = 0.2,
         max_tokens: int = 8096,
-        api_key: str = None
+        api_key: str = None,
+        connection_limit: int = 100,
+        keepalive_timeout: float = 30.0,
+        dns_cache_ttl: int = 300,
+        timeout: float = 300,
+        context_window: Optional[int] = None
     ):
         """
         Initialize the vLLM client.
         
+        The client owns a single pooled HTTP session that is created lazily on
+        first use and shared by every role holding this instance. Call
+        ``aclose()`` (or use ``async with``) to release its connections;
+        otherwise the session is closed when its event loop shuts down
+        (e.g. at the end of ``asyncio.run``).
+        
         Args:
             base_url: Base URL of the vLLM server (default: http://localhost:8000/v1)
             model: Model name (optional, server may have a default)
             temperature: Sampling temperature
             max_tokens: Maximum tokens to generate
             api_key: Optional API key for authentication
+            connection_limit: Maximum number of concurrent pooled connections
+            keepalive_timeout: Seconds an idle connection is kept open for reuse
+            dns_cache_ttl: Seconds a resolved server address is cached
+            timeout: Total timeout in seconds for a single request
+            context_window: Context window of the served model in tokens (the
+                server's --max-model-len; None: unknown, prompts are not truncated)
         """
         self.base_url = base_url.rstrip('/')
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.api_key = api_key
+        self.connection_limit = connection_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = timeout
+        self.context_window = context_window
+        
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session_closer: Optional[asyncio.Task] = None
         
         # Ensure the URL has /v1 prefix for OpenAI-compatible API
         if not self.base_url.endswith('/v1'):
@@ -222,17 +693,222 @@ class VLLM(BaseLLM):
             else:
                 self.base_url = f"{self.base_url}/v1"
     
-    async def aask(self, prompt: str, system_msgs: Optional[List[str]] = None) -> str:
+    def _get_session(self) -> aiohttp.ClientSession:
         """
-        Generate text from a prompt using vLLM server.
+        Get the pooled HTTP session, creating it on first use.
+        
+        A session is bound to the event loop it was created in, so a new one is
+        created when the instance is reused from another loop (e.g. successive
+        ``asyncio.run`` calls in ``generate_repo``).
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._retire_session(loop)
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True,
+            )
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._session_loop = loop
+            self._session_closer = loop.create_task(self._close_on_shutdown(self._session))
+        return self._session
+    
+    def _retire_session(self, loop: asyncio.AbstractEventLoop):
+        """
+        Stop the closer of the session being replaced
+        
+        Cancelling the closer closes its session (still open when it belongs
+        to the running loop). A closer of another, still running loop is
+        cancelled on that loop; one of a closed loop is already gone.
+        """
+        closer, old_loop = self._session_closer, self._session_loop
+        self._session_closer = None
+        if closer is None or closer.done() or old_loop is None:
+            return
+        if old_loop is loop:
+            closer.cancel()
+        elif not old_loop.is_closed():
+            old_loop.call_soon_threadsafe(closer.cancel)
+    
+    @staticmethod
+    async def _close_on_shutdown(session: aiohttp.ClientSession):
+        """
+        Close a session when its event loop shuts down
+        
+        ``asyncio.run`` cancels the tasks still pending when the main
+        coroutine returns, so callers that never call ``aclose()`` do not
+        leak the session's connections (or get "Unclosed client session").
+        """
+        try:
+            await asyncio.Event().wait()
+        finally:
+            if not session.closed:
+                await session.close()
+    
+    async def health_check(self, timeout: float = 5.0) -> bool:
+        """
+        Check that the server answers on its models endpoint
+        
+        Args:
+            timeout: Seconds to wait for the server
+        
+        Returns:
+            True if the server responded successfully
+        """
+        try:
+            session = self._get_session()
+            async with session.get(
+                f"{self.base_url}/models",
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                return response.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+    
+    async def warmup(self, timeout: Optional[float] = 60.0) -> bool:
+        # The models endpoint fails fast on a dead server, before a generation is queued
+        if not await self.health_check(timeout=min(timeout or 5.0, 5.0)):
+            return False
+        return await super().warmup(timeout)
+    
+    async def aclose(self):
+        """Close the pooled HTTP session"""
+        session, closer = self._session, self._session_closer
+        self._session = None
+        self._session_loop = None
+        self._session_closer = None
+        if closer is not None:
+            closer.cancel()
+        if session is not None and not session.closed:
+            await session.close()
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream generated text from the vLLM server (server-sent events).
         
         Args:
             prompt: The input text prompt
             system_msgs: Optional list of system messages
+            profile: Optional generation settings for this call
             
+        Yields:
+            Generated text chunks
+        """
+        payload = self._payload(prompt, system_msgs, profile)
+        payload["stream"] = True
+        # The last event then carries the token counts of the call
+        payload["stream_options"] = {"include_usage": True}
+        
+        meter = UsageMeter(self.model, prompt, system_msgs)
+        try:
+            session = self._get_session()
+            async with session.post(
+                f"{self.base_url}/chat/completions",
+                json=payload
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise LLMServerError(
+                        response.status,
+                        f"vLLM server error (status {response.status}): {error_text}"
+                    )
+                
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    event = json.loads(data)
+                    self._read_usage(event, meter)
+                    choices = event.get("choices") or []
+                    if choices:
+                        content = choices[0].get("delta", {}).get("content")
+                        if content:
+                            meter.chunk(content)
+                            yield content
+        except aiohttp.ClientError as e:
+            raise LLMConnectionError(
+                f"Failed to connect to vLLM server at {self.base_url}. " +
+                f"Make sure the server is running. Error: {e}"
+            )
+        finally:
+            meter.finish()
+    
+    async def asample(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        n: int = 2,
+        profile: Optional[GenerationProfile] = None
+    ) -> List[str]:
+        """
+        Sample ``n`` completions in one request.
+        
+        vLLM prefills the prompt once and decodes the samples in the same
+        batch, which is far cheaper than ``n`` separate requests.
+        
+        Args:
+            prompt: The input text prompt
+            system_msgs: Optional list of system messages
+            n: Number of completions
+            profile: Optional generation settings for this call
+        
         Returns:
-            Generated text as a string
+            List of ``n`` completions
         """
+        payload = self._payload(prompt, system_msgs, profile)
+        payload["n"] = n
+        
+        meter = UsageMeter(self.model, prompt, system_msgs)
+        try:
+            session = self._get_session()
+            async with session.post(
+                f"{self.base_url}/chat/completions",
+                json=payload
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise LLMServerError(
+                        response.status,
+                        f"vLLM server error (status {response.status}): {error_text}"
+                    )
+                result = await response.json()
+        except aiohttp.ClientError as e:
+            raise LLMConnectionError(
+                f"Failed to connect to vLLM server at {self.base_url}. " +
+                f"Make sure the server is running. Error: {e}"
+            )
+        
+        choices = sorted(result.get("choices") or [], key=lambda choice: choice.get("index", 0))
+        texts = [choice.get("message", {}).get("content") or "" for choice in choices]
+        self._read_usage(result, meter)
+        meter.chunk("".join(texts))
+        meter.finish()
+        return texts
+    
+    def _payload(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]],
+        profile: Optional[GenerationProfile]
+    ) -> Dict[str, Any]:
+        """Build the chat completion request body"""
         messages = []
         
         if system_msgs:
@@ -241,54 +917,64 @@ class VLLM(BaseLLM):
         
         messages.append({"role": "user", "content": prompt})
         
+        params = self.generation_params(profile)
         payload = {
             "messages": messages,
-            "temperature": self.temperature,
-            "max_tokens": self.max_tokens,
+            "temperature": params["temperature"],
+            "max_tokens": params["max_tokens"],
         }
+        if params["stop"]:
+            payload["stop"] = params["stop"]
+        if params["json_schema"] is not None:
+            # vLLM guided decoding: only tokens that keep the output valid are sampled
+            payload["guided_json"] = params["json_schema"]
         
         if self.model:
             payload["model"] = self.model
-        
-        headers = {"Content-Type": "application/json"}
-        if self.api_key:
-            headers["Authorization"] = f"Bearer {self.api_key}"
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/chat/completions",
-                    json=payload,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=300)
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise RuntimeError(
-                            f"vLLM server error (status {response.status}): {error_text}"
-                        )
-                    
-                    result = await response.json()
-                    return result["choices"][0]["message"]["content"]
-        except aiohttp.ClientError as e:
-            raise RuntimeError(
-                f"Failed to connect to vLLM server at {self.base_url}. " +
-                f"Make sure the server is running. Error: {e}"
-            )
+        return payload
+    
+    @staticmethod
+    def _read_usage(event: Dict[str, Any], meter: "UsageMeter"):
+        """Take token counts and server timings from a streamed event, if present"""
+        usage = event.get("usage")
+        if usage:
+            meter.prompt_tokens = usage.get("prompt_tokens", meter.prompt_tokens)
+            meter.completion_tokens = usage.get("completion_tokens", meter.completion_tokens)
+        # llama.cpp's OpenAI-compatible server reports its timings in milliseconds
+        timings = event.get("timings")
+        if timings:
+            meter.server_time = (timings.get("prompt_ms", 0.0) + timings.get("predicted_ms", 0.0)) / 1000
 
 class LocalLLM(BaseLLM):
     """
     A minimal wrapper for local LLM inference using llama.cpp.
     
     Supports: Llama 2, Llama 3, Qwen 2/2.5, IBM Granite 3.0
+    
+    ``llama_cpp.Llama`` is not thread-safe, so all generations run on one
+    dedicated inference thread fed by a bounded priority queue.
+    
+    With ``prefix_cache_size`` > 0, prompts that share a prefix (system
+    messages plus chat-template header) reuse a saved llama.cpp state for it
+    instead of re-evaluating it. Prefix reuse formats prompts with the
+    built-in template of the model family rather than the GGUF's own chat
+    template, so it is opt-in.
     """
     
+    DEFAULT_PRIORITY = 5
+    
+    # Stand-in user prompt used to locate the end of the shared prefix
+    _PREFIX_SENTINEL = "\x00PROMPT\x00"
+    
     def __init__(
         self,
         model_path: str="./HF_MODELS/Meta-Llama-3-8B-Instruct-GGUF/Meta-Llama-3-8B-Instruct.Q3_K_M.gguf",
         temperature: float = 0.2,
         max_tokens: int = 8096,
-        n_ctx: int = 8192
+        n_ctx: int = 8192,
+        max_queue_size: int = 64,
+        n_threads: Optional[int] = None,
+        prefix_cache_size: int = 0
     ):
         """
         Initialize the local LLM.
@@ -298,6 +984,11 @@ class LocalLLM(BaseLLM):
             temperature: Sampling temperature (0.0 = deterministic, 1.0 = creative)
             max_tokens: Maximum tokens to generate per response
             n_ctx: Context window size
+            max_queue_size: Maximum number of requests waiting for the inference thread
+            n_threads: CPU threads used by llama.cpp (None = llama.cpp default)
+            prefix_cache_size: Number of saved prompt-prefix states to keep
+                (0, the default, disables prefix reuse and uses the model's
+                own chat template)
         """
         try:
             from llama_cpp import Llama
@@ -311,9 +1002,37 @@ class LocalLLM(BaseLLM):
             model_path=model_path,
             temperature=temperature,
             n_ctx=n_ctx,
+            n_threads=n_threads,
             verbose=False,
         )
+        self.model = os.path.basename(model_path)
+        self.temperature = temperature
         self.max_tokens = max_tokens
+        self.n_ctx = n_ctx
+        self.max_queue_size = max_queue_size
+        self.prefix_cache_size = prefix_cache_size
+        self._prefix_states: "OrderedDict[Tuple[int, ...], Any]" = OrderedDict()
+        self._grammars: Dict[str, Any] = {}  # Compiled grammars by JSON schema
+        
+        # Inference worker state (created lazily in the running event loop)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llama-inference")
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._queue_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queued = 0  # Requests waiting in the queue, cancelled ones excluded
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._current: Optional["_InferenceRequest"] = None
+        self._sequence = 0
+        self._stats: Dict[str, Any] = {
+            "completed": 0,
+            "cancelled": 0,
+            "rejected": 0,
+            "max_queue_depth": 0,
+            "total_wait_time": 0.0,
+            "max_wait_time": 0.0,
+            "prefix_hits": 0,
+            "prefix_misses": 0,
+            "prefix_tokens_saved": 0,
+        }
         
         # Detect model type and set appropriate template
         model_path_lower = model_path.lower()
@@ -426,17 +1145,140 @@ class LocalLLM(BaseLLM):
         
         return full_prompt
 
-    async def aask(self, prompt: str, system_msgs: Optional[List[str]] = None) -> str:
+    async def aask(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None,
+        priority: int = DEFAULT_PRIORITY
+    ) -> str:
         """
         Generate text from a prompt.
         
         Args:
             prompt: The input text prompt
             system_msgs: Optional list of system messages
+            profile: Optional generation settings for this call
+            priority: Queue priority (1-10, higher is served first)
             
         Returns:
             Generated text as a string
         """
+        chunks = []
+        async for chunk in self.astream(prompt, system_msgs, profile=profile, priority=priority):
+            chunks.append(chunk)
+        return "".join(chunks).strip()
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None,
+        priority: int = DEFAULT_PRIORITY
+    ) -> AsyncIterator[str]:
+        """
+        Stream generated text from a prompt.
+        
+        The request is queued for the dedicated inference thread; chunks are
+        handed back to the event loop as they are produced. Leaving the
+        iteration early cancels the request, whether it is still queued or
+        already generating.
+        
+        Args:
+            prompt: The input text prompt
+            system_msgs: Optional list of system messages
+            profile: Optional generation settings for this call
+            priority: Queue priority (1-10, higher is served first)
+            
+        Yields:
+            Generated text chunks
+        
+        Raises:
+            LLMQueueFullException: If max_queue_size requests are already waiting
+        """
+        request = _InferenceRequest(prompt=prompt, system_msgs=system_msgs, priority=priority, profile=profile)
+        meter = UsageMeter(self.model, prompt, system_msgs)
+        self._submit(request)
+        try:
+            while True:
+                item = await request.chunks.get()
+                if item is _InferenceRequest.DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                meter.chunk(item)
+                yield item
+        finally:
+            self._cancel(request)
+            meter.prompt_tokens = request.usage.get("prompt_tokens")
+            meter.completion_tokens = request.usage.get("completion_tokens")
+            meter.finish()
+    
+    async def asample(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        n: int = 2,
+        profile: Optional[GenerationProfile] = None,
+        priority: int = DEFAULT_PRIORITY
+    ) -> List[str]:
+        """
+        Generate several independent responses to one prompt
+        
+        llama.cpp generates one sequence at a time, so the samples are still
+        produced one after the other, but as a single queued request: the
+        prompt is evaluated once and every later sample reuses it from the
+        KV cache, generating only its own completion.
+        
+        Args:
+            prompt: The input text prompt
+            system_msgs: Optional list of system messages
+            n: Number of responses
+            profile: Optional generation settings for this call
+            priority: Queue priority (1-10, higher is served first)
+        
+        Returns:
+            List of ``n`` responses
+        
+        Raises:
+            LLMQueueFullException: If max_queue_size requests are already waiting
+        """
+        request = _InferenceRequest(prompt=prompt, system_msgs=system_msgs, priority=priority, profile=profile, n=n)
+        meter = UsageMeter(self.model, prompt, system_msgs)
+        self._submit(request)
+        samples: List[str] = []
+        chunks: List[str] = []
+        try:
+            while True:
+                item = await request.chunks.get()
+                if item is _InferenceRequest.DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                if item is _InferenceRequest.SAMPLE_END:
+                    samples.append("".join(chunks).strip())
+                    chunks = []
+                    continue
+                meter.chunk(item)
+                chunks.append(item)
+        finally:
+            self._cancel(request)
+            meter.prompt_tokens = request.usage.get("prompt_tokens")
+            meter.completion_tokens = request.usage.get("completion_tokens")
+            meter.finish()
+        return samples
+    
+    def count_tokens(self, text: str) -> int:
+        """
+        Count the tokens of a text with the model's tokenizer
+        
+        Tokenizing only reads the vocabulary, so it is safe to call while
+        the inference thread is generating.
+        """
+        return len(self.llm.tokenize(text.encode("utf-8"), add_bos=False, special=False))
+    
+    def _build_messages(self, prompt: str, system_msgs: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        """Build chat messages for create_chat_completion"""
         # Format prompt using detected template
         # full_prompt = self.prompt_template(prompt, system_msgs) # OLD
         messages = []
@@ -454,34 +1296,279 @@ class LocalLLM(BaseLLM):
             "role": "user",
             "content": prompt
         })
-        # Run in executor to avoid blocking
-        loop = asyncio.get_event_loop()
-        # response = await loop.run_in_executor(
-        #     None,
-        #     lambda: self.llm(
-        #         prompt=full_prompt,
-        #         max_tokens=self.max_tokens,
-        #         stop=self.stop_tokens,
-        #     )
-        # )# OLD
-        response = await loop.run_in_executor(
-            None,
-            lambda: self.llm.create_chat_completion(
-                messages=messages,
-                max_tokens=self.max_tokens,
-                stop=self.stop_tokens,
+        return messages
+    
+    def _submit(self, request: "_InferenceRequest"):
+        """Put a request on the inference queue, starting the worker if needed"""
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done() or self._queue_loop is not loop:
+            # Unbounded: cancelled requests stay in the heap until popped, only
+            # the waiting ones count against max_queue_size
+            self._queue = asyncio.PriorityQueue()
+            self._queue_loop = loop
+            self._queued = 0
+            self._dispatcher = loop.create_task(self._dispatch())
+        
+        if self._queued >= self.max_queue_size:
+            self._stats["rejected"] += 1
+            raise LLMQueueFullException(
+                self.max_queue_size,
+                f"LocalLLM inference queue is full ({self.max_queue_size} requests waiting)"
             )
+        self._sequence += 1
+        self._queue.put_nowait((-request.priority, self._sequence, request))
+        request.queued = True
+        self._queued += 1
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queued)
+    
+    def _cancel(self, request: "_InferenceRequest"):
+        """Drop a request if it is still queued, or stop its generation"""
+        if request.queued:
+            # Frees its queue place now; the dispatcher skips it when popped
+            request.queued = False
+            self._queued -= 1
+        request.cancelled.set()
+    
+    async def _dispatch(self):
+        """Feed queued requests one at a time to the inference thread"""
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, request = await self._queue.get()
+            if request.cancelled.is_set():
+                self._stats["cancelled"] += 1
+                continue
+            request.queued = False
+            self._queued -= 1
+            
+            wait_time = time.monotonic() - request.enqueued_at
+            self._stats["total_wait_time"] += wait_time
+            self._stats["max_wait_time"] = max(self._stats["max_wait_time"], wait_time)
+            
+            self._current = request
+            try:
+                await loop.run_in_executor(self._executor, self._generate, request, loop)
+            finally:
+                self._current = None
+            self._stats["completed"] += 1
+    
+    def _generate(self, request: "_InferenceRequest", loop: asyncio.AbstractEventLoop):
+        """Run the generations of one request on the inference thread"""
+        try:
+            for index in range(request.n):
+                if request.cancelled.is_set():
+                    break
+                # Later samples only add their completion tokens: the prompt is evaluated once
+                usage = request.usage if index == 0 else {}
+                chunks = self._stream_completion(
+                    request.prompt, request.system_msgs, request.cancelled.is_set, request.profile, usage,
+                    restore_prefix=index == 0
+                )
+                for content in chunks:
+                    loop.call_soon_threadsafe(request.chunks.put_nowait, content)
+                if index > 0:
+                    request.usage["completion_tokens"] += usage.get("completion_tokens", 0)
+                if request.n > 1:
+                    loop.call_soon_threadsafe(request.chunks.put_nowait, _InferenceRequest.SAMPLE_END)
+            loop.call_soon_threadsafe(request.chunks.put_nowait, _InferenceRequest.DONE)
+        except Exception as e:
+            loop.call_soon_threadsafe(request.chunks.put_nowait, e)
+    
+    def _stream_completion(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]],
+        is_cancelled: Callable[[], bool],
+        profile: Optional[GenerationProfile] = None,
+        usage: Optional[Dict[str, int]] = None,
+        restore_prefix: bool = True
+    ) -> Iterator[str]:
+        """
+        Run one generation synchronously, yielding text chunks.
+        
+        Must only be called from the thread that owns the model. When
+        ``usage`` is given, it receives the prompt and completion token
+        counts of the generation as it progresses. ``restore_prefix=False``
+        skips loading a saved prefix state, so a repeated prompt is matched
+        against the one the previous generation left in the KV cache.
+        """
+        usage = usage if usage is not None else {}
+        params = self.generation_params(profile)
+        # Always explicit: create_completion would otherwise sample at llama.cpp's default (0.8)
+        options = {
+            "max_tokens": params["max_tokens"],
+            "temperature": params["temperature"],
+            "stop": list(self.stop_tokens) + params["stop"],
+        }
+        if params["json_schema"] is not None:
+            options["grammar"] = self._json_grammar(params["json_schema"])
+        # llama.cpp streams one chunk per generated token (plus role/finish chunks in chat mode)
+        usage["completion_tokens"] = 0
+        if self.prefix_cache_size <= 0:
+            full_prompt = self.prompt_template(prompt, system_msgs)
+            usage["prompt_tokens"] = len(self.llm.tokenize(full_prompt.encode("utf-8"), add_bos=False, special=True))
+            stream = self.llm.create_chat_completion(
+                messages=self._build_messages(prompt, system_msgs),
+                stream=True,
+                **options
+            )
+            for chunk in stream:
+                if is_cancelled():
+                    break
+                content = chunk["choices"][0]["delta"].get("content")
+                if content:
+                    usage["completion_tokens"] += 1
+                    yield content
+            return
+        
+        if restore_prefix:
+            tokens = self._restore_prefix(prompt, system_msgs)
+        else:
+            full_prompt = self.prompt_template(prompt, system_msgs)
+            tokens = self.llm.tokenize(full_prompt.encode("utf-8"), add_bos=False, special=True)
+        usage["prompt_tokens"] = len(tokens)
+        stream = self.llm.create_completion(
+            prompt=tokens,
+            stream=True,
+            **options
         )
-        # Extract text and clean up
-        # res = response["choices"][0]["text"].strip() # OLD
-        res = response["choices"][0]["message"]["content"].strip() # NEW
+        for chunk in stream:
+            if is_cancelled():
+                break
+            usage["completion_tokens"] += 1
+            text = chunk["choices"][0]["text"]
+            if text:
+                yield text
+    
+    def _json_grammar(self, schema: Dict[str, Any]):
+        """Get the GBNF grammar of a JSON schema, compiled once per schema"""
+        from llama_cpp import LlamaGrammar
+        key = json.dumps(schema, sort_keys=True)
+        grammar = self._grammars.get(key)
+        if grammar is None:
+            grammar = self._grammars[key] = LlamaGrammar.from_json_schema(key, verbose=False)
+        return grammar
+    
+    def _restore_prefix(self, prompt: str, system_msgs: Optional[List[str]]) -> List[int]:
+        """
+        Tokenize a prompt and load the saved state of its shared prefix.
+        
+        The prefix is the templated prompt up to where the user message
+        starts. The longest saved state matching it is loaded and the rest
+        of the prefix evaluated on top; the full prefix is then saved, so a
+        shorter saved prefix (e.g. the template header alone) does not hide
+        longer ones (with system messages).
+        
+        Returns:
+            Tokens of the full templated prompt
+        """
+        full_prompt = self.prompt_template(prompt, system_msgs)
+        tokens = self.llm.tokenize(full_prompt.encode("utf-8"), add_bos=False, special=True)
+        prefix_text = self.prompt_template(self._PREFIX_SENTINEL, system_msgs).split(self._PREFIX_SENTINEL)[0]
+        prefix_tokens = self.llm.tokenize(prefix_text.encode("utf-8"), add_bos=False, special=True)
+        
+        # The last prefix token may merge with the prompt text when tokenized together
+        n_prefix = 0
+        for a, b in zip(prefix_tokens, tokens[:-1]):
+            if a != b:
+                break
+            n_prefix += 1
+        if n_prefix == 0:
+            return tokens
+        prefix = tuple(tokens[:n_prefix])
         
-        return res
+        best = None
+        for key in self._prefix_states:
+            if len(key) <= n_prefix and (best is None or len(key) > len(best)) and prefix[:len(key)] == key:
+                best = key
+        
+        if best is not None:
+            self._prefix_states.move_to_end(best)
+            self.llm.load_state(self._prefix_states[best])
+            self._stats["prefix_hits"] += 1
+            self._stats["prefix_tokens_saved"] += len(best)
+            if len(best) == n_prefix:
+                return tokens
+            self.llm.eval(list(prefix[len(best):]))
+        else:
+            self._stats["prefix_misses"] += 1
+            self.llm.reset()
+            self.llm.eval(list(prefix))
+        self._prefix_states[prefix] = self.llm.save_state()
+        while len(self._prefix_states) > self.prefix_cache_size:
+            self._prefix_states.popitem(last=False)
+        return tokens
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get inference queue statistics"""
+        served = self._stats["completed"] + (1 if self._current else 0)
+        return {
+            "queue_depth": self._queued,
+            "max_queue_depth": self._stats["max_queue_depth"],
+            "busy": self._current is not None,
+            "completed": self._stats["completed"],
+            "cancelled": self._stats["cancelled"],
+            "rejected": self._stats["rejected"],
+            "avg_wait_time": self._stats["total_wait_time"] / served if served else 0.0,
+            "max_wait_time": self._stats["max_wait_time"],
+            "prefix_hits": self._stats["prefix_hits"],
+            "prefix_misses": self._stats["prefix_misses"],
+            "prefix_tokens_saved": self._stats["prefix_tokens_saved"],
+        }
+    
+    async def aclose(self):
+        """Stop the inference worker and fail any queued requests"""
+        if self._current is not None:
+            self._current.cancelled.set()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, _, request = self._queue.get_nowait()
+                request.queued = False
+                request.chunks.put_nowait(RuntimeError("LocalLLM was closed"))
+            self._queue = None
+            self._queued = 0
+        self._executor.shutdown(wait=False)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llama-inference")
+
+
+class _InferenceRequest:
+    """A chat completion waiting for the LocalLLM inference thread"""
+    
+    DONE = object()
+    SAMPLE_END = object()
+    
+    def __init__(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]],
+        priority: int,
+        profile: Optional[GenerationProfile] = None,
+        n: int = 1
+    ):
+        self.prompt = prompt
+        self.system_msgs = system_msgs
+        self.priority = priority
+        self.profile = profile
+        self.n = n  # Completions generated back to back (each followed by SAMPLE_END when > 1)
+        self.queued = False  # Waiting in the queue and counted against max_queue_size
+        self.enqueued_at = time.monotonic()
+        self.chunks: asyncio.Queue = asyncio.Queue()
+        self.cancelled = threading.Event()
+        self.usage: Dict[str, int] = {}  # Token counts written by the inference thread
 
 def get_llm(
     local_model_path: str = "./HF_MODELS/Meta-Llama-3-8B-Instruct-GGUF/Meta-Llama-3-8B-Instruct.Q3_K_M.gguf",
-    vllm_base_url: str = "http://localhost:8000/v1",
-    vllm_model: str = None
+    vllm_base_url: Union[str, List[str]] = "http://localhost:8000/v1",
+    vllm_model: str = None,
+    local_workers: int = 1,
+    vllm_weights: Optional[List[float]] = None,
+    vllm_context_window: Optional[int] = None
 ) -> BaseLLM:
     """
     Get the best available LLM with priority:
@@ -489,19 +1576,30 @@ def get_llm(
     2. VLLM - if server is running
     3. MockLLM - fallback for testing
     
+    The vLLM server is not contacted; use ``aget_llm`` to probe it and warm
+    the chosen backend up.
+    
     Args:
         local_model_path: Path to GGUF model file for LocalLLM
-        vllm_base_url: Base URL for vLLM server
+        vllm_base_url: Base URL for vLLM server, or a list of URLs to load-balance
         vllm_model: Model name for vLLM (optional)
+        local_workers: Number of llama.cpp worker processes (> 1 uses LocalLLMPool)
+        vllm_weights: Optional relative weights when several URLs are given
+        vllm_context_window: Context window of the vLLM model in tokens (None: unknown)
         
     Returns:
-        BaseLLM instance (LocalLLM, VLLM, or MockLLM)
+        BaseLLM instance (LocalLLM, LocalLLMPool, VLLM, RoutedLLM, or MockLLM)
     """
     import os
     
     # Priority 1: Try LocalLLM
     if os.path.exists(local_model_path):
         try:
+            if local_workers > 1:
+                from framework.provider.local_pool import LocalLLMPool
+                print(f"Initializing LocalLLMPool ({local_workers} workers) with model path:\n {local_model_path}")
+                return LocalLLMPool(model_path=local_model_path, n_workers=local_workers)
+            
             print(f"Initializing LocalLLM with model path:\n {local_model_path}")
             
             return LocalLLM(model_path=local_model_path)
@@ -512,8 +1610,14 @@ def get_llm(
     # Priority 2: Try VLLM
     try:
         import aiohttp
+        base_urls = [vllm_base_url] if isinstance(vllm_base_url, str) else list(vllm_base_url)
+        if len(base_urls) > 1:
+            from framework.provider.router import RoutedLLM
+            return RoutedLLM.from_urls(
+                base_urls, weights=vllm_weights, model=vllm_model, context_window=vllm_context_window
+            )
         # Try to create VLLM instance (will fail if server not running)
-        vllm = VLLM(base_url=vllm_base_url, model=vllm_model)
+        vllm = VLLM(base_url=base_urls[0], model=vllm_model, context_window=vllm_context_window)
         # Test connection with a simple request (in a non-blocking way)
         # We'll just return it and let it fail at first use if server is down
         return vllm
@@ -525,3 +1629,111 @@ def get_llm(
     print("Using MockLLM (no local model or vLLM server available)")
     return MockLLM()
 
+
+
+# Backends chosen by aget_llm: arguments -> (monotonic time, kind, live vLLM URLs)
+_llm_selections: Dict[Tuple[Any, ...], Tuple[float, str, List[str]]] = {}
+
+
+async def aget_llm(
+    local_model_path: str = "./HF_MODELS/Meta-Llama-3-8B-Instruct-GGUF/Meta-Llama-3-8B-Instruct.Q3_K_M.gguf",
+    vllm_base_url: Union[str, List[str]] = "http://localhost:8000/v1",
+    vllm_model: str = None,
+    local_workers: int = 1,
+    vllm_weights: Optional[List[float]] = None,
+    vllm_context_window: Optional[int] = None,
+    probe_timeout: float = 2.0,
+    warmup_timeout: Optional[float] = 120.0,
+    selection_ttl: float = 300.0
+) -> BaseLLM:
+    """
+    Get the best available LLM, checked and warmed up, with the priority of ``get_llm``.
+    
+    The local model is loaded in a thread while every vLLM URL is probed
+    concurrently, each with ``probe_timeout``, so a dead server costs
+    seconds instead of a stalled first request. Only URLs that answered are
+    routed to. The chosen backend is warmed up before it is returned, and
+    falls back to MockLLM if it does not answer.
+    
+    The selection is cached for ``selection_ttl`` seconds per set of
+    arguments, so later calls skip the probes (a new instance is still
+    created, since callers close the backend they are given).
+    
+    Args:
+        local_model_path: Path to GGUF model file for LocalLLM
+        vllm_base_url: Base URL for vLLM server, or a list of URLs to load-balance
+        vllm_model: Model name for vLLM (optional)
+        local_workers: Number of llama.cpp worker processes (> 1 uses LocalLLMPool)
+        vllm_weights: Optional relative weights when several URLs are given
+        vllm_context_window: Context window of the vLLM model in tokens (None: unknown)
+        probe_timeout: Seconds each vLLM server has to answer its health probe
+        warmup_timeout: Seconds the chosen backend has to answer its warmup
+        selection_ttl: Seconds a selection is reused without probing
+    
+    Returns:
+        BaseLLM instance (LocalLLM, LocalLLMPool, VLLM, RoutedLLM, or MockLLM)
+    """
+    base_urls = [vllm_base_url] if isinstance(vllm_base_url, str) else list(vllm_base_url)
+    key = (local_model_path, tuple(base_urls), vllm_model, local_workers)
+    
+    async def load_local() -> Optional[BaseLLM]:
+        if not os.path.exists(local_model_path):
+            return None
+        try:
+            if local_workers > 1:
+                from framework.provider.local_pool import LocalLLMPool
+                print(f"Initializing LocalLLMPool ({local_workers} workers) with model path:\n {local_model_path}")
+                llm = LocalLLMPool(model_path=local_model_path, n_workers=local_workers)
+            else:
+                print(f"Initializing LocalLLM with model path:\n {local_model_path}")
+                # Loading maps gigabytes of weights: keep the event loop (and the probes) running
+                llm = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: LocalLLM(model_path=local_model_path)
+                )
+        except Exception as e:
+            print(f"Warning: Could not initialize LocalLLM: {e}")
+            return None
+        if await llm.warmup(timeout=warmup_timeout):
+            return llm
+        print("Warning: LocalLLM did not answer its warmup generation")
+        await llm.aclose()
+        return None
+    
+    async def probe_vllm(url: str) -> bool:
+        vllm = VLLM(base_url=url, model=vllm_model)
+        try:
+            return await vllm.health_check(timeout=probe_timeout)
+        finally:
+            await vllm.aclose()
+    
+    selection = _llm_selections.get(key)
+    if selection is not None and time.monotonic() - selection[0] < selection_ttl:
+        _, kind, live_urls = selection
+        local = await load_local() if kind == "local" else None
+    else:
+        local, *alive = await asyncio.gather(load_local(), *[probe_vllm(url) for url in base_urls])
+        live_urls = [url for url, ok in zip(base_urls, alive) if ok]
+        kind = "local" if local is not None else "vllm" if live_urls else "mock"
+    
+    llm: Optional[BaseLLM] = local
+    if llm is None and kind == "vllm":
+        if len(live_urls) > 1:
+            from framework.provider.router import RoutedLLM
+            weights = None
+            if vllm_weights:
+                weights = [weight for url, weight in zip(base_urls, vllm_weights) if url in live_urls]
+            llm = RoutedLLM.from_urls(
+                live_urls, weights=weights, model=vllm_model, context_window=vllm_context_window
+            )
+        else:
+            llm = VLLM(base_url=live_urls[0], model=vllm_model, context_window=vllm_context_window)
+        if not await llm.warmup(timeout=warmup_timeout):
+            print(f"Warning: vLLM at {', '.join(live_urls)} did not answer its warmup generation")
+            await llm.aclose()
+            llm = None
+    
+    if llm is None:
+        print("Using MockLLM (no local model or vLLM server available)")
+        llm, kind = MockLLM(), "mock"
+    _llm_selections[key] = (time.monotonic(), kind, live_urls)
+    return llm
@@ -2,13 +2,43 @@
 from typing import List, Dict, Optional, Any
 from framework.planning.plan import Plan
 from framework.planning.task import Task, TaskStatus
-from framework.llm import BaseLLM
+from framework.llm import BaseLLM, GenerationProfile
+from framework.provider.base import llm_action
+from framework.utils.code_extractor import extract_json
 import re
 
 
+# Shape of the goal breakdown; backends that support it constrain decoding to it
+TASK_LIST_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "tasks": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "description": {"type": "string"},
+                    "priority": {"type": "integer", "minimum": 1, "maximum": 10},
+                    "estimated_hours": {"type": "number"},
+                    "dependencies": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["id", "description"],
+            },
+        },
+    },
+    "required": ["tasks"],
+}
+
+
 class Planner:
     """Planner for creating and managing task plans"""
     
+    # Generation settings of the goal breakdown call (a short JSON task list)
+    BREAKDOWN_PROFILE = GenerationProfile(max_tokens=1024, json_schema=TASK_LIST_SCHEMA)
+    # Generation settings of the plan update call
+    UPDATE_PROFILE = GenerationProfile(max_tokens=512)
+    
     def __init__(self, llm: Optional[BaseLLM] = None):
         """
         Initialize Planner
@@ -19,13 +49,19 @@ class Planner:
         self.llm = llm
         self.plans: Dict[str, Plan] = {}
     
-    async def create_plan(self, goal: str, plan_id: str = "") -> Plan:
+    async def create_plan(
+        self,
+        goal: str,
+        plan_id: str = "",
+        profile: Optional[GenerationProfile] = None
+    ) -> Plan:
         """
         Create a new plan from a goal
         
         Args:
             goal: Goal description
             plan_id: Optional plan ID
+            profile: Optional generation settings for the breakdown call
             
         Returns:
             Created plan
@@ -34,7 +70,7 @@ class Planner:
         
         if self.llm:
             # Use LLM to break down goal into tasks
-            tasks = await self._break_down_goal(goal)
+            tasks = await self._break_down_goal(goal, profile)
             for task_data in tasks:
                 task = Task(
                     id=task_data.get("id", f"task_{len(plan.tasks) + 1}"),
@@ -58,12 +94,17 @@ class Planner:
         self.plans[plan.plan_id] = plan
         return plan
     
-    async def _break_down_goal(self, goal: str) -> List[Dict[str, Any]]:
+    async def _break_down_goal(
+        self,
+        goal: str,
+        profile: Optional[GenerationProfile] = None
+    ) -> List[Dict[str, Any]]:
         """
         Break down goal into tasks using LLM
         
         Args:
             goal: Goal description
+            profile: Optional generation settings, applied over BREAKDOWN_PROFILE
             
         Returns:
             List of task dictionaries
@@ -78,18 +119,52 @@ For each task, provide:
 
 Goal: {goal}
 
-Format the response as a list of tasks, one per line, or as a structured list.
-For example:
-- task_1: Description (priority: 8, hours: 2)
-- task_2: Description (priority: 6, hours: 1, depends on: task_1)
+Respond with JSON only, for example:
+{{"tasks": [
+  {{"id": "task_1", "description": "Description", "priority": 8, "estimated_hours": 2, "dependencies": []}},
+  {{"id": "task_2", "description": "Description", "priority": 6, "estimated_hours": 1, "dependencies": ["task_1"]}}
+]}}
 """
         
         try:
-            response = await self.llm.aask(prompt)
-            return self._parse_task_list(response)
+            with llm_action("Planner"):
+                response = await self.llm.aask(prompt, profile=self.BREAKDOWN_PROFILE.merged(profile))
+            # Constrained backends return valid JSON; free-form text goes through the line parser
+            return self._parse_task_json(response) or self._parse_task_list(response)
         except Exception:
             return self._basic_breakdown(goal)
     
+    def _parse_task_json(self, response: str) -> List[Dict[str, Any]]:
+        """Parse a JSON task list response, returning [] if it is not one"""
+        data = extract_json(response)
+        if isinstance(data, dict):
+            data = data.get("tasks")
+        if not isinstance(data, list):
+            return []
+        
+        tasks = []
+        for item in data:
+            if not isinstance(item, dict) or not item.get("description"):
+                continue
+            try:
+                priority = int(item.get("priority", 5))
+            except (TypeError, ValueError):
+                priority = 5
+            try:
+                hours = item.get("estimated_hours")
+                estimated_hours = float(hours) if hours is not None else None
+            except (TypeError, ValueError):
+                estimated_hours = None
+            dependencies = item.get("dependencies") or []
+            tasks.append({
+                "id": str(item.get("id") or f"task_{len(tasks) + 1}"),
+                "description": str(item["description"]).strip(),
+                "priority": priority,
+                "estimated_hours": estimated_hours,
+                "dependencies": [str(d) for d in dependencies] if isinstance(dependencies, list) else []
+            })
+        return tasks
+    
     def _parse_task_list(self, response: str) -> List[Dict[str, Any]]:
         """Parse LLM response into task list"""
         tasks = []
@@ -235,7 +310,8 @@ Suggest:
 4. Priority changes
 """
             try:
-                response = await self.llm.aask(prompt)
+                with llm_action("Planner"):
+                    response = await self.llm.aask(prompt, profile=self.UPDATE_PROFILE)
                 # Parse and apply updates (simplified)
                 # In production, use more sophisticated parsing
             except Exception:
@@ -1,14 +1,17 @@
 """Action for writing task lists"""
 from typing import List
 from framework.action import Action
+from framework.llm import GenerationProfile
 from framework.schema import Message, ActionOutput
-from framework.planning.planner import Planner
+from framework.planning.planner import Planner, TASK_LIST_SCHEMA
 from framework.planning.task import Task
 
 
 class WriteTasks(Action):
     """Action to write a task list from PRD and design"""
     
+    generation_profile = GenerationProfile(max_tokens=1024, json_schema=TASK_LIST_SCHEMA)
+    
     def __init__(self, llm=None):
         super().__init__(name="WriteTasks", llm=llm)
         self.planner = Planner(llm=llm)
@@ -35,11 +38,22 @@ class WriteTasks(Action):
                 elif msg.cause_by == "WriteDesign":
                     design = msg.content
         
+        # Fit PRD and design into the prompt budget (the design matters most for tasks)
+        builder = self.context_builder()
+        builder.add("design", design, priority=10)
+        builder.add("prd", prd, priority=5)
+        fitted = await builder.build()
+        prd, design = fitted["prd"], fitted["design"]
+        
         # Combine PRD and design for goal
         goal = f"Implement project based on PRD and design:\n\nPRD:\n{prd}\n\nDesign:\n{design}"
         
         # Create plan
-        plan = await self.planner.create_plan(goal, plan_id=f"tasks_{len(self.planner.plans) + 1}")
+        plan = await self.planner.create_plan(
+            goal,
+            plan_id=f"tasks_{len(self.planner.plans) + 1}",
+            profile=self._call_profile()
+        )
         
         # Format task list
         task_list = f"# Task List\n\n"
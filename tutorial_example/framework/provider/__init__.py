@@ -0,0 +1,20 @@
+"""LLM providers: backend wrappers and additional backends"""
+from framework.provider.base import LLMWrapper, unwrap, llm_caller, current_caller, llm_action, current_action
+from framework.provider.cache import CachedLLM, LRUCache, SQLiteCacheStore, response_key
+from framework.provider.singleflight import SingleFlightLLM
+from framework.provider.local_pool import LocalLLMPool
+from framework.provider.router import RoutedLLM, Endpoint
+from framework.provider.limiter import LimitedLLM, TokenBucket
+from framework.provider.resilience import ResilientLLM, CircuitBreaker
+from framework.provider.simulated import SimulatedLLM
+from framework.provider.cassette import RecordingLLM, ReplayLLM, request_key
+from framework.provider.tiering import TieredLLM, CascadeLLM, DEFAULT_TIER_RULES
+
+__all__ = [
+    'LLMWrapper', 'unwrap', 'llm_caller', 'current_caller', 'llm_action', 'current_action',
+    'CachedLLM', 'LRUCache', 'SQLiteCacheStore', 'response_key', 'SingleFlightLLM',
+    'LocalLLMPool', 'RoutedLLM', 'Endpoint',
+    'LimitedLLM', 'TokenBucket', 'ResilientLLM', 'CircuitBreaker',
+    'SimulatedLLM', 'RecordingLLM', 'ReplayLLM', 'request_key',
+    'TieredLLM', 'CascadeLLM', 'DEFAULT_TIER_RULES'
+]
@@ -0,0 +1,124 @@
+"""Base class for LLMs that wrap another backend, and request context"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator, List, Optional
+from framework.llm import BaseLLM, GenerationProfile
+
+
+# Who is calling the LLM, as "project/role" segments (set by Team and Role)
+_llm_caller: ContextVar[str] = ContextVar("llm_caller", default="")
+
+# Action making the LLM call (set by Action and Planner)
+_llm_action: ContextVar[str] = ContextVar("llm_action", default="")
+
+
+@contextmanager
+def llm_caller(name: str) -> Iterator[str]:
+    """
+    Attribute LLM calls made inside the block to a caller
+    
+    Nested blocks append a segment, e.g. ``"my_project/Engineer"``.
+    
+    Args:
+        name: Caller name (project id or role name)
+    """
+    outer = _llm_caller.get()
+    caller = f"{outer}/{name}" if outer else name
+    token = _llm_caller.set(caller)
+    try:
+        yield caller
+    finally:
+        _llm_caller.reset(token)
+
+
+def current_caller() -> str:
+    """Get the caller of the LLM call being made (empty if unknown)"""
+    return _llm_caller.get()
+
+
+@contextmanager
+def llm_action(name: str) -> Iterator[str]:
+    """
+    Attribute LLM calls made inside the block to an action
+    
+    Unlike ``llm_caller``, nested blocks replace the outer action.
+    
+    Args:
+        name: Action name (e.g. "WriteCode")
+    """
+    token = _llm_action.set(name)
+    try:
+        yield name
+    finally:
+        _llm_action.reset(token)
+
+
+def current_action() -> str:
+    """Get the action making the LLM call (empty if unknown)"""
+    return _llm_action.get()
+
+
+class LLMWrapper(BaseLLM):
+    """
+    LLM that delegates to another backend.
+    
+    Subclasses override the calls they need to intercept; everything else,
+    including attributes such as ``model`` or ``temperature``, is forwarded
+    to the wrapped backend so wrappers can be stacked transparently.
+    """
+    
+    def __init__(self, llm: BaseLLM):
+        """
+        Initialize the wrapper
+        
+        Args:
+            llm: Backend to wrap
+        """
+        self.llm = llm
+    
+    async def aask(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
+        return await self.llm.aask(prompt, system_msgs, profile=profile)
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        async for chunk in self.llm.astream(prompt, system_msgs, profile=profile):
+            yield chunk
+    
+    async def asample(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        n: int = 2,
+        profile: Optional[GenerationProfile] = None
+    ) -> List[str]:
+        # Forwarded so a backend's batched sampling is not split into n calls
+        return await self.llm.asample(prompt, system_msgs, n=n, profile=profile)
+    
+    async def warmup(self, timeout: Optional[float] = 60.0) -> bool:
+        # Straight to the backend: the warmup generation is not cached, recorded or limited
+        return await self.llm.warmup(timeout)
+    
+    async def aclose(self):
+        await self.llm.aclose()
+    
+    def __getattr__(self, name: str):
+        # Only called for attributes not found on the wrapper itself
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+def unwrap(llm: BaseLLM) -> BaseLLM:
+    """Get the innermost backend of a stack of wrappers"""
+    while isinstance(llm, LLMWrapper):
+        llm = llm.llm
+    return llm
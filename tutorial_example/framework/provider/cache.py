@@ -0,0 +1,378 @@
+"""Exact-match LLM response cache with an in-memory LRU and an on-disk tier"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from framework.llm import BaseLLM, GenerationProfile, LLMResponse
+from framework.provider.base import LLMWrapper, unwrap
+
+
+def response_key(
+    llm: BaseLLM,
+    prompt: str,
+    system_msgs: Optional[List[str]] = None,
+    profile: Optional[GenerationProfile] = None
+) -> str:
+    """
+    Hash everything that determines a backend's response to a request
+    
+    Args:
+        llm: Backend (wrappers are unwrapped)
+        prompt: The input text prompt
+        system_msgs: Optional list of system messages
+        profile: Optional generation settings of the call
+    
+    Returns:
+        Hex digest of the backend type, model, messages and generation settings
+    """
+    backend = unwrap(llm)
+    params = backend.generation_params(profile)
+    payload = json.dumps([
+        type(backend).__name__,
+        getattr(backend, "model", None),
+        list(system_msgs or []),
+        prompt,
+        params["temperature"],
+        params["max_tokens"],
+        params["stop"],
+        params["json_schema"],
+    ], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Bounded in-memory mapping that evicts the least recently used entry"""
+    
+    def __init__(self, max_entries: int = 256):
+        """
+        Initialize LRU cache
+        
+        Args:
+            max_entries: Maximum number of entries kept
+        """
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get a value and mark it as recently used"""
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: str):
+        """Store a value, evicting the oldest entries if needed"""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+    
+    def clear(self):
+        """Remove all entries"""
+        self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCacheStore:
+    """
+    Persistent response store with size-based LRU eviction.
+    
+    Reads do not commit: access times are kept in memory and written in
+    batches (with the next write, every ``touch_batch`` reads, or on
+    ``flush``/``close``). The async ``aget``/``aset`` run the queries on a
+    dedicated thread so disk I/O never blocks the event loop.
+    """
+    
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, touch_batch: int = 64):
+        """
+        Initialize SQLite store
+        
+        Args:
+            path: Path of the SQLite database file
+            max_bytes: Maximum total size of stored responses
+            touch_batch: Reads whose access times are buffered before a write
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.touch_batch = touch_batch
+        self._touched: Dict[str, float] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed)")
+        self._conn.commit()
+        self.total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get a stored response and refresh its access time"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.touch_batch:
+                self._write_touched()
+                self._conn.commit()
+            return row[0]
+    
+    def _write_touched(self):
+        """Write the buffered access times (the caller commits)"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()]
+            )
+            self._touched.clear()
+    
+    def flush(self):
+        """Write the buffered access times to disk"""
+        with self._lock:
+            self._write_touched()
+            self._conn.commit()
+    
+    def _run(self, fn, *args):
+        """Run a store method on the store's I/O thread"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-cache")
+        return asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+    
+    async def aget(self, key: str) -> Optional[str]:
+        """Async ``get`` run off the event loop"""
+        return await self._run(self.get, key)
+    
+    async def aset(self, key: str, value: str):
+        """Async ``set`` run off the event loop"""
+        await self._run(self.set, key, value)
+    
+    async def aclear(self):
+        """Async ``clear`` run off the event loop"""
+        await self._run(self.clear)
+    
+    def set(self, key: str, value: str):
+        """Store a response, evicting least recently used entries over the size limit"""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if old is not None:
+                self.total_bytes -= old[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time())
+            )
+            self.total_bytes += size
+            self._write_touched()
+            self._evict()
+            self._conn.commit()
+    
+    def _evict(self):
+        """Delete the oldest entries until the store fits its size limit"""
+        while self.total_bytes > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self.total_bytes = 0
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self.total_bytes -= row[1]
+    
+    def count(self) -> int:
+        """Number of stored responses"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    
+    def clear(self):
+        """Remove all stored responses"""
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self.total_bytes = 0
+    
+    def close(self):
+        """Write buffered access times and close the database connection"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            self._write_touched()
+            self._conn.commit()
+            self._conn.close()
+
+
+class CachedLLM(LLMWrapper):
+    """
+    Caching wrapper around any LLM.
+    
+    Responses are keyed by a hash of the backend, model, system messages,
+    prompt, temperature and max_tokens. Lookups go to the in-memory LRU
+    first, then to the optional on-disk store. Cache hits are returned as
+    ``LLMResponse`` with ``cached=True`` so cost tracking can skip them.
+    """
+    
+    def __init__(
+        self,
+        llm: BaseLLM,
+        max_entries: int = 256,
+        cache_path: Optional[str] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+        max_temperature: Optional[float] = None
+    ):
+        """
+        Initialize the cache
+        
+        Args:
+            llm: Backend to cache
+            max_entries: Maximum entries in the in-memory LRU
+            cache_path: SQLite file for the persistent tier (None = memory only)
+            max_disk_bytes: Size limit of the persistent tier
+            max_temperature: Bypass the cache for calls sampled above this
+                temperature (None caches regardless of temperature)
+        """
+        super().__init__(llm)
+        self.memory = LRUCache(max_entries)
+        self.store = SQLiteCacheStore(cache_path, max_disk_bytes) if cache_path else None
+        self.max_temperature = max_temperature
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+    
+    def cache_key(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
+        """Compute the cache key of a request"""
+        return response_key(self.llm, prompt, system_msgs, profile)
+    
+    def _is_cacheable(self, profile: Optional[GenerationProfile] = None) -> bool:
+        """Check whether the call's sampling settings allow caching"""
+        if self.max_temperature is None:
+            return True
+        temperature = unwrap(self.llm).generation_params(profile)["temperature"]
+        return temperature is None or temperature <= self.max_temperature
+    
+    async def _lookup(self, key: str) -> Optional[str]:
+        """Look a key up in the memory tier, then the disk tier"""
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.store is not None:
+            value = await self.store.aget(key)
+            if value is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self.memory.set(key, value)
+                return value
+        self.misses += 1
+        return None
+    
+    async def _save(self, key: str, value: str):
+        """Store a response in both tiers"""
+        self.memory.set(key, value)
+        if self.store is not None:
+            await self.store.aset(key, value)
+    
+    async def aask(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
+        if not self._is_cacheable(profile):
+            self.bypassed += 1
+            return await self.llm.aask(prompt, system_msgs, profile=profile)
+        
+        key = self.cache_key(prompt, system_msgs, profile)
+        cached = await self._lookup(key)
+        if cached is not None:
+            return LLMResponse(cached, cached=True)
+        
+        response = await self.llm.aask(prompt, system_msgs, profile=profile)
+        await self._save(key, str(response).strip())
+        return response
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        if not self._is_cacheable(profile):
+            self.bypassed += 1
+            async for chunk in self.llm.astream(prompt, system_msgs, profile=profile):
+                yield chunk
+            return
+        
+        key = self.cache_key(prompt, system_msgs, profile)
+        cached = await self._lookup(key)
+        if cached is not None:
+            yield LLMResponse(cached, cached=True)
+            return
+        
+        # Only complete streams are cached
+        chunks = []
+        async for chunk in self.llm.astream(prompt, system_msgs, profile=profile):
+            chunks.append(chunk)
+            yield chunk
+        # Stored like aask responses, which backends return stripped
+        await self._save(key, "".join(chunks).strip())
+    
+    async def aclose(self):
+        if self.store is not None:
+            store, self.store = self.store, None
+            # Joins the I/O thread and writes buffered access times
+            await asyncio.get_running_loop().run_in_executor(None, store.close)
+        await self.llm.aclose()
+    
+    def clear(self):
+        """Remove all cached responses (blocking: use ``aclear`` inside the event loop)"""
+        self.memory.clear()
+        if self.store is not None:
+            self.store.clear()
+    
+    async def aclear(self):
+        """Remove all cached responses, clearing the disk tier on the store's I/O thread"""
+        self.memory.clear()
+        if self.store is not None:
+            await self.store.aclear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.hits - self.disk_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_entries": self.store.count() if self.store is not None else 0,
+            "disk_bytes": self.store.total_bytes if self.store is not None else 0,
+        }
@@ -0,0 +1,272 @@
+"""Record LLM traffic to a JSONL cassette and replay it deterministically"""
+from collections import deque
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Union
+import asyncio
+import hashlib
+import json
+import re
+import time
+from framework.llm import BaseLLM, GenerationProfile, UsageMeter
+from framework.provider.base import LLMWrapper
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def request_key(
+    prompt: str,
+    system_msgs: Optional[List[str]] = None,
+    profile: Optional[GenerationProfile] = None,
+    n: Optional[int] = None
+) -> str:
+    """
+    Hash a request after normalizing whitespace
+    
+    Recorded and replayed requests match when they only differ in
+    whitespace, independently of the backend that served them. ``n`` is
+    the number of responses of an ``asample`` call (None for single calls).
+    """
+    normalized = [_WHITESPACE.sub(" ", text).strip() for text in list(system_msgs or []) + [prompt]]
+    if profile is not None and profile.to_dict():
+        normalized.append(profile.to_dict())
+    if n is not None:
+        normalized.append({"n": n})
+    payload = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class RecordingLLM(LLMWrapper):
+    """
+    Wrapper that appends every request/response pair to a cassette.
+    
+    Each line of the JSONL cassette holds the request key, the response,
+    the total latency and the time to first chunk. A best-of-N ``asample``
+    call is one entry holding all its responses. Prompts are only stored
+    with ``include_prompts=True`` to keep cassettes compact.
+    """
+    
+    def __init__(self, llm: BaseLLM, path: str, include_prompts: bool = False):
+        """
+        Initialize the recorder
+        
+        Args:
+            llm: Backend whose traffic is recorded
+            path: Cassette file (appended to if it exists)
+            include_prompts: Also store system messages and prompts
+        """
+        super().__init__(llm)
+        self.path = Path(path)
+        self.include_prompts = include_prompts
+        self.recorded = 0
+        self._file = None
+    
+    def _write(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]],
+        profile: Optional[GenerationProfile],
+        response: Union[str, List[str]],
+        latency: float,
+        first_token: Optional[float],
+        n: Optional[int] = None
+    ):
+        """Append one request/response pair (or sample set when ``n`` is given) to the cassette"""
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        entry = {
+            "key": request_key(prompt, system_msgs, profile, n),
+            "response": response,
+            "latency": round(latency, 4),
+            "first_token": round(first_token if first_token is not None else latency, 4),
+        }
+        if self.include_prompts:
+            entry["system_msgs"] = list(system_msgs or [])
+            entry["prompt"] = prompt
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.recorded += 1
+    
+    async def aask(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
+        start = time.monotonic()
+        response = await self.llm.aask(prompt, system_msgs, profile=profile)
+        self._write(prompt, system_msgs, profile, str(response), time.monotonic() - start, None)
+        return response
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        start = time.monotonic()
+        first_token = None
+        chunks = []
+        async for chunk in self.llm.astream(prompt, system_msgs, profile=profile):
+            if first_token is None:
+                first_token = time.monotonic() - start
+            chunks.append(chunk)
+            yield chunk
+        # Only complete responses are recorded
+        self._write(prompt, system_msgs, profile, "".join(chunks), time.monotonic() - start, first_token)
+    
+    async def asample(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        n: int = 2,
+        profile: Optional[GenerationProfile] = None
+    ) -> List[str]:
+        start = time.monotonic()
+        samples = await self.llm.asample(prompt, system_msgs, n=n, profile=profile)
+        responses = [str(sample) for sample in samples]
+        self._write(prompt, system_msgs, profile, responses, time.monotonic() - start, None, n=n)
+        return samples
+    
+    async def aclose(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        await self.llm.aclose()
+
+
+class ReplayLLM(BaseLLM):
+    """
+    Backend that answers from a recorded cassette.
+    
+    Requests are matched by ``request_key``. A request recorded several
+    times is answered with its recordings in order, repeating the last one.
+    With ``replay_latency`` the recorded time to first chunk and total
+    latency are reproduced, so end-to-end runs keep their real timing while
+    ``get_stats()["model_time"]`` tells model time apart from orchestration
+    overhead.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        replay_latency: bool = False,
+        time_scale: float = 1.0,
+        chunk_size: int = 64,
+        fallback: Optional[BaseLLM] = None
+    ):
+        """
+        Initialize the replayer
+        
+        Args:
+            path: Cassette file written by RecordingLLM
+            replay_latency: Sleep for the recorded latencies
+            time_scale: Multiplier for replayed latencies
+            chunk_size: Number of characters per streamed chunk
+            fallback: Backend for requests missing from the cassette
+                (None raises an error instead)
+        """
+        self.path = Path(path)
+        self.replay_latency = replay_latency
+        self.time_scale = time_scale
+        self.chunk_size = chunk_size
+        self.fallback = fallback
+        self._entries: Dict[str, Deque[Dict[str, Any]]] = {}
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], deque()).append(entry)
+        self._stats = {"hits": 0, "misses": 0, "model_time": 0.0}
+    
+    def _lookup(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]],
+        profile: Optional[GenerationProfile],
+        n: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        entries = self._entries.get(request_key(prompt, system_msgs, profile, n))
+        if not entries:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return entries.popleft() if len(entries) > 1 else entries[0]
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        entry = self._lookup(prompt, system_msgs, profile)
+        if entry is None:
+            if self.fallback is None:
+                raise RuntimeError(
+                    f"Request not found in cassette {self.path} (key {request_key(prompt, system_msgs, profile)})"
+                )
+            async for chunk in self.fallback.astream(prompt, system_msgs, profile=profile):
+                yield chunk
+            return
+        
+        response = entry["response"]
+        first_token = entry["first_token"] * self.time_scale
+        latency = entry["latency"] * self.time_scale
+        self._stats["model_time"] += latency
+        if self.replay_latency:
+            await asyncio.sleep(first_token)
+        
+        chunks = [response[start:start + self.chunk_size] for start in range(0, len(response), self.chunk_size)]
+        # Spread the rest of the recorded latency over the remaining chunks
+        gap = max(0.0, latency - first_token) / max(1, len(chunks) - 1)
+        # Token counts are not recorded, so replayed usage is estimated
+        meter = UsageMeter("replay", prompt, system_msgs)
+        try:
+            for index, chunk in enumerate(chunks):
+                if index and self.replay_latency:
+                    await asyncio.sleep(gap)
+                meter.chunk(chunk)
+                yield chunk
+        finally:
+            meter.finish()
+    
+    async def asample(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        n: int = 2,
+        profile: Optional[GenerationProfile] = None
+    ) -> List[str]:
+        entry = self._lookup(prompt, system_msgs, profile, n)
+        if entry is None:
+            if self.fallback is None:
+                raise RuntimeError(
+                    f"Sample request not found in cassette {self.path} "
+                    f"(key {request_key(prompt, system_msgs, profile, n)})"
+                )
+            return await self.fallback.asample(prompt, system_msgs, n=n, profile=profile)
+        
+        latency = entry["latency"] * self.time_scale
+        self._stats["model_time"] += latency
+        if self.replay_latency:
+            await asyncio.sleep(latency)
+        samples = list(entry["response"])
+        meter = UsageMeter("replay", prompt, system_msgs)
+        meter.chunk("".join(samples))
+        meter.finish()
+        return samples
+    
+    async def warmup(self, timeout: Optional[float] = 60.0) -> bool:
+        # Recorded responses need no warming; only the fallback backend does
+        if self.fallback is not None:
+            return await self.fallback.warmup(timeout)
+        return True
+    
+    async def aclose(self):
+        if self.fallback is not None:
+            await self.fallback.aclose()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get replay statistics (``model_time`` is the recorded latency served)"""
+        return {**self._stats, "recorded_requests": len(self._entries)}
@@ -0,0 +1,240 @@
+"""Admission control for LLM backends: concurrency limits and rate limiting"""
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+import asyncio
+import time
+from framework.llm import BaseLLM, GenerationProfile
+from framework.provider.base import LLMWrapper, current_caller
+
+
+class TokenBucket:
+    """Token bucket refilled at a constant rate"""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize token bucket
+        
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (default: one second worth of tokens)
+        """
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    async def acquire(self, amount: float = 1.0):
+        """Wait until ``amount`` tokens are available and take them"""
+        # A request larger than the bucket would never fit; let it drain the bucket
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class LimitedLLM(LLMWrapper):
+    """
+    Admission control wrapper around any LLM.
+    
+    At most ``max_in_flight`` calls reach the backend at once. Waiting calls
+    are queued per caller (role or project, see ``llm_caller``) and
+    admitted round-robin across callers, so one busy project cannot starve
+    the others. Optional token buckets cap requests per second and estimated
+    tokens per second.
+    """
+    
+    def __init__(
+        self,
+        llm: BaseLLM,
+        max_in_flight: int = 8,
+        requests_per_second: Optional[float] = None,
+        tokens_per_second: Optional[float] = None,
+        burst_requests: Optional[float] = None,
+        burst_tokens: Optional[float] = None,
+        estimated_output_tokens: int = 256,
+        fair_by: str = "role"
+    ):
+        """
+        Initialize the limiter
+        
+        Args:
+            llm: Backend to protect
+            max_in_flight: Maximum concurrent calls to the backend
+            requests_per_second: Optional request rate limit
+            tokens_per_second: Optional estimated token rate limit
+            burst_requests: Request bucket size (default: one second of requests)
+            burst_tokens: Token bucket size (default: one second of tokens)
+            estimated_output_tokens: Output tokens assumed per call for the token budget
+            fair_by: Queue callers per "role" (project and role) or per "project"
+        """
+        if fair_by not in ("role", "project"):
+            raise ValueError(f"fair_by must be 'role' or 'project', got {fair_by!r}")
+        super().__init__(llm)
+        self.max_in_flight = max_in_flight
+        self.request_bucket = TokenBucket(requests_per_second, burst_requests) if requests_per_second else None
+        self.token_bucket = TokenBucket(tokens_per_second, burst_tokens) if tokens_per_second else None
+        self.estimated_output_tokens = estimated_output_tokens
+        self.fair_by = fair_by
+        
+        self.in_flight = 0
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._caller_stats: Dict[str, Dict[str, float]] = {}
+        self._stats = {"admitted": 0, "total_wait_time": 0.0, "max_wait_time": 0.0, "max_queue_depth": 0}
+    
+    def _queue_key(self) -> str:
+        """Fair-queueing key of the current caller"""
+        caller = current_caller() or "default"
+        if self.fair_by == "project":
+            return caller.split("/", 1)[0]
+        return caller
+    
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough token estimate (about four characters per token)"""
+        return len(text) // 4 + 1
+    
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+    
+    def has_capacity(self) -> bool:
+        """Check whether a call would be admitted without queueing"""
+        return self.in_flight < self.max_in_flight and not self._waiters
+    
+    async def _acquire_slot(self, key: str):
+        """Wait for an in-flight slot, queued fairly with other callers"""
+        if self.has_capacity():
+            self.in_flight += 1
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, deque()).append(future)
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self.queue_depth)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we were cancelled: hand it on
+                self._release_slot()
+            else:
+                waiters = self._waiters.get(key)
+                if waiters and future in waiters:
+                    waiters.remove(future)
+                    if not waiters:
+                        del self._waiters[key]
+            raise
+    
+    def _release_slot(self):
+        """Free a slot and admit the next caller in round-robin order"""
+        self.in_flight -= 1
+        while self.in_flight < self.max_in_flight and self._waiters:
+            key, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(key)
+            else:
+                del self._waiters[key]
+            if future.cancelled():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+    
+    async def _admit(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]],
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
+        """Wait for admission; returns the queue key the call was admitted under"""
+        key = self._queue_key()
+        start = time.monotonic()
+        await self._acquire_slot(key)
+        try:
+            if self.request_bucket is not None:
+                await self.request_bucket.acquire(1)
+            if self.token_bucket is not None:
+                text = prompt + "".join(system_msgs or [])
+                output_tokens = self.estimated_output_tokens
+                if profile is not None and profile.max_tokens is not None:
+                    output_tokens = min(output_tokens, profile.max_tokens)
+                await self.token_bucket.acquire(self.estimate_tokens(text) + output_tokens)
+        except BaseException:
+            self._release_slot()
+            raise
+        
+        wait_time = time.monotonic() - start
+        self._stats["admitted"] += 1
+        self._stats["total_wait_time"] += wait_time
+        self._stats["max_wait_time"] = max(self._stats["max_wait_time"], wait_time)
+        caller_stats = self._caller_stats.setdefault(key, {"requests": 0, "total_wait_time": 0.0, "max_wait_time": 0.0})
+        caller_stats["requests"] += 1
+        caller_stats["total_wait_time"] += wait_time
+        caller_stats["max_wait_time"] = max(caller_stats["max_wait_time"], wait_time)
+        return key
+    
+    async def aask(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
+        await self._admit(prompt, system_msgs, profile)
+        try:
+            return await self.llm.aask(prompt, system_msgs, profile=profile)
+        finally:
+            self._release_slot()
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        await self._admit(prompt, system_msgs, profile)
+        try:
+            async for chunk in self.llm.astream(prompt, system_msgs, profile=profile):
+                yield chunk
+        finally:
+            self._release_slot()
+    
+    async def asample(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        n: int = 2,
+        profile: Optional[GenerationProfile] = None
+    ) -> List[str]:
+        # A batched sampling request takes one slot
+        await self._admit(prompt, system_msgs, profile)
+        try:
+            return await self.llm.asample(prompt, system_msgs, n=n, profile=profile)
+        finally:
+            self._release_slot()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get admission statistics, overall and per caller"""
+        admitted = self._stats["admitted"]
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self._stats["max_queue_depth"],
+            "admitted": admitted,
+            "avg_wait_time": self._stats["total_wait_time"] / admitted if admitted else 0.0,
+            "max_wait_time": self._stats["max_wait_time"],
+            "callers": {
+                key: {
+                    "requests": stats["requests"],
+                    "avg_wait_time": stats["total_wait_time"] / stats["requests"],
+                    "max_wait_time": stats["max_wait_time"],
+                }
+                for key, stats in self._caller_stats.items()
+            },
+        }
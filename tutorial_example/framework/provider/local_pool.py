@@ -0,0 +1,453 @@
+"""Multi-process pool of llama.cpp workers"""
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from framework.llm import BaseLLM, GenerationProfile, UsageMeter
+
+
+def _worker_main(conn, llm_kwargs: Dict[str, Any]):
+    """
+    Entry point of a pool worker process.
+    
+    Loads the model once, then serves generation requests from the pipe one
+    at a time. A reader thread keeps draining the pipe so pings and
+    cancellations are handled while a generation is running.
+    """
+    from framework.llm import LocalLLM
+    
+    send_lock = threading.Lock()
+    
+    def send(message):
+        with send_lock:
+            conn.send(message)
+    
+    try:
+        local = LocalLLM(**llm_kwargs)
+    except Exception as e:
+        send(("fatal", None, f"{type(e).__name__}: {e}"))
+        return
+    
+    requests: "queue.Queue" = queue.Queue()
+    cancelled = set()
+    
+    def reader():
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                requests.put(None)
+                return
+            kind = message[0]
+            if kind == "ping":
+                send(("pong", message[1]))
+            elif kind == "cancel":
+                cancelled.add(message[1])
+            elif kind == "stop":
+                requests.put(None)
+                return
+            else:
+                requests.put(message)
+    
+    threading.Thread(target=reader, daemon=True).start()
+    send(("ready", None))
+    
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        _, request_id, prompt, system_msgs, profile = message
+        usage: Dict[str, int] = {}
+        try:
+            if request_id not in cancelled:
+                chunks = local._stream_completion(
+                    prompt, system_msgs, lambda: request_id in cancelled, profile, usage
+                )
+                for content in chunks:
+                    send(("chunk", request_id, content))
+            send(("done", request_id, usage))
+        except Exception as e:
+            send(("error", request_id, f"{type(e).__name__}: {e}"))
+        cancelled.discard(request_id)
+
+
+class _PoolRequest:
+    """A generation request dispatched to a pool worker"""
+    
+    DONE = object()
+    
+    def __init__(
+        self,
+        request_id: int,
+        prompt: str,
+        system_msgs: Optional[List[str]],
+        profile: Optional[GenerationProfile] = None
+    ):
+        self.id = request_id
+        self.prompt = prompt
+        self.system_msgs = system_msgs
+        self.profile = profile
+        self.chunks: asyncio.Queue = asyncio.Queue()
+        self.received = False
+        self.crashes = 0
+        self.usage: Dict[str, int] = {}  # Token counts reported by the worker
+
+
+class _PoolWorker:
+    """Parent-side handle of a worker process"""
+    
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.outstanding: "OrderedDict[int, _PoolRequest]" = OrderedDict()
+        self.ready = False
+        self.failed: Optional[str] = None
+        self.last_pong = 0.0
+        self.restarts = 0
+        self.completed = 0
+        self.send_lock = threading.Lock()
+    
+    @property
+    def available(self) -> bool:
+        return self.failed is None and self.process is not None and self.process.is_alive()
+
+
+class LocalLLMPool(BaseLLM):
+    """
+    Pool of worker processes, each holding its own llama.cpp model.
+    
+    A single ``LocalLLM`` serializes every generation on one llama.cpp
+    context. The pool loads the GGUF model once per worker process and sends
+    each call to the worker with the fewest outstanding requests, so several
+    generations run in parallel across CPU cores. Workers are health-checked
+    and restarted if they crash or stop answering.
+    """
+    
+    def __init__(
+        self,
+        model_path: str = "./HF_MODELS/Meta-Llama-3-8B-Instruct-GGUF/Meta-Llama-3-8B-Instruct.Q3_K_M.gguf",
+        n_workers: int = 2,
+        n_threads: Optional[int] = None,
+        temperature: float = 0.2,
+        max_tokens: int = 8096,
+        n_ctx: int = 8192,
+        health_check_interval: float = 5.0,
+        health_check_timeout: float = 30.0,
+        max_restarts: int = 3,
+        prefix_cache_size: int = 0
+    ):
+        """
+        Initialize the pool (workers are started on first use)
+        
+        Args:
+            model_path: Path to the GGUF model file
+            n_workers: Number of worker processes
+            n_threads: CPU threads per worker (None = cores / n_workers)
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate per response
+            n_ctx: Context window size
+            health_check_interval: Seconds between worker health checks
+            health_check_timeout: Seconds without a ping reply before a worker is restarted
+            max_restarts: Maximum restarts per worker before it is given up on
+            prefix_cache_size: Saved prompt-prefix states kept by each worker (0 disables
+                prefix reuse, see LocalLLM)
+        """
+        self.model_path = model_path
+        self.model = os.path.basename(model_path)
+        self.n_workers = n_workers
+        self.n_threads = n_threads or max(1, (os.cpu_count() or 1) // n_workers)
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.n_ctx = n_ctx
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.max_restarts = max_restarts
+        self.prefix_cache_size = prefix_cache_size
+        
+        self._mp = multiprocessing.get_context("spawn")
+        self._workers: List[_PoolWorker] = [_PoolWorker(i) for i in range(n_workers)]
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._closing = False
+    
+    def _llm_kwargs(self) -> Dict[str, Any]:
+        """Constructor arguments for the LocalLLM inside each worker"""
+        return {
+            "model_path": self.model_path,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "n_ctx": self.n_ctx,
+            "n_threads": self.n_threads,
+            "prefix_cache_size": self.prefix_cache_size,
+        }
+    
+    def _ensure_started(self):
+        """Start worker processes and the health checker in the running loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._closing = False
+        if self._health_task is not None:
+            self._health_task.cancel()
+        for worker in self._workers:
+            if not worker.available and worker.failed is None:
+                self._start_worker(worker)
+        self._health_task = loop.create_task(self._health_check())
+    
+    def _start_worker(self, worker: _PoolWorker):
+        """Spawn the process of a worker and its pipe reader thread"""
+        parent_conn, child_conn = self._mp.Pipe()
+        process = self._mp.Process(
+            target=_worker_main,
+            args=(child_conn, self._llm_kwargs()),
+            name=f"llama-worker-{worker.index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        
+        worker.process = process
+        worker.conn = parent_conn
+        worker.ready = False
+        worker.last_pong = time.monotonic()
+        
+        def reader():
+            while True:
+                try:
+                    message = parent_conn.recv()
+                except (EOFError, OSError):
+                    message = ("exit", None)
+                # Look the loop up per message: the pool may be reused from a new loop
+                loop = self._loop
+                if loop is not None:
+                    try:
+                        loop.call_soon_threadsafe(self._on_message, worker, process, message)
+                    except RuntimeError:
+                        pass  # Event loop closed
+                if message[0] in ("exit", "fatal"):
+                    return
+        
+        threading.Thread(target=reader, name=f"llama-worker-{worker.index}-reader", daemon=True).start()
+    
+    def _send(self, worker: _PoolWorker, message):
+        """Send a message to a worker, treating a broken pipe as a crash"""
+        try:
+            with worker.send_lock:
+                worker.conn.send(message)
+        except (OSError, ValueError):
+            self._handle_exit(worker)
+    
+    def _on_message(self, worker: _PoolWorker, process, message):
+        """Handle a message from a worker (runs in the event loop)"""
+        if process is not worker.process:
+            return  # Stale message from a replaced process
+        kind = message[0]
+        if kind == "ready":
+            worker.ready = True
+        elif kind == "pong":
+            worker.last_pong = time.monotonic()
+        elif kind == "chunk":
+            request = worker.outstanding.get(message[1])
+            if request is not None:
+                request.received = True
+                request.chunks.put_nowait(message[2])
+        elif kind == "done":
+            request = worker.outstanding.pop(message[1], None)
+            if request is not None:
+                worker.completed += 1
+                request.usage = message[2]
+                request.chunks.put_nowait(_PoolRequest.DONE)
+        elif kind == "error":
+            request = worker.outstanding.pop(message[1], None)
+            if request is not None:
+                request.chunks.put_nowait(RuntimeError(f"LocalLLMPool worker {worker.index} failed: {message[2]}"))
+        elif kind == "fatal":
+            # The model could not be loaded; restarting would fail the same way
+            worker.failed = message[2]
+            self._fail_outstanding(worker, RuntimeError(f"LocalLLMPool worker {worker.index} could not start: {message[2]}"))
+        elif kind == "exit":
+            self._handle_exit(worker)
+    
+    def _handle_exit(self, worker: _PoolWorker):
+        """Recover from a worker that exited or stopped responding"""
+        if self._closing or worker.process is None:
+            return
+        process = worker.process
+        worker.process = None
+        if process.is_alive():
+            process.terminate()
+        
+        # Workers serve requests in dispatch order, so only the first one can
+        # have been running. It is retried once unless it already produced
+        # output; the ones queued behind it never started and are redispatched.
+        pending = list(worker.outstanding.values())
+        worker.outstanding.clear()
+        retry = pending[1:]
+        if pending:
+            running = pending[0]
+            running.crashes += 1
+            if running.received or running.crashes > 1:
+                running.chunks.put_nowait(RuntimeError(f"LocalLLMPool worker {worker.index} crashed during generation"))
+            else:
+                retry.insert(0, running)
+        
+        if worker.failed is None:
+            if worker.restarts < self.max_restarts:
+                worker.restarts += 1
+                self._start_worker(worker)
+            else:
+                worker.failed = f"exceeded {self.max_restarts} restarts"
+        
+        for request in retry:
+            try:
+                self._dispatch(request)
+            except RuntimeError as e:
+                request.chunks.put_nowait(e)
+    
+    def _fail_outstanding(self, worker: _PoolWorker, error: Exception):
+        """Fail every request assigned to a worker"""
+        for request in worker.outstanding.values():
+            request.chunks.put_nowait(error)
+        worker.outstanding.clear()
+    
+    def _dispatch(self, request: _PoolRequest):
+        """Assign a request to the least-loaded available worker"""
+        candidates = [worker for worker in self._workers if worker.available]
+        if not candidates:
+            errors = "; ".join(w.failed for w in self._workers if w.failed)
+            raise RuntimeError(f"LocalLLMPool has no available workers{': ' + errors if errors else ''}")
+        worker = min(candidates, key=lambda w: len(w.outstanding))
+        worker.outstanding[request.id] = request
+        self._send(worker, ("generate", request.id, request.prompt, request.system_msgs, request.profile))
+        return worker
+    
+    async def _health_check(self):
+        """Periodically ping workers and restart dead or hung ones"""
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            now = time.monotonic()
+            for worker in self._workers:
+                if worker.failed is not None or worker.process is None:
+                    continue
+                if not worker.process.is_alive():
+                    self._handle_exit(worker)
+                elif worker.ready and now - worker.last_pong > self.health_check_timeout:
+                    self._handle_exit(worker)
+                else:
+                    self._send(worker, ("ping", None))
+    
+    async def aask(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
+        res = await super().aask(prompt, system_msgs, profile=profile)
+        return res.strip()
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream generated text from the least-loaded worker
+        
+        Args:
+            prompt: The input text prompt
+            system_msgs: Optional list of system messages
+            profile: Optional generation settings for this call
+        
+        Yields:
+            Generated text chunks
+        """
+        self._ensure_started()
+        request = _PoolRequest(next(self._ids), prompt, list(system_msgs) if system_msgs else None, profile)
+        self._dispatch(request)
+        meter = UsageMeter(self.model, prompt, system_msgs)
+        finished = False
+        try:
+            while True:
+                item = await request.chunks.get()
+                if item is _PoolRequest.DONE:
+                    finished = True
+                    break
+                if isinstance(item, Exception):
+                    finished = True
+                    raise item
+                meter.chunk(item)
+                yield item
+        finally:
+            # Counts are only known once the worker finished; otherwise they are estimated
+            meter.prompt_tokens = request.usage.get("prompt_tokens")
+            meter.completion_tokens = request.usage.get("completion_tokens")
+            meter.finish()
+            if not finished:
+                # Consumer went away early: stop the generation in the worker
+                for worker in self._workers:
+                    if request.id in worker.outstanding and worker.available:
+                        self._send(worker, ("cancel", request.id))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-worker statistics"""
+        return {
+            "workers": [
+                {
+                    "index": worker.index,
+                    "pid": worker.process.pid if worker.process else None,
+                    "alive": worker.available,
+                    "ready": worker.ready,
+                    "outstanding": len(worker.outstanding),
+                    "completed": worker.completed,
+                    "restarts": worker.restarts,
+                    "failed": worker.failed,
+                }
+                for worker in self._workers
+            ],
+            "outstanding": sum(len(worker.outstanding) for worker in self._workers),
+        }
+    
+    async def warmup(self, timeout: Optional[float] = 120.0) -> bool:
+        """
+        Start the workers and run one warmup generation per worker
+        
+        The generations are sent together, so the least-loaded dispatch
+        gives one to each worker and every model gets loaded and exercised.
+        
+        Returns:
+            True if at least one worker answered
+        """
+        results = await asyncio.gather(*[BaseLLM.warmup(self, timeout) for _ in self._workers])
+        return any(results)
+    
+    async def aclose(self):
+        """Stop all worker processes"""
+        self._closing = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for worker in self._workers:
+            self._fail_outstanding(worker, RuntimeError("LocalLLMPool was closed"))
+            process = worker.process
+            worker.process = None
+            if process is None:
+                continue
+            try:
+                with worker.send_lock:
+                    worker.conn.send(("stop", None))
+            except (OSError, ValueError):
+                pass
+            await asyncio.get_running_loop().run_in_executor(None, process.join, 5)
+            if process.is_alive():
+                process.terminate()
+            worker.conn.close()
+        self._loop = None
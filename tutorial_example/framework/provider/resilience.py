@@ -0,0 +1,319 @@
+"""Retries with jittered backoff, circuit breaking and failover for LLM backends"""
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import random
+import time
+from framework.llm import BaseLLM, GenerationProfile
+from framework.provider.base import LLMWrapper
+from framework.utils.exceptions import (
+    CircuitOpenError,
+    LLMConnectionError,
+    LLMQueueFullException,
+)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    
+    Closed: calls pass. After ``failure_threshold`` failures in a row the
+    breaker opens and rejects calls for ``reset_timeout`` seconds. It then
+    half-opens and lets a single trial call through: success closes it,
+    failure opens it again.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize circuit breaker
+        
+        Args:
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds the breaker stays open before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial_in_flight = False
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at == 0.0:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+    
+    def retry_after(self) -> float:
+        """Seconds until the breaker allows a trial call"""
+        if self.opened_at == 0.0:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+    
+    def allow(self) -> bool:
+        """Check whether a call may go to the backend"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+    
+    def release_trial(self):
+        """Give back a trial call that ended without an outcome (e.g. cancelled)"""
+        self._trial_in_flight = False
+    
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+    
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self._trial_in_flight or self.consecutive_failures >= self.failure_threshold:
+            if self.opened_at == 0.0 or self._trial_in_flight:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+
+class ResilientLLM(LLMWrapper):
+    """
+    Fault-tolerant wrapper around any LLM.
+    
+    Retryable failures (timeouts, connection errors, 408/429/5xx responses)
+    are retried with exponential backoff and full jitter within an overall
+    deadline. A circuit breaker fails calls fast while the backend keeps
+    failing. When the backend gives up or the breaker is open, calls fail
+    over to the optional ``fallback`` backend (e.g. vLLM -> LocalLLM).
+    
+    Streams are only retried before their first chunk, so callers never
+    see duplicated output.
+    """
+    
+    def __init__(
+        self,
+        llm: BaseLLM,
+        fallback: Optional[BaseLLM] = None,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        deadline: float = 300.0,
+        attempt_timeout: Optional[float] = None,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        retry_statuses: Tuple[int, ...] = (408, 429, 500, 502, 503, 504)
+    ):
+        """
+        Initialize the wrapper
+        
+        Args:
+            llm: Primary backend
+            fallback: Optional backend used when the primary is unavailable
+            max_retries: Retries after the first attempt
+            base_delay: Backoff base in seconds (doubled per retry, full jitter)
+            max_delay: Upper bound of a single backoff
+            deadline: Overall seconds for a call, retries included
+            attempt_timeout: Timeout of a single attempt (for streams, until
+                the first chunk); None uses the remaining deadline
+            failure_threshold: Consecutive failures that open the circuit breaker
+            reset_timeout: Seconds the breaker stays open before a trial call
+            retry_statuses: HTTP statuses treated as retryable
+        """
+        super().__init__(llm)
+        self.fallback = fallback
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.retry_statuses = retry_statuses
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._stats = {
+            "calls": 0,
+            "retries": 0,
+            "failures": 0,
+            "short_circuited": 0,
+            "failovers": 0,
+        }
+    
+    def is_retryable(self, error: BaseException) -> bool:
+        """Check whether an error is a transient backend failure"""
+        status = getattr(error, "status", None) or getattr(error, "status_code", None)
+        if isinstance(status, int):
+            return status in self.retry_statuses
+        if isinstance(error, (asyncio.TimeoutError, LLMConnectionError, LLMQueueFullException)):
+            return True
+        # Client libraries we do not import (e.g. openai.APITimeoutError)
+        name = type(error).__name__
+        return "Timeout" in name or "Connection" in name
+    
+    def _attempt_timeout(self, deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if self.attempt_timeout is not None:
+            return min(self.attempt_timeout, remaining)
+        return remaining
+    
+    async def _backoff(self, attempt: int, deadline: float) -> bool:
+        """Sleep before the next attempt; returns False when no retry is left"""
+        if attempt >= self.max_retries:
+            return False
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if time.monotonic() + delay >= deadline:
+            return False
+        self._stats["retries"] += 1
+        await asyncio.sleep(delay)
+        return True
+    
+    def _record_error(self, error: Exception) -> bool:
+        """Update the breaker for a failed attempt; returns whether it is retryable"""
+        if not self.is_retryable(error):
+            # The backend answered, it just rejected this request
+            self.breaker.record_success()
+            return False
+        self._stats["failures"] += 1
+        self.breaker.record_failure()
+        return True
+    
+    def _unavailable(self, last_error: Optional[Exception]) -> Exception:
+        """Error describing why the primary backend gave up"""
+        if last_error is not None:
+            return last_error
+        return asyncio.TimeoutError(f"LLM call exceeded its {self.deadline}s deadline")
+    
+    async def aask(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
+        return await self._call(lambda llm: llm.aask(prompt, system_msgs, profile=profile))
+    
+    async def asample(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        n: int = 2,
+        profile: Optional[GenerationProfile] = None
+    ) -> List[str]:
+        return await self._call(lambda llm: llm.asample(prompt, system_msgs, n=n, profile=profile))
+    
+    async def _call(self, request: Callable[[BaseLLM], Awaitable[Any]]) -> Any:
+        """Run a non-streaming request with retries, the circuit breaker and failover"""
+        self._stats["calls"] += 1
+        deadline = time.monotonic() + self.deadline
+        last_error: Optional[Exception] = None
+        
+        for attempt in range(self.max_retries + 1):
+            trial = self.breaker.state == CircuitBreaker.HALF_OPEN
+            if not self.breaker.allow():
+                self._stats["short_circuited"] += 1
+                last_error = CircuitOpenError(self.breaker.retry_after())
+                break
+            timeout = self._attempt_timeout(deadline)
+            if timeout <= 0:
+                if trial:
+                    self.breaker.release_trial()
+                break
+            try:
+                response = await asyncio.wait_for(request(self.llm), timeout)
+            except Exception as e:
+                if not self._record_error(e):
+                    raise
+                last_error = e
+                if not await self._backoff(attempt, deadline):
+                    break
+                continue
+            except BaseException:
+                # Cancelled: no outcome, so a later call may probe again
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            return response
+        
+        if self.fallback is None:
+            raise self._unavailable(last_error)
+        self._stats["failovers"] += 1
+        return await request(self.fallback)
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        self._stats["calls"] += 1
+        deadline = time.monotonic() + self.deadline
+        last_error: Optional[Exception] = None
+        
+        for attempt in range(self.max_retries + 1):
+            trial = self.breaker.state == CircuitBreaker.HALF_OPEN
+            if not self.breaker.allow():
+                self._stats["short_circuited"] += 1
+                last_error = CircuitOpenError(self.breaker.retry_after())
+                break
+            timeout = self._attempt_timeout(deadline)
+            if timeout <= 0:
+                if trial:
+                    self.breaker.release_trial()
+                break
+            
+            stream = self.llm.astream(prompt, system_msgs, profile=profile)
+            try:
+                try:
+                    first = await asyncio.wait_for(stream.__anext__(), timeout)
+                except StopAsyncIteration:
+                    self.breaker.record_success()
+                    return
+                except Exception as e:
+                    if not self._record_error(e):
+                        raise
+                    last_error = e
+                    if not await self._backoff(attempt, deadline):
+                        break
+                    continue
+                except BaseException:
+                    # Cancelled or closed before the first chunk
+                    if trial:
+                        self.breaker.release_trial()
+                    raise
+                
+                # Output has started: no more retries for this call
+                self.breaker.record_success()
+                yield first
+                try:
+                    async for chunk in stream:
+                        yield chunk
+                except Exception as e:
+                    self._record_error(e)
+                    raise
+                return
+            finally:
+                await stream.aclose()
+        
+        if self.fallback is None:
+            raise self._unavailable(last_error)
+        self._stats["failovers"] += 1
+        async for chunk in self.fallback.astream(prompt, system_msgs, profile=profile):
+            yield chunk
+    
+    async def aclose(self):
+        await self.llm.aclose()
+        if self.fallback is not None:
+            await self.fallback.aclose()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get retry, breaker and failover statistics"""
+        return {
+            **self._stats,
+            "breaker_state": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "consecutive_failures": self.breaker.consecutive_failures,
+        }
@@ -0,0 +1,469 @@
+"""Load-balancing router over several OpenAI-compatible endpoints"""
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set
+import asyncio
+import itertools
+import time
+from framework.llm import BaseLLM, GenerationProfile, VLLM
+from framework.utils.context_builder import get_context_window
+from framework.utils.exceptions import LLMConnectionError
+
+
+class Endpoint:
+    """One backend behind a RoutedLLM, with its health and latency stats"""
+    
+    def __init__(self, llm: BaseLLM, name: str, weight: float = 1.0):
+        """
+        Initialize endpoint
+        
+        Args:
+            llm: Backend serving this endpoint
+            name: Display name (usually the base URL)
+            weight: Relative share of traffic
+        """
+        self.llm = llm
+        self.name = name
+        self.weight = weight
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.backoff_level = 0
+        self.ejected_until = 0.0
+        self.probing = False
+        self.latencies: Deque[float] = deque(maxlen=200)
+        self.first_token_latencies: Deque[float] = deque(maxlen=200)
+    
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until == 0.0
+    
+    def load(self) -> float:
+        """Weighted load used to pick the least busy endpoint"""
+        return (self.outstanding + 1) / self.weight
+    
+    def latency_percentile(self, percentile: float, first_token: bool = False) -> Optional[float]:
+        """
+        Get a latency percentile over recent requests
+        
+        Args:
+            percentile: Percentile between 0 and 100
+            first_token: Use time to first chunk instead of total latency
+        
+        Returns:
+            Latency in seconds, or None without samples
+        """
+        samples = sorted(self.first_token_latencies if first_token else self.latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get endpoint statistics"""
+        latencies = list(self.latencies)
+        return {
+            "name": self.name,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejections": self.ejections,
+            "avg_latency": sum(latencies) / len(latencies) if latencies else None,
+            "p50_latency": self.latency_percentile(50),
+            "p99_latency": self.latency_percentile(99),
+            "p50_first_token": self.latency_percentile(50, first_token=True),
+        }
+
+
+class RoutedLLM(BaseLLM):
+    """
+    LLM that spreads requests over several endpoints.
+    
+    Each request goes to the healthy endpoint with the fewest outstanding
+    requests relative to its weight. Endpoints that fail ``eject_after``
+    times in a row (timeouts, connection errors or 5xx responses; client
+    errors do not count) are ejected; once the ejection period has passed
+    they are probed and brought back if they answer.
+    
+    With ``hedge_percentile`` set, a request whose first chunk has not
+    arrived after that percentile of recent first-chunk latencies is
+    duplicated to a second endpoint; the first to answer wins and the other
+    is cancelled. ``aask`` is built on ``astream`` and is hedged the same
+    way. Hedges are capped at ``max_hedge_ratio`` of requests and skipped
+    when the second endpoint's limiter (see ``from_urls(max_in_flight=...)``)
+    has no free slot.
+    """
+    
+    def __init__(
+        self,
+        endpoints: List[BaseLLM],
+        weights: Optional[List[float]] = None,
+        names: Optional[List[str]] = None,
+        eject_after: int = 2,
+        eject_seconds: float = 30.0,
+        max_eject_seconds: float = 300.0,
+        probe_timeout: float = 5.0,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        hedge_min_delay: float = 0.05,
+        max_hedge_ratio: float = 0.1
+    ):
+        """
+        Initialize the router
+        
+        Args:
+            endpoints: Backends to route between
+            weights: Optional relative weights (default 1.0 each)
+            names: Optional display names for stats
+            eject_after: Consecutive failures before an endpoint is ejected
+            eject_seconds: Initial ejection period, doubled on repeated ejections
+            max_eject_seconds: Upper bound for the ejection period
+            probe_timeout: Timeout of the health probe of an ejected endpoint
+            hedge_percentile: First-chunk latency percentile after which a
+                request is hedged (None disables hedging)
+            hedge_min_samples: Latency samples needed before hedging starts
+            hedge_min_delay: Lower bound of the hedge delay in seconds
+            max_hedge_ratio: Maximum fraction of requests that may be hedged
+        """
+        if not endpoints:
+            raise ValueError("RoutedLLM needs at least one endpoint")
+        weights = weights or [1.0] * len(endpoints)
+        names = names or [getattr(llm, "base_url", f"endpoint_{i}") for i, llm in enumerate(endpoints)]
+        if len(weights) != len(endpoints) or len(names) != len(endpoints):
+            raise ValueError("weights and names must match the number of endpoints")
+        
+        self.endpoints = [Endpoint(llm, name, weight) for llm, name, weight in zip(endpoints, names, weights)]
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.probe_timeout = probe_timeout
+        self._tiebreak = itertools.count()
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self._hedge_stats = {"requests": 0, "hedges": 0, "hedge_wins": 0}
+        # Running health probes, kept referenced until they finish
+        self._probes: Set[asyncio.Task] = set()
+        
+        first = endpoints[0]
+        self.model = getattr(first, "model", None)
+        self.temperature = getattr(first, "temperature", None)
+        self.max_tokens = getattr(first, "max_tokens", None)
+        # Requests may land on any endpoint: the smallest window bounds them all
+        windows = [get_context_window(llm) for llm in endpoints]
+        self.context_window = min(windows) if None not in windows else None
+    
+    @classmethod
+    def from_urls(
+        cls,
+        base_urls: List[str],
+        weights: Optional[List[float]] = None,
+        model: str = None,
+        api_key: str = None,
+        max_in_flight: Optional[int] = None,
+        context_window: Optional[int] = None,
+        **kwargs
+    ) -> "RoutedLLM":
+        """
+        Create a router over vLLM / OpenAI-compatible servers
+        
+        Args:
+            base_urls: Server base URLs
+            weights: Optional relative weights
+            model: Model name sent to every server
+            api_key: Optional API key
+            max_in_flight: Optional per-server concurrency limit (LimitedLLM)
+            context_window: Context window of the served model in tokens (None: unknown)
+            **kwargs: Router options (eject_after, eject_seconds, ...)
+        
+        Returns:
+            RoutedLLM instance
+        """
+        endpoints = [
+            VLLM(base_url=url, model=model, api_key=api_key, context_window=context_window)
+            for url in base_urls
+        ]
+        if max_in_flight is not None:
+            from framework.provider.limiter import LimitedLLM
+            endpoints = [LimitedLLM(llm, max_in_flight=max_in_flight) for llm in endpoints]
+        return cls(endpoints, weights=weights, names=list(base_urls), **kwargs)
+    
+    @classmethod
+    def from_config(cls, llm_config, **kwargs) -> "RoutedLLM":
+        """
+        Create a router from ``Config.llm``
+        
+        Args:
+            llm_config: LLMConfig with ``base_urls`` (and optional ``weights``)
+            **kwargs: Router options (eject_after, eject_seconds, ...)
+        
+        Returns:
+            RoutedLLM instance
+        """
+        return cls.from_urls(
+            llm_config.get_base_urls(),
+            weights=llm_config.weights,
+            model=llm_config.model,
+            api_key=llm_config.api_key or None,
+            context_window=llm_config.context_window,
+            **kwargs
+        )
+    
+    def _select(self, exclude: Optional[List[Endpoint]] = None) -> Endpoint:
+        """Pick the least-loaded healthy endpoint"""
+        now = time.monotonic()
+        for endpoint in self.endpoints:
+            if not endpoint.healthy and not endpoint.probing and now >= endpoint.ejected_until:
+                endpoint.probing = True
+                probe = asyncio.get_running_loop().create_task(self._probe(endpoint))
+                self._probes.add(probe)
+                probe.add_done_callback(self._probes.discard)
+        
+        candidates = [e for e in self.endpoints if e.healthy and e not in (exclude or [])]
+        if not candidates:
+            # Everything is ejected: fail open to the endpoint that recovers soonest
+            candidates = [e for e in self.endpoints if e not in (exclude or [])] or self.endpoints
+            return min(candidates, key=lambda e: e.ejected_until)
+        # Rotate the tie-break order so equally loaded endpoints share traffic
+        offset = next(self._tiebreak)
+        count = len(self.endpoints)
+        return min(
+            candidates,
+            key=lambda e: (e.load(), (self.endpoints.index(e) - offset) % count)
+        )
+    
+    async def _probe(self, endpoint: Endpoint):
+        """Check an ejected endpoint and reinstate it if it answers"""
+        try:
+            check = getattr(endpoint.llm, "health_check", None)
+            if check is not None:
+                ok = await check(timeout=self.probe_timeout)
+            else:
+                ok = True  # No probe available: let real traffic decide
+        except Exception:
+            ok = False
+        finally:
+            endpoint.probing = False
+        if ok:
+            endpoint.ejected_until = 0.0
+            endpoint.consecutive_failures = 0
+        else:
+            self._eject(endpoint)
+    
+    def _eject(self, endpoint: Endpoint):
+        """Take an endpoint out of rotation, backing off on repeated ejections"""
+        endpoint.ejections += 1
+        endpoint.backoff_level += 1
+        period = min(self.max_eject_seconds, self.eject_seconds * 2 ** (endpoint.backoff_level - 1))
+        endpoint.ejected_until = time.monotonic() + period
+    
+    def _record_success(self, endpoint: Endpoint, latency: float):
+        endpoint.latencies.append(latency)
+        endpoint.consecutive_failures = 0
+        endpoint.backoff_level = 0
+        if not endpoint.healthy:
+            endpoint.ejected_until = 0.0
+    
+    @staticmethod
+    def is_endpoint_failure(error: BaseException) -> bool:
+        """
+        Check whether an error means the endpoint is unhealthy
+        
+        Timeouts, connection errors and 5xx responses count; client errors
+        (4xx, e.g. a prompt longer than the context) are the request's fault
+        and would otherwise eject healthy endpoints one after another.
+        """
+        status = getattr(error, "status", None) or getattr(error, "status_code", None)
+        if isinstance(status, int):
+            return status >= 500
+        if isinstance(error, (asyncio.TimeoutError, LLMConnectionError, ConnectionError)):
+            return True
+        # Client libraries we do not import (e.g. aiohttp.ClientConnectorError)
+        name = type(error).__name__
+        return "Timeout" in name or "Connection" in name
+    
+    def _record_failure(self, endpoint: Endpoint, error: BaseException):
+        if not self.is_endpoint_failure(error):
+            return
+        endpoint.errors += 1
+        endpoint.consecutive_failures += 1
+        if endpoint.healthy and endpoint.consecutive_failures >= self.eject_after:
+            self._eject(endpoint)
+    
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds to wait for a first chunk before hedging (None: do not hedge)"""
+        if self.hedge_percentile is None or len(self.endpoints) < 2:
+            return None
+        stats = self._hedge_stats
+        if stats["hedges"] + 1 > self.max_hedge_ratio * stats["requests"]:
+            return None
+        samples = sorted(
+            latency for endpoint in self.endpoints for latency in endpoint.first_token_latencies
+        )
+        if len(samples) < self.hedge_min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(self.hedge_percentile / 100 * (len(samples) - 1))))
+        return max(self.hedge_min_delay, samples[index])
+    
+    def _hedge_target(self, primary: Endpoint) -> Optional[Endpoint]:
+        """Pick the endpoint for a hedge, or None if none can take it now"""
+        target = self._select(exclude=[primary])
+        if target is primary or not target.healthy:
+            return None
+        has_capacity = getattr(target.llm, "has_capacity", None)
+        if has_capacity is not None and not has_capacity():
+            return None
+        return target
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        self._hedge_stats["requests"] += 1
+        endpoint = self._select()
+        delay = self._hedge_delay()
+        if delay is None:
+            async for chunk in self._stream_from(endpoint, prompt, system_msgs, profile):
+                yield chunk
+            return
+        
+        primary = self._stream_from(endpoint, prompt, system_msgs, profile)
+        first = asyncio.ensure_future(primary.__anext__())
+        racers = {first: primary}
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            backup = None if done else self._hedge_target(endpoint)
+            if backup is not None:
+                self._hedge_stats["hedges"] += 1
+                secondary = self._stream_from(backup, prompt, system_msgs, profile)
+                racers[asyncio.ensure_future(secondary.__anext__())] = secondary
+            
+            winner, stream = await self._first_answer(racers)
+        finally:
+            # Cancel the losers and let them unwind before closing their streams
+            for task in racers:
+                task.cancel()
+            await asyncio.gather(*racers, return_exceptions=True)
+            for loser in racers.values():
+                await loser.aclose()
+        
+        if stream is not primary:
+            self._hedge_stats["hedge_wins"] += 1
+        try:
+            try:
+                yield winner.result()
+            except StopAsyncIteration:
+                return
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+    
+    async def asample(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        n: int = 2,
+        profile: Optional[GenerationProfile] = None
+    ) -> List[str]:
+        """Sample ``n`` completions from one endpoint, keeping its batched sampling"""
+        endpoint = self._select()
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        start = time.monotonic()
+        try:
+            samples = await endpoint.llm.asample(prompt, system_msgs, n=n, profile=profile)
+        except Exception as e:
+            self._record_failure(endpoint, e)
+            raise
+        finally:
+            endpoint.outstanding -= 1
+        self._record_success(endpoint, time.monotonic() - start)
+        return samples
+    
+    @staticmethod
+    async def _first_answer(racers: Dict[asyncio.Future, AsyncIterator[str]]):
+        """
+        Wait for the first stream to produce a chunk (or finish)
+        
+        The winner is removed from ``racers``; failed racers are dropped and
+        the last failure is raised if every racer fails.
+        """
+        pending = set(racers)
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error is None or isinstance(error, StopAsyncIteration):
+                    return task, racers.pop(task)
+            if not pending:
+                raise error
+    
+    async def _stream_from(
+        self,
+        endpoint: Endpoint,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        """Stream a request from a specific endpoint, recording its stats"""
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        start = time.monotonic()
+        first_chunk = True
+        completed = False
+        try:
+            async for chunk in endpoint.llm.astream(prompt, system_msgs, profile=profile):
+                if first_chunk:
+                    endpoint.first_token_latencies.append(time.monotonic() - start)
+                    first_chunk = False
+                yield chunk
+            completed = True
+        except Exception as e:
+            self._record_failure(endpoint, e)
+            raise
+        finally:
+            endpoint.outstanding -= 1
+            if completed:
+                self._record_success(endpoint, time.monotonic() - start)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-endpoint and hedging statistics"""
+        stats = self._hedge_stats
+        return {
+            "endpoints": [endpoint.get_stats() for endpoint in self.endpoints],
+            "requests": stats["requests"],
+            "hedges": stats["hedges"],
+            "hedge_rate": stats["hedges"] / stats["requests"] if stats["requests"] else 0.0,
+            "hedge_wins": stats["hedge_wins"],
+            "hedge_win_rate": stats["hedge_wins"] / stats["hedges"] if stats["hedges"] else 0.0,
+        }
+    
+    async def warmup(self, timeout: Optional[float] = 60.0) -> bool:
+        """
+        Warm up every endpoint concurrently, ejecting the ones that do not answer
+        
+        Returns:
+            True if at least one endpoint answered
+        """
+        results = await asyncio.gather(*[endpoint.llm.warmup(timeout) for endpoint in self.endpoints])
+        for endpoint, ok in zip(self.endpoints, results):
+            if not ok and endpoint.healthy:
+                self._eject(endpoint)
+        return any(results)
+    
+    async def aclose(self):
+        probes = list(self._probes)
+        for probe in probes:
+            probe.cancel()
+        await asyncio.gather(*probes, return_exceptions=True)
+        for endpoint in self.endpoints:
+            # A probe cancelled before it started never cleared its flag
+            endpoint.probing = False
+            await endpoint.llm.aclose()
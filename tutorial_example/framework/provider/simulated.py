@@ -0,0 +1,187 @@
+"""LLM backend that simulates the latency profile of an inference server"""
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import random
+import time
+from framework.llm import BaseLLM, GenerationProfile, MockLLM, UsageMeter
+from framework.utils.exceptions import LLMServerError
+
+
+class SimulatedLLM(BaseLLM):
+    """
+    Load-testing backend with a realistic latency model.
+    
+    Each request waits for one of ``max_concurrency`` server slots, then
+    spends prefill time proportional to the prompt length and decode time
+    proportional to the number of output tokens, streamed in chunks.
+    Requests can fail with a 503 or hang until a timeout at configurable
+    rates. All randomness comes from one seeded generator, so a run with the
+    same seed and call order is reproducible.
+    
+    Response text is MockLLM's canned output, so the full software company
+    pipeline runs on top of it.
+    """
+    
+    # Rough characters per token used to size prompts and outputs
+    CHARS_PER_TOKEN = 4
+    
+    def __init__(
+        self,
+        prefill_tokens_per_second: float = 2000.0,
+        decode_tokens_per_second: float = 30.0,
+        base_latency: float = 0.02,
+        max_concurrency: int = 8,
+        output_tokens: Optional[int] = None,
+        output_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout_seconds: float = 30.0,
+        chunk_tokens: int = 8,
+        time_scale: float = 1.0,
+        seed: Optional[int] = 0,
+        model: str = "simulated",
+        temperature: float = 0.2,
+        max_tokens: int = 8096
+    ):
+        """
+        Initialize the simulator
+        
+        Args:
+            prefill_tokens_per_second: Prompt processing speed
+            decode_tokens_per_second: Generation speed of a single request
+            base_latency: Fixed per-request overhead in seconds (network, scheduling)
+            max_concurrency: Requests the server processes at once; others queue
+            output_tokens: Output length in tokens (None: length of the canned response)
+            output_jitter: Relative random variation of the output length (0.2 = +/-20%)
+            error_rate: Probability that a request fails with a 503
+            timeout_rate: Probability that a request hangs and times out
+            timeout_seconds: Time a hanging request takes to fail
+            chunk_tokens: Tokens per streamed chunk
+            time_scale: Multiplier for all simulated delays (0.01 runs 100x faster)
+            seed: Random seed (None for nondeterministic runs)
+            model: Reported model name
+            temperature: Reported sampling temperature
+            max_tokens: Upper bound of the output length
+        """
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.decode_tokens_per_second = decode_tokens_per_second
+        self.base_latency = base_latency
+        self.max_concurrency = max_concurrency
+        self.output_tokens = output_tokens
+        self.output_jitter = output_jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.chunk_tokens = chunk_tokens
+        self.time_scale = time_scale
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        
+        self._random = random.Random(seed)
+        self._mock = MockLLM()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.active = 0
+        self._stats = {
+            "requests": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+            "total_queue_wait": 0.0,
+            "max_queue_wait": 0.0,
+            "peak_concurrency": 0,
+        }
+    
+    def _get_slots(self) -> asyncio.Semaphore:
+        """Get the server slot semaphore of the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._slots_loop = loop
+        return self._slots
+    
+    async def _sleep(self, seconds: float):
+        await asyncio.sleep(seconds * self.time_scale)
+    
+    def _response_text(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]],
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
+        """Build the response text with the simulated output length"""
+        params = self.generation_params(profile)
+        text = self._mock._mock_response(prompt, system_msgs)
+        if self.output_tokens is None:
+            tokens = len(text) // self.CHARS_PER_TOKEN
+        else:
+            tokens = self.output_tokens
+        if self.output_jitter:
+            tokens = int(tokens * self._random.uniform(1 - self.output_jitter, 1 + self.output_jitter))
+        length = max(1, min(tokens, params["max_tokens"])) * self.CHARS_PER_TOKEN
+        if len(text) < length:
+            text = text * (length // len(text) + 1)
+        text = text[:length]
+        for stop in params["stop"]:
+            if stop in text:
+                text = text[:text.index(stop)]
+        return text
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        self._stats["requests"] += 1
+        prompt_tokens = len(prompt + "".join(system_msgs or [])) // self.CHARS_PER_TOKEN
+        # Draw every random decision up front so outcomes do not depend on timing
+        outcome = self._random.random()
+        response = self._response_text(prompt, system_msgs, profile)
+        
+        meter = UsageMeter(self.model, prompt, system_msgs)
+        meter.prompt_tokens = prompt_tokens
+        meter.completion_tokens = 0
+        queued_at = time.monotonic()
+        async with self._get_slots():
+            wait = time.monotonic() - queued_at
+            self._stats["total_queue_wait"] += wait
+            self._stats["max_queue_wait"] = max(self._stats["max_queue_wait"], wait)
+            self.active += 1
+            self._stats["peak_concurrency"] = max(self._stats["peak_concurrency"], self.active)
+            try:
+                await self._sleep(self.base_latency)
+                if outcome < self.timeout_rate:
+                    self._stats["timeouts"] += 1
+                    await self._sleep(self.timeout_seconds)
+                    raise asyncio.TimeoutError(f"Simulated request timed out after {self.timeout_seconds}s")
+                if outcome < self.timeout_rate + self.error_rate:
+                    self._stats["errors"] += 1
+                    raise LLMServerError(503, "Simulated server error (status 503)")
+                
+                self._stats["prompt_tokens"] += prompt_tokens
+                await self._sleep(prompt_tokens / self.prefill_tokens_per_second)
+                
+                chunk_chars = self.chunk_tokens * self.CHARS_PER_TOKEN
+                for start in range(0, len(response), chunk_chars):
+                    chunk = response[start:start + chunk_chars]
+                    tokens = max(1, len(chunk) // self.CHARS_PER_TOKEN)
+                    await self._sleep(tokens / self.decode_tokens_per_second)
+                    self._stats["output_tokens"] += tokens
+                    meter.completion_tokens += tokens
+                    meter.chunk(chunk)
+                    yield chunk
+            finally:
+                self.active -= 1
+                meter.finish()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get simulated load statistics"""
+        requests = self._stats["requests"]
+        return {
+            **self._stats,
+            "active": self.active,
+            "avg_queue_wait": self._stats["total_queue_wait"] / requests if requests else 0.0,
+        }
@@ -0,0 +1,179 @@
+"""Coalescing of concurrent identical LLM calls onto one upstream request"""
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+from framework.llm import BaseLLM, GenerationProfile, LLMResponse
+from framework.provider.base import LLMWrapper
+from framework.provider.cache import response_key
+
+
+class _Flight:
+    """An upstream request shared by every caller waiting for it"""
+    
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+    
+    def publish(self, chunk: Optional[str] = None, error: Optional[BaseException] = None, done: bool = False):
+        """Record progress of the upstream stream and wake the consumers"""
+        if chunk is not None:
+            self.chunks.append(chunk)
+        if error is not None:
+            self.error = error
+        self.done = self.done or done
+        self._changed.set()
+        self._changed = asyncio.Event()
+    
+    async def wait(self):
+        await self._changed.wait()
+
+
+class SingleFlightLLM(LLMWrapper):
+    """
+    Wrapper that coalesces concurrent identical calls.
+    
+    While a request is in flight, further calls with the same request key
+    (backend, model, messages and generation settings) wait for it instead
+    of reaching the backend, and all of them receive its result. Streams
+    are fanned out chunk by chunk; a caller joining late first gets the
+    chunks already produced. This covers the window a response cache
+    cannot: wrap the backend as ``CachedLLM(SingleFlightLLM(llm))`` to get
+    both.
+    
+    Responses handed to joining callers are ``LLMResponse`` with
+    ``coalesced=True``, so cost tracking does not count them twice. The
+    upstream request is cancelled only when every caller has gone away.
+    """
+    
+    def __init__(self, llm: BaseLLM, max_temperature: Optional[float] = None):
+        """
+        Initialize the wrapper
+        
+        Args:
+            llm: Backend to protect
+            max_temperature: Do not coalesce calls sampled above this temperature,
+                whose callers expect independent responses (None coalesces all)
+        """
+        super().__init__(llm)
+        self.max_temperature = max_temperature
+        self._asks: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _Flight] = {}
+        self._stats = {"calls": 0, "upstream": 0, "coalesced": 0, "bypassed": 0}
+    
+    def _coalescable(self, profile: Optional[GenerationProfile]) -> bool:
+        if self.max_temperature is None:
+            return True
+        temperature = self.generation_params(profile)["temperature"]
+        return temperature is None or temperature <= self.max_temperature
+    
+    def _join(self, flights: Dict[str, _Flight], key: str) -> Tuple[_Flight, bool]:
+        """Get the flight of a key, creating it if needed; returns (flight, joined)"""
+        self._stats["calls"] += 1
+        flight = flights.get(key)
+        joined = flight is not None
+        if joined:
+            self._stats["coalesced"] += 1
+        else:
+            self._stats["upstream"] += 1
+            flight = flights[key] = _Flight()
+        flight.waiters += 1
+        return flight, joined
+    
+    def _leave(self, flights: Dict[str, _Flight], key: str, flight: _Flight):
+        """Drop a waiter, cancelling the upstream request when nobody waits for it"""
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.done:
+            flight.task.cancel()
+            if flights.get(key) is flight:
+                del flights[key]
+    
+    async def aask(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
+        if not self._coalescable(profile):
+            self._stats["bypassed"] += 1
+            return await self.llm.aask(prompt, system_msgs, profile=profile)
+        
+        key = response_key(self.llm, prompt, system_msgs, profile)
+        flight, joined = self._join(self._asks, key)
+        if not joined:
+            flight.task = asyncio.ensure_future(self.llm.aask(prompt, system_msgs, profile=profile))
+            
+            def finished(_, flight=flight):
+                flight.done = True
+                if self._asks.get(key) is flight:
+                    del self._asks[key]
+            
+            flight.task.add_done_callback(finished)
+        try:
+            # Shielded: one caller being cancelled must not cancel the shared request
+            response = await asyncio.shield(flight.task)
+        finally:
+            self._leave(self._asks, key, flight)
+        return LLMResponse(response, coalesced=True) if joined else response
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        if not self._coalescable(profile):
+            self._stats["bypassed"] += 1
+            async for chunk in self.llm.astream(prompt, system_msgs, profile=profile):
+                yield chunk
+            return
+        
+        key = response_key(self.llm, prompt, system_msgs, profile)
+        flight, joined = self._join(self._streams, key)
+        if not joined:
+            flight.task = asyncio.ensure_future(self._produce(key, flight, prompt, system_msgs, profile))
+        try:
+            index = 0
+            while True:
+                if index < len(flight.chunks):
+                    index += 1
+                    yield flight.chunks[index - 1]
+                elif flight.error is not None:
+                    raise flight.error
+                elif flight.done:
+                    return
+                else:
+                    await flight.wait()
+        finally:
+            self._leave(self._streams, key, flight)
+    
+    async def _produce(
+        self,
+        key: str,
+        flight: _Flight,
+        prompt: str,
+        system_msgs: Optional[List[str]],
+        profile: Optional[GenerationProfile]
+    ):
+        """Run the upstream stream of a flight, publishing its chunks"""
+        try:
+            async for chunk in self.llm.astream(prompt, system_msgs, profile=profile):
+                flight.publish(chunk)
+            flight.publish(done=True)
+        except Exception as e:
+            flight.publish(error=e, done=True)
+        finally:
+            # Later calls start a new request (a finished response belongs to the cache)
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        calls = self._stats["calls"]
+        return {
+            **self._stats,
+            "in_flight": len(self._asks) + len(self._streams),
+            "coalesce_rate": self._stats["coalesced"] / calls if calls else 0.0,
+        }
@@ -0,0 +1,294 @@
+"""Action-aware model tiering and small-to-large model cascades"""
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+from framework.llm import BaseLLM, GenerationProfile
+from framework.provider.base import LLMWrapper, current_action, current_caller
+from framework.utils.code_extractor import detect_code_language, extract_code_blocks, extract_json
+from framework.utils.context_builder import get_context_window
+
+
+# Tier of each action or role; unlisted calls use the policy's default tier
+DEFAULT_TIER_RULES: Dict[str, str] = {
+    "TeamLeader": "small",
+    "WritePRD": "small",
+    "WriteTasks": "small",
+    "Planner": "small",
+    "WriteCode": "large",
+    "WriteTest": "large",
+}
+
+# Checks a response: returns the reason it is rejected, or None to accept it
+Validator = Callable[[str], Optional[str]]
+
+
+def reject_empty(text: str) -> Optional[str]:
+    """Reject blank responses"""
+    return "empty" if not text or not text.strip() else None
+
+
+def reject_invalid_python(text: str) -> Optional[str]:
+    """Reject responses whose Python code does not parse (other languages are accepted)"""
+    # Imported here: the quality package pulls in the tools and their dependencies
+    from framework.quality.code_reviewer import CodeReviewer
+    code = extract_code_blocks(text)
+    if detect_code_language(code) not in (None, "python"):
+        return None
+    issue = CodeReviewer().check_syntax(code)
+    return "syntax" if issue is not None else None
+
+
+def reject_invalid_json(text: str) -> Optional[str]:
+    """Reject responses without a parseable JSON document (bare or in a code block)"""
+    return "parse" if extract_json(text) is None else None
+
+
+# Validators applied per action, on top of reject_empty
+DEFAULT_ACTION_VALIDATORS: Dict[str, List[Validator]] = {
+    "WriteCode": [reject_invalid_python],
+    "WriteTest": [reject_invalid_python],
+}
+
+
+def _smallest_window(backends) -> Optional[int]:
+    """Smallest context window of several backends (None if any is unknown)"""
+    windows = [get_context_window(llm) for llm in backends]
+    return min(windows) if None not in windows else None
+
+
+class TieredLLM(LLMWrapper):
+    """
+    Routes each call to a model tier by action or role.
+    
+    The tier is looked up in ``rules`` by the current action (see
+    ``llm_action``), then by the calling roles from the innermost out (see
+    ``llm_caller``), and falls back to ``default``. A single TieredLLM can
+    therefore be handed to every role, and cheap calls (planning, PRDs,
+    coordination) stop occupying the large model.
+    
+    Attributes such as ``max_tokens`` are forwarded to the default tier;
+    ``context_window`` is the smallest window of the tiers, since prompts
+    are sized before the tier is selected.
+    """
+    
+    def __init__(
+        self,
+        tiers: Dict[str, BaseLLM],
+        rules: Optional[Dict[str, str]] = None,
+        default: str = "large"
+    ):
+        """
+        Initialize the tiered LLM
+        
+        Args:
+            tiers: Backend of each tier, e.g. {"small": ..., "large": ...}
+            rules: Tier of each action or role name (default: DEFAULT_TIER_RULES)
+            default: Tier of calls no rule matches
+        """
+        if default not in tiers:
+            raise ValueError(f"Default tier '{default}' is not one of {sorted(tiers)}")
+        super().__init__(tiers[default])
+        self.tiers = tiers
+        self.rules = dict(DEFAULT_TIER_RULES if rules is None else rules)
+        self.default = default
+        self._calls: Dict[str, int] = {name: 0 for name in tiers}
+        self.context_window = _smallest_window(tiers.values())
+    
+    def select(self) -> Tuple[str, BaseLLM]:
+        """Get the tier name and backend for the call being made"""
+        names = [current_action()] + list(reversed(current_caller().split("/")))
+        for name in names:
+            tier = self.rules.get(name)
+            if tier in self.tiers:
+                return tier, self.tiers[tier]
+        return self.default, self.tiers[self.default]
+    
+    async def aask(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
+        tier, llm = self.select()
+        self._calls[tier] += 1
+        return await llm.aask(prompt, system_msgs, profile=profile)
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        tier, llm = self.select()
+        self._calls[tier] += 1
+        async for chunk in llm.astream(prompt, system_msgs, profile=profile):
+            yield chunk
+    
+    async def asample(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        n: int = 2,
+        profile: Optional[GenerationProfile] = None
+    ) -> List[str]:
+        tier, llm = self.select()
+        self._calls[tier] += 1
+        return await llm.asample(prompt, system_msgs, n=n, profile=profile)
+    
+    def _backends(self) -> List[BaseLLM]:
+        """Distinct tier backends (tiers may share one, e.g. a cascade and its large model)"""
+        backends: Dict[int, BaseLLM] = {}
+        for llm in self.tiers.values():
+            backends.setdefault(id(llm), llm)
+        return list(backends.values())
+    
+    async def warmup(self, timeout: Optional[float] = 60.0) -> bool:
+        """Warm up every tier concurrently; True if all of them answered"""
+        results = await asyncio.gather(*[llm.warmup(timeout) for llm in self._backends()])
+        return all(results)
+    
+    async def aclose(self):
+        for llm in self._backends():
+            await llm.aclose()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the number of calls served by each tier"""
+        return {"calls": dict(self._calls)}
+
+
+class CascadeLLM(LLMWrapper):
+    """
+    Tries a small model first and escalates to a large one on rejection.
+    
+    The small model's response is checked by cheap validators: blank
+    output always escalates, and per-action validators (Python syntax for
+    WriteCode and WriteTest by default) run for the current action. Streams
+    are buffered until the small response is accepted, so callers never see
+    a rejected answer.
+    """
+    
+    def __init__(
+        self,
+        small: BaseLLM,
+        large: BaseLLM,
+        validators: Optional[Sequence[Validator]] = None,
+        action_validators: Optional[Dict[str, List[Validator]]] = None
+    ):
+        """
+        Initialize the cascade
+        
+        Args:
+            small: Model tried first
+            large: Model used when the small model's response is rejected
+            validators: Validators applied to every response (default: reject_empty)
+            action_validators: Extra validators per action name
+                (default: DEFAULT_ACTION_VALIDATORS)
+        """
+        super().__init__(small)
+        self.large = large
+        # A prompt sized for the small model must also fit the large one, and vice versa
+        self.context_window = _smallest_window([small, large])
+        self.validators = list(validators) if validators is not None else [reject_empty]
+        self.action_validators = dict(
+            DEFAULT_ACTION_VALIDATORS if action_validators is None else action_validators
+        )
+        self._stats: Dict[str, Any] = {"calls": 0, "escalations": 0, "small_errors": 0, "rejections": {}}
+    
+    def check(self, text: str) -> Optional[str]:
+        """
+        Validate a small-model response for the current action
+        
+        Returns:
+            Reason of the first rejection, or None if the response is accepted
+        """
+        for validator in self.validators + self.action_validators.get(current_action(), []):
+            reason = validator(text)
+            if reason is not None:
+                return reason
+        return None
+    
+    async def _try_small(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]],
+        profile: Optional[GenerationProfile]
+    ) -> Optional[List[str]]:
+        """Get the small model's response chunks, or None if it must escalate"""
+        self._stats["calls"] += 1
+        chunks = []
+        try:
+            async for chunk in self.llm.astream(prompt, system_msgs, profile=profile):
+                chunks.append(chunk)
+        except Exception:
+            self._stats["small_errors"] += 1
+            reason = "error"
+        else:
+            reason = self.check("".join(chunks))
+        if reason is None:
+            return chunks
+        self._stats["escalations"] += 1
+        self._stats["rejections"][reason] = self._stats["rejections"].get(reason, 0) + 1
+        return None
+    
+    async def aask(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> str:
+        chunks = await self._try_small(prompt, system_msgs, profile)
+        if chunks is not None:
+            return "".join(chunks)
+        return await self.large.aask(prompt, system_msgs, profile=profile)
+    
+    async def astream(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        profile: Optional[GenerationProfile] = None
+    ) -> AsyncIterator[str]:
+        chunks = await self._try_small(prompt, system_msgs, profile)
+        if chunks is not None:
+            for chunk in chunks:
+                yield chunk
+            return
+        async for chunk in self.large.astream(prompt, system_msgs, profile=profile):
+            yield chunk
+    
+    async def asample(
+        self,
+        prompt: str,
+        system_msgs: Optional[List[str]] = None,
+        n: int = 2,
+        profile: Optional[GenerationProfile] = None
+    ) -> List[str]:
+        """Sample the small model; its accepted samples are returned, or the large model's if none is"""
+        self._stats["calls"] += 1
+        try:
+            samples = await self.llm.asample(prompt, system_msgs, n=n, profile=profile)
+            accepted = [sample for sample in samples if self.check(sample) is None]
+            reason = "rejected"
+        except Exception:
+            self._stats["small_errors"] += 1
+            accepted, reason = [], "error"
+        if accepted:
+            return accepted
+        self._stats["escalations"] += 1
+        self._stats["rejections"][reason] = self._stats["rejections"].get(reason, 0) + 1
+        return await self.large.asample(prompt, system_msgs, n=n, profile=profile)
+    
+    async def warmup(self, timeout: Optional[float] = 60.0) -> bool:
+        small, large = await asyncio.gather(self.llm.warmup(timeout), self.large.warmup(timeout))
+        return small and large
+    
+    async def aclose(self):
+        await self.llm.aclose()
+        await self.large.aclose()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cascade statistics"""
+        calls = self._stats["calls"]
+        return {
+            **self._stats,
+            "rejections": dict(self._stats["rejections"]),
+            "escalation_rate": self._stats["escalations"] / calls if calls else 0.0,
+        }
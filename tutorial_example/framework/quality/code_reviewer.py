@@ -72,6 +72,28 @@ class CodeReviewer:
         
         return review
     
+    def check_syntax(self, code: str) -> Optional[Dict[str, Any]]:
+        """
+        Check that Python code parses
+        
+        Args:
+            code: Code to check
+        
+        Returns:
+            Syntax issue, or None if the code parses
+        """
+        try:
+            ast.parse(code)
+        except SyntaxError as e:
+            return {
+                "type": "syntax",
+                "severity": "high",
+                "line": e.lineno,
+                "message": f"Syntax error: {e.msg}",
+                "suggestion": "Fix the syntax error"
+            }
+        return None
+    
     async def check_style(self, code: str) -> List[Dict[str, Any]]:
         """
         Check code style issues
@@ -1,11 +1,92 @@
 """Role/Agent implementation"""
-from typing import List, Optional
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 from framework.action import Action
 from framework.actions.write_prd import WritePRD
 from framework.actions.write_design import WriteDesign
 from framework.actions.write_code import WriteCode
 from framework.schema import Message, ActionOutput
+from framework.provider.base import llm_caller
 from collections import deque
+import re
+
+
+# Message kinds in dispatch order: (kind, cause_by marking it, content keywords
+# that also do, action class handling it)
+MESSAGE_KINDS = [
+    ("requirement", "UserRequirement", re.compile(r"requirement|idea", re.IGNORECASE), WritePRD),
+    ("prd", "WritePRD", re.compile(r"prd|product requirement", re.IGNORECASE), WriteDesign),
+    ("design", "WriteDesign", re.compile(r"design|architecture", re.IGNORECASE), WriteCode),
+]
+
+
+def classify_message(message: Message) -> Tuple[str, ...]:
+    """
+    Get the kinds of a message, in dispatch order
+    
+    Args:
+        message: Message to classify
+    
+    Returns:
+        Kinds matched by the message's cause_by or content keywords
+    """
+    content = message.content or ""
+    return tuple(
+        kind for kind, cause_by, keywords, _ in MESSAGE_KINDS
+        if message.cause_by == cause_by or keywords.search(content)
+    )
+
+
+class RoleInbox:
+    """
+    Pending messages of a role.
+    
+    Messages are classified once on arrival and kept both in arrival order
+    and per ``cause_by`` topic, so deciding what to do next and finding the
+    pending messages of a topic need no scanning or re-reading of content.
+    """
+    
+    def __init__(self):
+        self._messages: Deque[Message] = deque()
+        self._by_topic: Dict[Optional[str], Deque[Message]] = {}
+        self.latest: Optional[Message] = None
+        self.latest_kinds: Tuple[str, ...] = ()
+    
+    def append(self, message: Message):
+        """Add an arriving message"""
+        self._messages.append(message)
+        self._by_topic.setdefault(message.cause_by, deque()).append(message)
+        self.latest = message
+        self.latest_kinds = classify_message(message)
+    
+    def by_topic(self, cause_by: Optional[str]) -> List[Message]:
+        """Get the pending messages of a topic, oldest first"""
+        return list(self._by_topic.get(cause_by, ()))
+    
+    def latest_of(self, cause_by: Optional[str]) -> Optional[Message]:
+        """Get the most recent pending message of a topic"""
+        topic = self._by_topic.get(cause_by)
+        return topic[-1] if topic else None
+    
+    def consume(self, count: int):
+        """Drop the ``count`` oldest messages"""
+        for _ in range(min(count, len(self._messages))):
+            message = self._messages.popleft()
+            topic = self._by_topic[message.cause_by]
+            topic.popleft()
+            if not topic:
+                del self._by_topic[message.cause_by]
+        if not self._messages:
+            self.latest, self.latest_kinds = None, ()
+    
+    def clear(self):
+        """Drop every pending message"""
+        self.consume(len(self._messages))
+    
+    def __len__(self) -> int:
+        return len(self._messages)
+    
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._messages)
 
 
 class Role:
@@ -17,22 +98,41 @@ class Role:
         profile: str,
         goal: str,
         actions: List[Action] = None,
-        llm=None
+        llm=None,
+        watch: Optional[Iterable[str]] = None
     ):
+        """
+        Initialize Role
+        
+        Args:
+            name: Role name (also the address of messages sent to it)
+            profile: Role description
+            goal: Role goal
+            actions: Actions the role can take
+            llm: Optional LLM shared by the actions
+            watch: ``cause_by`` topics of broadcast messages the role reacts to;
+                messages sent to the role by name are always received
+        """
         self.name = name
         self.profile = profile
         self.goal = goal
         self.actions = actions or []
         self.llm = llm
+        # Indexed by the Environment when the role is added
+        self.watch = frozenset(watch or ())
         
         # Memory and state
         self.memory: deque = deque(maxlen=100)  # Recent messages
-        self.working_memory: List[Message] = []  # Current task context
+        self.working_memory = RoleInbox()  # Current task context
+        
+        # Action handling each message kind (see MESSAGE_KINDS)
+        self._dispatch: Dict[str, Action] = {}
         
         # Initialize actions with LLM
         for action in self.actions:
             if self.llm:
                 action.set_llm(self.llm)
+            self._index_action(action)
     
     def set_llm(self, llm):
         """Set LLM for role and its actions"""
@@ -55,6 +155,13 @@ class Role:
         if self.llm:
             action.set_llm(self.llm)
         self.actions.append(action)
+        self._index_action(action)
+    
+    def _index_action(self, action: Action):
+        """Register an action for the message kinds it handles (the first one wins)"""
+        for kind, _, _, action_class in MESSAGE_KINDS:
+            if kind not in self._dispatch and isinstance(action, action_class):
+                self._dispatch[kind] = action
     
     def observe(self, message: Message):
         """Observe and store a message"""
@@ -69,19 +176,20 @@ class Role:
         if message.send_to == self.name:
             return True
         
-        # If message is broadcast (send_to is None), check if we should process it
-        if message.send_to is None:
-            # ProductManager processes user requirements
-            if self.name == "ProductManager" and message.cause_by == "UserRequirement":
-                return True
-            # Architect processes PRDs
-            if self.name == "Architect" and message.cause_by == "WritePRD":
-                return True
-            # Engineer processes designs
-            if self.name == "Engineer" and message.cause_by == "WriteDesign":
-                return True
+        # Broadcast messages are relevant if their topic is watched
+        return message.send_to is None and message.cause_by in self.watch
+    
+    def get_messages_by_action(self, cause_by: str) -> List[Message]:
+        """
+        Get the pending messages produced by an action
         
-        return False
+        Args:
+            cause_by: Action name the messages were caused by (e.g. "WritePRD")
+        
+        Returns:
+            Pending messages of that topic, oldest first
+        """
+        return self.working_memory.by_topic(cause_by)
     
     def think(self) -> Optional[Action]:
         """
@@ -93,37 +201,15 @@ class Role:
         if not self.actions:
             return None
         
-        if not self.working_memory:
-            return None
-        
-        # Get the most recent relevant message
-        # Filter to only messages that are actually for this role
-        relevant_messages = [msg for msg in self.working_memory if self._is_relevant(msg)]
-        if not relevant_messages:
+        # Only relevant messages are observed, so the latest one is the task
+        if self.working_memory.latest is None:
             return None
         
-        last_msg = relevant_messages[-1]
-        msg_content = last_msg.content.lower()
-        msg_cause = last_msg.cause_by or ""
-        
-        # Route based on message cause_by (more reliable than content)
-        if msg_cause == "UserRequirement" or "requirement" in msg_content or "idea" in msg_content:
-            # Look for WritePRD action
-            for action in self.actions:
-                if isinstance(action, WritePRD):
-                    return action
-        
-        if msg_cause == "WritePRD" or "prd" in msg_content or "product requirement" in msg_content:
-            # Look for WriteDesign action
-            for action in self.actions:
-                if isinstance(action, WriteDesign):
-                    return action
-        
-        if msg_cause == "WriteDesign" or "design" in msg_content or "architecture" in msg_content:
-            # Look for WriteCode action
-            for action in self.actions:
-                if isinstance(action, WriteCode):
-                    return action
+        # First action handling one of the kinds the message was classified as
+        for kind in self.working_memory.latest_kinds:
+            action = self._dispatch.get(kind)
+            if action is not None:
+                return action
         
         # Default: execute first available action
         return self.actions[0] if self.actions else None
@@ -144,17 +230,17 @@ class Role:
         if action is None:
             return None
         
-        # Prepare context from memory - only use relevant messages
-        relevant_messages = [msg for msg in self.working_memory if self._is_relevant(msg)]
-        if not relevant_messages:
-            return None
-        
         # Use the most recent relevant message
-        context_messages = [relevant_messages[-1]]
+        if self.working_memory.latest is None:
+            return None
+        context_messages = [self.working_memory.latest]
+        # Messages observed while the action runs are kept for the next reaction
+        consumed = len(self.working_memory)
         
         # Execute action
         try:
-            output = await action.run(messages=context_messages)
+            with llm_caller(self.name):
+                output = await action.run(messages=context_messages)
             
             # Convert to message
             message = output.to_message(
@@ -166,7 +252,7 @@ class Role:
             self.memory.append(message)
             
             # Clear working memory after action
-            self.working_memory.clear()
+            self.working_memory.consume(consumed)
             
             return message
             
@@ -12,6 +12,7 @@ class Architect(Role):
             profile="System Architect",
             goal="Create system designs based on PRDs",
             actions=[WriteDesign(llm=llm)],
-            llm=llm
+            llm=llm,
+            watch=["WritePRD"]
         )
 
@@ -6,12 +6,13 @@ from framework.actions.write_code import WriteCode
 class Engineer(Role):
     """Software Engineer role"""
     
-    def __init__(self, llm=None):
+    def __init__(self, llm=None, code_samples: int = 1):
         super().__init__(
             name="Engineer",
             profile="Software Engineer",
             goal="Write clean, functional code based on designs",
-            actions=[WriteCode(llm=llm)],
-            llm=llm
+            actions=[WriteCode(llm=llm, samples=code_samples)],
+            llm=llm,
+            watch=["WriteDesign"]
         )
 
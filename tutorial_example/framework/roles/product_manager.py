@@ -12,6 +12,7 @@ class ProductManager(Role):
             profile="Product Manager",
             goal="Create comprehensive PRDs based on requirements",
             actions=[WritePRD(llm=llm)],
-            llm=llm
+            llm=llm,
+            watch=["UserRequirement"]
         )
 
@@ -1,18 +1,115 @@
 """Schema definitions for messages and data structures"""
-from typing import Optional, Dict, Any
-from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Tuple
+from dataclasses import dataclass
 from datetime import datetime
 import asyncio
+import itertools
+import sys
+import time
+
+
+# Wall-clock time (ns) at which time.monotonic_ns() was 0
+_WALL_CLOCK_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+_message_ids = itertools.count(1)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Intern a metadata string (subclasses of str cannot be interned)"""
+    return sys.intern(value) if type(value) is str else value
 
 
-@dataclass
 class Message:
-    """Message between roles"""
-    content: str
-    role: str
-    cause_by: Optional[str] = None
-    send_to: Optional[str] = None
-    timestamp: datetime = field(default_factory=datetime.now)
+    """
+    Message between roles.
+    
+    A message is created once and shared by reference by the environment
+    history, role memories and queues, so it is immutable and compact:
+    slots instead of an instance dict, interned ``role``/``cause_by``/
+    ``send_to`` strings (there are only a few distinct ones), and an integer
+    monotonic timestamp instead of a datetime. Use ``replace`` to derive a
+    changed copy. ``id`` is unique and increasing within the process and,
+    like a ``compare=False`` dataclass field, is left out of equality: two
+    messages are equal when their fields and creation time are.
+    """
+    
+    __slots__ = ("id", "content", "role", "cause_by", "send_to", "created_ns")
+    
+    def __init__(
+        self,
+        content: str,
+        role: str,
+        cause_by: Optional[str] = None,
+        send_to: Optional[str] = None,
+        created_ns: Optional[int] = None,
+        id: Optional[int] = None
+    ):
+        """
+        Initialize Message
+        
+        Args:
+            content: Message text
+            role: Name of the sender
+            cause_by: Action (topic) that produced the message
+            send_to: Addressee (None = the roles watching ``cause_by``)
+            created_ns: Creation time from time.monotonic_ns() (default: now)
+            id: Message id (default: the next id of the process)
+        """
+        init = object.__setattr__
+        init(self, "id", id if id is not None else next(_message_ids))
+        init(self, "content", content)
+        init(self, "role", _intern(role))
+        init(self, "cause_by", _intern(cause_by))
+        init(self, "send_to", _intern(send_to))
+        init(self, "created_ns", created_ns if created_ns is not None else time.monotonic_ns())
+    
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"Message is immutable; use replace() to change {name!r}")
+    
+    def __delattr__(self, name: str):
+        raise AttributeError(f"Message is immutable; cannot delete {name!r}")
+    
+    def replace(self, **changes: Any) -> "Message":
+        """
+        Copy the message with some fields changed
+        
+        The copy keeps the id and creation time unless they are changed:
+        it is the same message, e.g. re-addressed by the environment.
+        
+        Args:
+            **changes: New values of content, role, cause_by, send_to, created_ns or id
+        
+        Returns:
+            New Message
+        """
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return Message(**fields)
+    
+    @property
+    def timestamp(self) -> datetime:
+        """Wall-clock creation time"""
+        return datetime.fromtimestamp((self.created_ns + _WALL_CLOCK_OFFSET_NS) / 1e9)
+    
+    def _key(self) -> Tuple[Any, ...]:
+        return (self.created_ns, self.role, self.cause_by, self.send_to, self.content)
+    
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Message):
+            return NotImplemented
+        return self._key() == other._key()
+    
+    def __hash__(self) -> int:
+        return hash(self._key())
+    
+    def __reduce__(self):
+        return (Message, (self.content, self.role, self.cause_by, self.send_to, self.created_ns, self.id))
+    
+    def __repr__(self) -> str:
+        content = self.content if len(self.content) <= 60 else self.content[:57] + "..."
+        return (
+            f"Message(id={self.id}, role={self.role!r}, cause_by={self.cause_by!r}, "
+            f"send_to={self.send_to!r}, content={content!r})"
+        )
 
 
 class MessageQueue:
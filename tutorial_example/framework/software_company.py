@@ -1,7 +1,7 @@
 """Software Company - Main entry point for automated project generation"""
 import asyncio
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 from framework.team import Team
 from framework.context import Context
 from framework.config import Config
@@ -9,7 +9,17 @@ from framework.roles.product_manager import ProductManager
 from framework.roles.architect import Architect
 from framework.roles.engineer import Engineer
 from framework.roles.team_leader import TeamLeader
-from framework.llm import get_llm
+from framework.llm import BaseLLM, aget_llm
+from framework.provider.tiering import TieredLLM
+
+
+async def _run_company(company: Team, n_round: int, idea: str, llm=None, event_driven: bool = False):
+    """Run the company, closing the LLM afterwards if one is given"""
+    try:
+        await company.run(n_round=n_round, idea=idea, event_driven=event_driven)
+    finally:
+        if llm is not None:
+            await llm.aclose()
 
 
 def generate_repo(
@@ -19,7 +29,10 @@ def generate_repo(
     project_name: str = "",
     project_path: str = "",
     recover_path: Optional[str] = None,
-    llm=None
+    llm=None,
+    llm_tiers: Optional[Dict[str, BaseLLM]] = None,
+    tier_rules: Optional[Dict[str, str]] = None,
+    event_driven: bool = False
 ):
     """
     Generate a complete project repository - fully automated.
@@ -34,53 +47,28 @@ def generate_repo(
         project_path: Optional project path
         recover_path: Optional path to recover from saved state
         llm: Optional LLM instance
+        llm_tiers: Optional backends per model tier (e.g. {"small": ..., "large": ...});
+            each call then goes to the tier of its action or role
+        tier_rules: Tier of each action or role name (default: DEFAULT_TIER_RULES)
+        event_driven: Run roles as soon as they receive work, with n_round as
+            the budget of role reactions (see Team.run)
         
     Returns:
         Project path
     """
-    # Initialize LLM if not provided
-    if llm is None:
-        llm = get_llm(
-            local_model_path="EMPTY",
-            vllm_base_url="http://localhost:8000/v1",
-            vllm_model="codellama/CodeLlama-7b-Instruct-hf"
-        )
-    
-    # Create context
-    config = Config.default()
-    ctx = Context(config=config)
-    
-    # Set project path
-    if project_path:
-        ctx.set_project_path(project_path)
-    elif project_name:
-        workspace = config.workspace
-        project_path = f"{workspace}/{project_name}"
-        ctx.set_project_path(project_path)
-    
-    # Recover or create new team
-    if recover_path:
-        stg_path = Path(recover_path)
-        if not stg_path.exists() or not str(stg_path).endswith("team"):
-            raise FileNotFoundError(f"{recover_path} not exists or not endswith `team`")
-        company = Team.deserialize(stg_path=stg_path, context=ctx)
-        idea = company.idea
-    else:
-        # Create new team
-        company = Team(context=ctx)
-        company.hire([
-            TeamLeader(llm=llm),
-            ProductManager(llm=llm),
-            Architect(llm=llm),
-            Engineer(llm=llm),
-        ])
-    
-    # Invest and run
-    company.invest(investment)
-    asyncio.run(company.run(n_round=n_round, idea=idea))
-    
-    # Return project path
-    return ctx.get_project_path() or project_path or config.workspace
+    # One event loop for selecting, warming up and using the LLM
+    return asyncio.run(generate_repo_async(
+        idea,
+        investment=investment,
+        n_round=n_round,
+        project_name=project_name,
+        project_path=project_path,
+        recover_path=recover_path,
+        llm=llm,
+        llm_tiers=llm_tiers,
+        tier_rules=tier_rules,
+        event_driven=event_driven
+    ))
 
 
 async def generate_repo_async(
@@ -90,7 +78,10 @@ async def generate_repo_async(
     project_name: str = "",
     project_path: str = "",
     recover_path: Optional[str] = None,
-    llm=None
+    llm=None,
+    llm_tiers: Optional[Dict[str, BaseLLM]] = None,
+    tier_rules: Optional[Dict[str, str]] = None,
+    event_driven: bool = False
 ):
     """
     Async version of generate_repo
@@ -103,13 +94,23 @@ async def generate_repo_async(
         project_path: Optional project path
         recover_path: Optional path to recover from saved state
         llm: Optional LLM instance
+        llm_tiers: Optional backends per model tier (e.g. {"small": ..., "large": ...});
+            each call then goes to the tier of its action or role
+        tier_rules: Tier of each action or role name (default: DEFAULT_TIER_RULES)
+        event_driven: Run roles as soon as they receive work, with n_round as
+            the budget of role reactions (see Team.run)
         
     Returns:
         Project path
     """
-    # Initialize LLM if not provided
+    # Route calls to model tiers (the caller owns the tier backends)
+    if llm_tiers:
+        llm = TieredLLM(llm_tiers, rules=tier_rules)
+    
+    # Initialize LLM if not provided (and release it when done)
+    owns_llm = llm is None
     if llm is None:
-        llm = get_llm(
+        llm = await aget_llm(
             local_model_path="EMPTY",
             vllm_base_url="http://localhost:8000/v1",
             vllm_model="codellama/CodeLlama-7b-Instruct-hf"
@@ -146,7 +147,13 @@ async def generate_repo_async(
     
     # Invest and run
     company.invest(investment)
-    await company.run(n_round=n_round, idea=idea)
+    await _run_company(
+        company,
+        n_round=n_round,
+        idea=idea,
+        llm=llm if owns_llm else None,
+        event_driven=event_driven
+    )
     
     # Return project path
     return ctx.get_project_path() or project_path or config.workspace
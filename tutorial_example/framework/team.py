@@ -7,6 +7,7 @@ from framework.environment import Environment
 from framework.schema import Message
 from framework.context import Context
 from framework.config import Config
+from framework.provider.base import llm_caller
 from framework.utils.exceptions import NoMoneyException
 
 
@@ -66,15 +67,24 @@ class Team:
         target = send_to or "ProductManager"
         self.environment.publish_message(initial_message, send_to=target)
     
-    async def run(self, n_round: int = 10, idea: str = "", send_to: str = "", auto_archive: bool = True):
+    async def run(
+        self,
+        n_round: int = 10,
+        idea: str = "",
+        send_to: str = "",
+        auto_archive: bool = True,
+        event_driven: bool = False
+    ):
         """
         Run company until target round or no money
         
         Args:
-            n_round: Number of rounds to run
+            n_round: Number of rounds to run (role reactions when event_driven)
             idea: Project idea (if provided, calls run_project)
             send_to: Target role for initial message
             auto_archive: Whether to archive after completion
+            event_driven: Schedule each role as soon as a message reaches it
+                instead of running rounds (see Environment.run_events)
             
         Returns:
             Message history
@@ -85,28 +95,38 @@ class Team:
         self.max_rounds = n_round
         self.current_round = 0
         
-        while n_round > 0:
-            if self.environment.is_idle:
-                break
+        # Attribute LLM calls to this project for fair admission control
+        with llm_caller(self._project_id()):
+            if event_driven:
+                self.current_round = await self.environment.run_events(
+                    max_steps=n_round,
+                    before_step=self._check_balance
+                )
+                if self._is_complete():
+                    print("\n✓ Task completed!")
+            else:
+                while n_round > 0:
+                    if self.environment.is_idle:
+                        break
+                    
+                    self.current_round = self.max_rounds - n_round
+                    print(f"\n{'='*60}")
+                    print(f"Round {self.current_round + 1}/{self.max_rounds}")
+                    print(f"{'='*60}")
+                    
+                    # Check budget
+                    self._check_balance()
+                    
+                    # Run environment (processes all roles)
+                    await self.environment.run()
+                    
+                    # Check if complete
+                    if self._is_complete():
+                        print("\n✓ Task completed!")
+                        break
+                    
+                    n_round -= 1
             
-            self.current_round = self.max_rounds - n_round
-            print(f"\n{'='*60}")
-            print(f"Round {self.current_round + 1}/{self.max_rounds}")
-            print(f"{'='*60}")
-            
-            # Check budget
-            self._check_balance()
-            
-            # Run environment (processes all roles)
-            await self.environment.run()
-            
-            # Check if complete
-            if self._is_complete():
-                print("\n✓ Task completed!")
-                break
-            
-            n_round -= 1
-        
         # Archive project
         self.environment.archive(auto_archive)
         
@@ -125,25 +145,15 @@ class Team:
                 result["code"] = self.environment.context.kwargs.get("code", "")
             return result
     
+    def _project_id(self) -> str:
+        """Identifier of the project this team works on (used as LLM caller)"""
+        get_path = getattr(self.context, "get_project_path", None)
+        project_path = get_path() if get_path else ""
+        return Path(project_path).name if project_path else "team"
+    
     def _route_message(self, message: Message, process_next_round: bool = False):
-        """Route message to appropriate role based on cause_by"""
-        # Simple routing logic
-        routing_map = {
-            "WritePRD": "Architect",  # PRD goes to Architect
-            "WriteDesign": "Engineer",  # Design goes to Engineer
-            "WriteCode": None,  # Code is final output
-        }
-        
-        target_role = routing_map.get(message.cause_by)
-        if target_role:
-            # Send to specific role
-            self.environment.publish_message(message, send_to=target_role)
-        else:
-            # Final output - store in context
-            if message.cause_by == "WriteCode":
-                self.environment.context["code"] = message.content
-                self.environment.context["design"] = self._find_latest_message("WriteDesign")
-                self.environment.context["prd"] = self._find_latest_message("WritePRD")
+        """Route message to the roles watching its cause_by (see Environment)"""
+        self.environment._auto_route_message(message)
     
     def _find_latest_message(self, cause_by: str) -> str:
         """Find latest message with given cause_by"""
@@ -157,7 +167,7 @@ class Team:
         if isinstance(self.environment.context, dict):
             return "code" in self.environment.context
         else:
-            return "code" in self.environment.context.kwargs.to_dict()
+            return self.environment.context.kwargs.get("code") is not None
     
     def serialize(self, stg_path: Optional[Path] = None):
         """
@@ -1,6 +1,7 @@
 """Utility functions for extracting code from LLM outputs"""
+import json
 import re
-from typing import List, Optional
+from typing import Any, List, Optional
 
 
 def extract_code_blocks(content: str) -> str:
@@ -19,8 +20,9 @@ def extract_code_blocks(content: str) -> str:
     if not content:
         return ""
     
-    # Pattern to match code blocks: ```language\ncode\n```
-    code_block_pattern = r'```(?:\w+)?\n(.*?)```'
+    # Pattern to match code blocks: ```language\ncode\n```; the last block may be
+    # unterminated (closing fence eaten by a stop sequence, or output truncated)
+    code_block_pattern = r'```(?:\w+)?\n(.*?)(?:```|\Z)'
     matches = re.findall(code_block_pattern, content, re.DOTALL)
     
     if matches:
@@ -215,3 +217,40 @@ def detect_code_language(code: str) -> Optional[str]:
     
     return None
 
+
+
+_JSON_BLOCK = re.compile(r'```(?:json)?\s*\n(.*?)```', re.DOTALL)
+
+
+def extract_json(content: str) -> Optional[Any]:
+    """
+    Parse the JSON document of an LLM output.
+    
+    Constrained generation returns bare JSON, which is parsed directly;
+    otherwise the first ```json block, then the outermost {...} or [...]
+    span, is tried.
+    
+    Args:
+        content: Full content that may contain a JSON document
+    
+    Returns:
+        Parsed value, or None if no valid JSON is found
+    """
+    if not content:
+        return None
+    
+    candidates = [content]
+    match = _JSON_BLOCK.search(content)
+    if match:
+        candidates.append(match.group(1))
+    for opening, closing in (('{', '}'), ('[', ']')):
+        start, end = content.find(opening), content.rfind(closing)
+        if 0 <= start < end:
+            candidates.append(content[start:end + 1])
+    
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
@@ -0,0 +1,365 @@
+"""Token-budgeted prompt context packing"""
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+import hashlib
+import weakref
+
+
+# Characters per token assumed when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = "\n...[truncated]...\n"
+
+# Async hook shrinking a section: (text, max_tokens) -> shorter text
+Summarizer = Callable[[str, int], Awaitable[str]]
+
+
+class TokenCounter:
+    """Token counter with an LRU cache of recent counts"""
+    
+    def __init__(self, encode: Optional[Callable[[str], int]] = None, cache_size: int = 1024):
+        """
+        Initialize token counter
+        
+        Args:
+            encode: Function returning the token count of a text
+                (default: estimate from the text length)
+            cache_size: Number of counts kept
+        """
+        self.encode = encode
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+    
+    @property
+    def exact(self) -> bool:
+        """Whether counts come from a real tokenizer"""
+        return self.encode is not None
+    
+    def count(self, text: str) -> int:
+        """Count the tokens of a text"""
+        if not text:
+            return 0
+        if self.encode is None:
+            return len(text) // CHARS_PER_TOKEN + 1
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        count = self._cache.get(key)
+        if count is None:
+            count = self.encode(text)
+            self._cache[key] = count
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return count
+
+
+_counters: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_token_counter(llm=None) -> TokenCounter:
+    """
+    Get the cached token counter of a backend
+    
+    Uses the backend's own ``count_tokens`` (e.g. the llama.cpp tokenizer),
+    then ``tiktoken`` if it is installed, then a length-based estimate.
+    
+    Args:
+        llm: Backend (wrappers are unwrapped); None for the estimate
+    
+    Returns:
+        TokenCounter shared by all callers of that backend
+    """
+    from framework.provider.base import unwrap
+    backend = unwrap(llm) if llm is not None else None
+    if backend is not None and backend in _counters:
+        return _counters[backend]
+    
+    encode = getattr(backend, "count_tokens", None)
+    if encode is None and backend is not None:
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding("cl100k_base")
+            encode = lambda text: len(encoding.encode(text, disallowed_special=()))
+        except ImportError:
+            encode = None
+    counter = TokenCounter(encode)
+    if backend is not None:
+        _counters[backend] = counter
+    return counter
+
+
+def truncate_to_tokens(text: str, max_tokens: int, counter: TokenCounter, keep: str = "head") -> str:
+    """
+    Cut a text down to a token budget
+    
+    Args:
+        text: Text to cut
+        max_tokens: Token budget of the result (marker included)
+        counter: Token counter
+        keep: Part to keep: "head", "tail" or "both" (start and end)
+    
+    Returns:
+        The text itself if it fits, otherwise a cut version with a marker
+    """
+    if counter.count(text) <= max_tokens:
+        return text
+    budget = max_tokens - counter.count(TRUNCATION_MARKER)
+    if budget <= 0:
+        return ""
+    
+    # Start from the average characters per token and shrink until it fits
+    chars = int(len(text) * budget / counter.count(text))
+    while chars > 0:
+        if keep == "tail":
+            kept = text[-chars:]
+        elif keep == "both":
+            kept = text[:chars // 2] + TRUNCATION_MARKER + text[len(text) - chars // 2:]
+        else:
+            kept = text[:chars]
+        if counter.count(kept) <= budget:
+            break
+        chars = int(chars * 0.9)
+    if chars <= 0:
+        return ""
+    if keep == "tail":
+        return TRUNCATION_MARKER.lstrip("\n") + kept
+    if keep == "both":
+        return kept
+    return kept + TRUNCATION_MARKER.rstrip("\n")
+
+
+def _backend_max_tokens(llm) -> Optional[int]:
+    """Default generation budget of a backend, if it has one"""
+    from framework.provider.base import unwrap
+    return getattr(unwrap(llm), "max_tokens", None) if llm is not None else None
+
+
+def get_context_window(llm) -> Optional[int]:
+    """
+    Get the context window of a backend
+    
+    Wrappers are unwrapped down to the backend, except those spanning
+    several backends (tiers, cascades), which set their own
+    ``context_window``: any of their backends may serve the call.
+    
+    Args:
+        llm: Backend or wrapper; None for unknown
+    
+    Returns:
+        Its ``context_window`` or ``n_ctx`` in tokens, or None if not known
+    """
+    from framework.provider.base import LLMWrapper
+    if llm is None:
+        return None
+    while isinstance(llm, LLMWrapper):
+        if "context_window" in vars(llm):
+            return llm.context_window
+        llm = llm.llm
+    return getattr(llm, "context_window", None) or getattr(llm, "n_ctx", None)
+
+
+def generation_budget(llm, max_tokens: Optional[int] = None, context_window: Optional[int] = None) -> Optional[int]:
+    """
+    Cap the generation budget of a call to half the context window
+    
+    A generation budget close to the window would leave no room for the
+    prompt, so prompts are sized for at most half the window; the call must
+    then not ask for more, or prompt and output overflow the window.
+    
+    Args:
+        llm: Backend of the call
+        max_tokens: Generation budget of the call (default: the backend's)
+        context_window: Override of the backend's context window
+    
+    Returns:
+        The lowered budget, or None if the call's budget already fits
+    """
+    window = context_window or get_context_window(llm)
+    generation = max_tokens or _backend_max_tokens(llm)
+    if window is None or generation is None or generation <= window // 2:
+        return None
+    return window // 2
+
+
+class ContextSection:
+    """A piece of prompt context competing for the token budget"""
+    
+    def __init__(
+        self,
+        name: str,
+        text: str,
+        priority: int = 5,
+        keep: str = "head",
+        min_tokens: int = 32,
+        summarize: Optional[Summarizer] = None
+    ):
+        """
+        Initialize section
+        
+        Args:
+            name: Key of the section in the build result
+            text: Full section text
+            priority: Higher priorities are fitted first
+            keep: Part kept when truncating ("head", "tail" or "both")
+            min_tokens: Below this budget the section is dropped instead of cut
+            summarize: Optional async hook used before truncation
+        """
+        self.name = name
+        self.text = text or ""
+        self.priority = priority
+        self.keep = keep
+        self.min_tokens = min_tokens
+        self.summarize = summarize
+
+
+class ContextBuilder:
+    """
+    Packs prompt sections into the backend's context window.
+    
+    The budget is the context window minus the generation budget, the
+    reserved fixed text (system prompt, instructions) and a safety margin.
+    Sections are fitted in priority order: each takes what it needs from
+    the remaining budget and is summarized or truncated when it does not
+    fit, so the prompt size is bounded whatever the upstream documents are.
+    
+    Without a known context window there is no budget and sections are
+    passed through unchanged.
+    """
+    
+    def __init__(
+        self,
+        context_window: Optional[int] = 8192,
+        max_tokens: int = 2048,
+        counter: Optional[TokenCounter] = None,
+        margin_tokens: int = 256
+    ):
+        """
+        Initialize builder
+        
+        Args:
+            context_window: Context window of the backend in tokens
+                (None: unknown, nothing is truncated)
+            max_tokens: Generation budget to keep free
+            counter: Token counter (default: length-based estimate)
+            margin_tokens: Room for fixed instructions and template text
+        """
+        self.context_window = context_window
+        self.max_tokens = max_tokens
+        self.counter = counter or TokenCounter()
+        self.margin_tokens = margin_tokens
+        self.reserved_tokens = 0
+        self.sections: List[ContextSection] = []
+    
+    @classmethod
+    def for_llm(
+        cls,
+        llm,
+        max_tokens: Optional[int] = None,
+        context_window: Optional[int] = None,
+        **kwargs
+    ) -> "ContextBuilder":
+        """
+        Create a builder sized for a backend
+        
+        Args:
+            llm: Backend (its ``n_ctx`` / ``context_window`` and ``max_tokens`` are used;
+                without a known window nothing is truncated)
+            max_tokens: Generation budget of the call (default: the backend's)
+            context_window: Override of the backend's context window
+            **kwargs: Other builder options
+        
+        Returns:
+            ContextBuilder instance
+        """
+        window = context_window or get_context_window(llm)
+        generation = max_tokens or _backend_max_tokens(llm) or 2048
+        capped = generation_budget(llm, generation, window)
+        return cls(window, capped or generation, counter=get_token_counter(llm), **kwargs)
+    
+    @property
+    def budget(self) -> Optional[int]:
+        """Tokens available for sections (None when the context window is unknown)"""
+        if self.context_window is None:
+            return None
+        return max(0, self.context_window - self.max_tokens - self.reserved_tokens - self.margin_tokens)
+    
+    def reserve(self, *texts: str) -> "ContextBuilder":
+        """Reserve room for fixed prompt text (system prompt, instructions)"""
+        self.reserved_tokens += sum(self.counter.count(text) for text in texts if text)
+        return self
+    
+    def add(
+        self,
+        name: str,
+        text: str,
+        priority: int = 5,
+        keep: str = "head",
+        min_tokens: int = 32,
+        summarize: Optional[Summarizer] = None
+    ) -> "ContextBuilder":
+        """
+        Add a section
+        
+        Args:
+            name: Key of the section in the build result
+            text: Full section text
+            priority: Higher priorities are fitted first
+            keep: Part kept when truncating ("head", "tail" or "both")
+            min_tokens: Below this budget the section is dropped instead of cut
+            summarize: Optional async hook ``(text, max_tokens) -> str`` tried
+                before truncation
+        
+        Returns:
+            The builder, for chaining
+        """
+        self.sections.append(ContextSection(name, text, priority, keep, min_tokens, summarize))
+        return self
+    
+    async def build(self) -> Dict[str, str]:
+        """
+        Fit the sections into the budget
+        
+        Returns:
+            Mapping of section name to (possibly shortened) text
+        """
+        remaining = self.budget
+        if remaining is None:
+            return {section.name: section.text for section in self.sections}
+        fitted: Dict[str, str] = {}
+        for section in sorted(self.sections, key=lambda s: -s.priority):
+            tokens = self.counter.count(section.text)
+            if tokens <= remaining:
+                fitted[section.name] = section.text
+                remaining -= tokens
+                continue
+            if remaining < section.min_tokens:
+                fitted[section.name] = ""
+                continue
+            
+            text = section.text
+            if section.summarize is not None:
+                text = await section.summarize(text, remaining)
+            text = truncate_to_tokens(text, remaining, self.counter, section.keep)
+            fitted[section.name] = text
+            remaining -= self.counter.count(text)
+        return fitted
+
+
+def llm_summarizer(llm, instructions: str = "Summarize the following text, keeping every requirement and name") -> Summarizer:
+    """
+    Create a summarization hook that asks an LLM to shorten a section
+    
+    Args:
+        llm: Backend used for summaries
+        instructions: Instruction placed before the text
+    
+    Returns:
+        Async hook for ``ContextBuilder.add(summarize=...)``
+    """
+    from framework.llm import GenerationProfile
+    
+    async def summarize(text: str, max_tokens: int) -> str:
+        prompt = f"{instructions} in at most {max_tokens * CHARS_PER_TOKEN // 5} words:\n\n{text}"
+        return await llm.aask(prompt, profile=GenerationProfile(max_tokens=max_tokens))
+    
+    return summarize
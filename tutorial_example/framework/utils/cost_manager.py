@@ -1,5 +1,5 @@
 """Cost Manager for tracking API costs and budget"""
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dataclasses import dataclass, field
 from datetime import datetime
 
@@ -12,23 +12,95 @@ class CostRecord:
     action: str
     cost: float
     description: str = ""
+    model: str = ""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+
+
+@dataclass
+class ModelPricing:
+    """
+    Price of a model.
+    
+    Hosted APIs are priced per 1000 prompt and completion tokens;
+    self-hosted models can be priced per second of generation instead.
+    """
+    prompt: float = 0.0
+    completion: float = 0.0
+    per_second: float = 0.0
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, float]) -> "ModelPricing":
+        """Create pricing from a config mapping"""
+        return cls(
+            prompt=data.get("prompt", 0.0),
+            completion=data.get("completion", 0.0),
+            per_second=data.get("per_second", 0.0),
+        )
+    
+    def to_dict(self) -> Dict[str, float]:
+        return {"prompt": self.prompt, "completion": self.completion, "per_second": self.per_second}
+    
+    def cost(self, usage) -> float:
+        """Get the cost of a call from its LLMUsage"""
+        seconds = usage.server_time if usage.server_time is not None else usage.latency
+        return (
+            usage.prompt_tokens * self.prompt / 1000
+            + usage.completion_tokens * self.completion / 1000
+            + seconds * self.per_second
+        )
 
 
 class CostManager:
     """Manages API costs and budget enforcement"""
     
-    def __init__(self, max_budget: float = 0.0):
+    def __init__(
+        self,
+        max_budget: float = 0.0,
+        pricing: Optional[Dict[str, Any]] = None,
+        default_pricing: Optional[ModelPricing] = None
+    ):
         """
         Initialize Cost Manager
         
         Args:
             max_budget: Maximum budget allowed
+            pricing: Pricing per model name (ModelPricing or config mappings)
+            default_pricing: Pricing of models missing from the table (default: free)
         """
         self.total_cost: float = 0.0
         self.max_budget: float = max_budget
         self.cost_history: List[CostRecord] = []
+        self.pricing: Dict[str, ModelPricing] = {}
+        self.default_pricing = default_pricing or ModelPricing()
+        # Models already reported as unpriced while a budget is set
+        self._unpriced: set = set()
+        for model, price in (pricing or {}).items():
+            self.set_pricing(model, price)
     
-    def add_cost(self, cost: float, role: str = "", action: str = "", description: str = ""):
+    def set_pricing(self, model: str, pricing: Any):
+        """
+        Set the pricing of a model
+        
+        Args:
+            model: Model name as reported by the backend
+            pricing: ModelPricing or mapping with prompt/completion/per_second
+        """
+        self.pricing[model] = pricing if isinstance(pricing, ModelPricing) else ModelPricing.from_dict(pricing)
+    
+    def get_pricing(self, model: str) -> ModelPricing:
+        """Get the pricing of a model, falling back to the default pricing"""
+        return self.pricing.get(model, self.default_pricing)
+    
+    def add_cost(
+        self,
+        cost: float,
+        role: str = "",
+        action: str = "",
+        description: str = "",
+        usage=None
+    ):
         """
         Add a cost and check budget
         
@@ -37,6 +109,7 @@ class CostManager:
             role: Role that incurred the cost
             action: Action that incurred the cost
             description: Description of the cost
+            usage: Optional LLMUsage of the call that incurred the cost
             
         Raises:
             NoMoneyException: If budget is exceeded
@@ -50,6 +123,11 @@ class CostManager:
             cost=cost,
             description=description
         )
+        if usage is not None:
+            record.model = usage.model
+            record.prompt_tokens = usage.prompt_tokens
+            record.completion_tokens = usage.completion_tokens
+            record.latency = usage.latency
         self.cost_history.append(record)
         
         # Check budget
@@ -60,6 +138,35 @@ class CostManager:
                 f"Insufficient funds: ${self.total_cost:.2f} >= ${self.max_budget:.2f}"
             )
     
+    def add_usage(self, usage, role: str = "", action: str = "", description: str = "") -> float:
+        """
+        Add the cost of an LLM call priced from its token usage
+        
+        Args:
+            usage: LLMUsage reported by the backend
+            role: Role that made the call
+            action: Action that made the call
+            description: Description of the cost
+        
+        Returns:
+            Cost of the call
+        
+        Raises:
+            NoMoneyException: If budget is exceeded
+        """
+        pricing = self.get_pricing(usage.model)
+        if self.max_budget > 0 and pricing == ModelPricing() and usage.model not in self._unpriced:
+            # Free calls never reach the budget: say so instead of silently not enforcing it
+            self._unpriced.add(usage.model)
+            print(
+                f"Warning: no pricing for model '{usage.model or 'unknown'}', its calls cost $0.00 "
+                f"and do not count against the ${self.max_budget:.2f} budget "
+                f"(set it in Config.pricing or CostManager.set_pricing)"
+            )
+        cost = pricing.cost(usage)
+        self.add_cost(cost, role=role, action=action, description=description, usage=usage)
+        return cost
+    
     def get_remaining_budget(self) -> float:
         """Get remaining budget"""
         if self.max_budget <= 0:
@@ -71,12 +178,42 @@ class CostManager:
         self.total_cost = 0.0
         self.cost_history.clear()
     
+    def get_usage_summary(self, by: str = "role") -> Dict[str, Dict[str, Any]]:
+        """
+        Aggregate token usage and latency
+        
+        Args:
+            by: Record field to group by: "role", "action" or "model"
+        
+        Returns:
+            Per-group calls, tokens, total latency, tokens/sec and cost,
+            sorted by total latency (the biggest consumer first)
+        """
+        groups: Dict[str, Dict[str, Any]] = {}
+        for record in self.cost_history:
+            group = groups.setdefault(getattr(record, by) or "unknown", {
+                "calls": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "latency": 0.0,
+                "cost": 0.0,
+            })
+            group["calls"] += 1
+            group["prompt_tokens"] += record.prompt_tokens
+            group["completion_tokens"] += record.completion_tokens
+            group["latency"] += record.latency
+            group["cost"] += record.cost
+        for group in groups.values():
+            group["tokens_per_second"] = group["completion_tokens"] / group["latency"] if group["latency"] > 0 else 0.0
+        return dict(sorted(groups.items(), key=lambda item: -item[1]["latency"]))
+    
     def get_summary(self) -> Dict[str, Any]:
         """Get cost summary"""
         return {
             "total_cost": self.total_cost,
             "max_budget": self.max_budget,
             "remaining": self.get_remaining_budget(),
-            "transactions": len(self.cost_history)
+            "transactions": len(self.cost_history),
+            "prompt_tokens": sum(record.prompt_tokens for record in self.cost_history),
+            "completion_tokens": sum(record.completion_tokens for record in self.cost_history),
         }
-
@@ -8,3 +8,31 @@ class NoMoneyException(Exception):
         self.total_cost = total_cost
         super().__init__(message or f"Budget exceeded: ${total_cost:.2f}")
 
+
+
+class LLMQueueFullException(RuntimeError):
+    """Raised when an LLM backend's request queue cannot accept more work"""
+    
+    def __init__(self, max_size: int, message: str = ""):
+        self.max_size = max_size
+        super().__init__(message or f"LLM request queue is full ({max_size} requests waiting)")
+
+
+class LLMServerError(RuntimeError):
+    """Raised when an LLM server answers with an error status"""
+    
+    def __init__(self, status: int, message: str = ""):
+        self.status = status
+        super().__init__(message or f"LLM server error (status {status})")
+
+
+class LLMConnectionError(RuntimeError):
+    """Raised when an LLM server cannot be reached"""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a circuit breaker rejects a call without trying the backend"""
+    
+    def __init__(self, retry_after: float, message: str = ""):
+        self.retry_after = retry_after
+        super().__init__(message or f"Circuit breaker is open (retry in {retry_after:.1f}s)")
@@ -0,0 +1,106 @@
+"""Tests for LocalLLM generation options (llama.cpp is replaced by a recording fake)"""
+import asyncio
+import sys
+import types
+import pytest
+from framework.llm import GenerationProfile, LocalLLM
+
+
+class FakeLlama:
+    """Records the options of the last completion call"""
+    
+    def __init__(self, model_path, **kwargs):
+        self.calls = []
+        self._state = []
+    
+    def tokenize(self, data, add_bos=True, special=False):
+        return [hash(word) % 50000 for word in data.decode("utf-8").split(" ")]
+    
+    def reset(self):
+        self._state = []
+    
+    def eval(self, tokens):
+        self._state = self._state + list(tokens)
+    
+    def save_state(self):
+        return list(self._state)
+    
+    def load_state(self, state):
+        self._state = list(state)
+    
+    def create_completion(self, prompt, stream=False, **kwargs):
+        self.calls.append(("completion", kwargs))
+        return iter([{"choices": [{"text": "ok"}]}])
+    
+    def create_chat_completion(self, messages, stream=False, **kwargs):
+        self.calls.append(("chat", kwargs))
+        return iter([{"choices": [{"delta": {"content": "ok"}}]}])
+
+
+@pytest.fixture
+def fake_llama(monkeypatch):
+    module = types.ModuleType("llama_cpp")
+    module.Llama = FakeLlama
+    monkeypatch.setitem(sys.modules, "llama_cpp", module)
+
+
+def _generate(llm, profile=None):
+    async def run():
+        try:
+            return await llm.aask("Write a function", ["You are an engineer"], profile=profile)
+        finally:
+            await llm.aclose()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("prefix_cache_size,method", [(0, "chat"), (4, "completion")])
+def test_default_temperature_is_passed(fake_llama, prefix_cache_size, method):
+    llm = LocalLLM(model_path="model-llama-3.gguf", temperature=0.2, prefix_cache_size=prefix_cache_size)
+    _generate(llm)
+    called, options = llm.llm.calls[-1]
+    assert called == method
+    assert options["temperature"] == 0.2
+
+
+def test_profile_temperature_overrides_default(fake_llama):
+    llm = LocalLLM(model_path="model-llama-3.gguf", temperature=0.2, prefix_cache_size=4)
+    _generate(llm, GenerationProfile(temperature=0.7))
+    assert llm.llm.calls[-1][1]["temperature"] == 0.7
+
+
+def test_samples_share_one_request(fake_llama):
+    llm = LocalLLM(model_path="model-llama-3.gguf", prefix_cache_size=4)
+    
+    async def run():
+        try:
+            return await llm.asample("Write a function", ["You are an engineer"], n=3)
+        finally:
+            await llm.aclose()
+    
+    samples = asyncio.run(run())
+    assert samples == ["ok", "ok", "ok"]
+    assert len(llm.llm.calls) == 3
+    # The prefix is restored for the first sample only, later ones reuse the prompt
+    stats = llm.get_stats()
+    assert stats["prefix_hits"] + stats["prefix_misses"] == 1
+
+
+def test_cancelled_request_frees_its_queue_place(fake_llama):
+    from framework.llm import _InferenceRequest
+    from framework.utils.exceptions import LLMQueueFullException
+    llm = LocalLLM(model_path="model-llama-3.gguf", max_queue_size=1)
+    
+    async def run():
+        try:
+            # Nothing is dispatched until the test yields to the event loop
+            first = _InferenceRequest("a", None, LocalLLM.DEFAULT_PRIORITY)
+            llm._submit(first)
+            llm._cancel(first)
+            llm._submit(_InferenceRequest("b", None, LocalLLM.DEFAULT_PRIORITY))
+            with pytest.raises(LLMQueueFullException):
+                llm._submit(_InferenceRequest("c", None, LocalLLM.DEFAULT_PRIORITY))
+            assert llm.get_stats()["queue_depth"] == 1
+        finally:
+            await llm.aclose()
+    
+    asyncio.run(run())